@@ -0,0 +1,241 @@
+"""Bucketed A/B statistics with a parallel bootstrap.
+
+Users are split into buckets with ``md5(str(user_id) + salt) % n_buckets``,
+the hashing used by ``app.core.ab_testing.get_exp_group`` and by the bucket
+column in ``notebooks/AB_test_hitrate.ipynb``. MD5 is evaluated with NumPy
+over all unique user ids at once. Per-view metrics are reduced to bucket
+ratios with ``bincount``, and arms are compared with a bootstrap over
+buckets that runs in a process pool, plus the notebook's t-test and
+Mann-Whitney test.
+
+Usage:
+    python -m app.analytics.ab_stats --views views.csv --likes likes.csv --jobs 4
+"""
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import mannwhitneyu, ttest_ind
+
+NOTEBOOK_BUCKET_SALT = "bbb"
+
+_MD5_SHIFTS = np.array(
+    [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4,
+    dtype=np.uint32)
+_MD5_CONSTANTS = np.array(
+    [int(abs(np.sin(i + 1)) * 2 ** 32) & 0xFFFFFFFF for i in range(64)], dtype=np.uint32)
+_MD5_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+
+
+def _md5_message_blocks(user_ids: np.ndarray, salt: bytes) -> np.ndarray:
+    """Padded single 64-byte MD5 blocks of ``str(user_id) + salt`` as (n, 16) uint32"""
+    n = len(user_ids)
+    digits = np.ones(n, dtype=np.int64)
+    power = np.full(n, 10, dtype=np.int64)
+    while True:
+        more = user_ids >= power
+        if not more.any():
+            break
+        digits += more
+        power = np.where(more, power * 10, power)
+
+    blocks = np.zeros((n, 64), dtype=np.uint8)
+    rows = np.arange(n)
+    remaining = user_ids.copy()
+    # k-th digit from the right goes to byte digits - 1 - k
+    for k in range(int(digits.max())):
+        has = k < digits
+        blocks[rows[has], digits[has] - 1 - k] = ord("0") + remaining[has] % 10
+        remaining //= 10
+
+    for offset, byte in enumerate(salt):
+        blocks[rows, digits + offset] = byte
+    length = digits + len(salt)
+    blocks[rows, length] = 0x80
+    bit_length = (length * 8).astype("<u8")
+    blocks[:, 56:64] = bit_length.view(np.uint8).reshape(n, 8)
+    return blocks.view("<u4").reshape(n, 16)
+
+
+def _md5_words(blocks: np.ndarray) -> np.ndarray:
+    """MD5 compression of single blocks, returns (n, 4) uint32 state words"""
+    a = np.full(len(blocks), _MD5_INIT[0], dtype=np.uint32)
+    b = np.full(len(blocks), _MD5_INIT[1], dtype=np.uint32)
+    c = np.full(len(blocks), _MD5_INIT[2], dtype=np.uint32)
+    d = np.full(len(blocks), _MD5_INIT[3], dtype=np.uint32)
+    a0, b0, c0, d0 = a.copy(), b.copy(), c.copy(), d.copy()
+    words = np.ascontiguousarray(blocks.T)
+
+    with np.errstate(over="ignore"):
+        for i in range(64):
+            if i < 16:
+                f = (b & c) | (~b & d)
+                g = i
+            elif i < 32:
+                f = (d & b) | (~d & c)
+                g = (5 * i + 1) % 16
+            elif i < 48:
+                f = b ^ c ^ d
+                g = (3 * i + 5) % 16
+            else:
+                f = c ^ (b | ~d)
+                g = (7 * i) % 16
+            f = f + a + _MD5_CONSTANTS[i] + words[g]
+            shift = _MD5_SHIFTS[i]
+            a, d, c = d, c, b
+            b = b + ((f << shift) | (f >> (np.uint32(32) - shift)))
+        return np.stack([a0 + a, b0 + b, c0 + c, d0 + d], axis=1)
+
+
+def md5_mod(user_ids, salt: str, modulus: int = 100) -> np.ndarray:
+    """``int(md5((str(uid) + salt).encode()).hexdigest(), 16) % modulus`` for every id"""
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    salt_bytes = salt.encode()
+    result = np.empty(len(user_ids), dtype=np.int64)
+    if not len(user_ids):
+        return result
+
+    unique_ids, inverse = np.unique(user_ids, return_inverse=True)
+    unique_result = np.empty(len(unique_ids), dtype=np.int64)
+    fast = unique_ids >= 0
+    max_digits = len(str(int(unique_ids[fast].max()))) if fast.any() else 0
+    if fast.any() and max_digits + len(salt_bytes) <= 55:
+        digest = _md5_words(_md5_message_blocks(unique_ids[fast], salt_bytes))
+        digest_bytes = digest.astype("<u4").view(np.uint8).reshape(-1, 16)
+        remainder = np.zeros(len(digest_bytes), dtype=np.int64)
+        for column in range(16):
+            remainder = (remainder * 256 + digest_bytes[:, column]) % modulus
+        unique_result[fast] = remainder
+    else:
+        fast[:] = False
+    # Negative ids and long salts do not fit the one-block fast path
+    for index in np.flatnonzero(~fast):
+        digest = hashlib.md5((str(int(unique_ids[index])) + salt).encode()).hexdigest()
+        unique_result[index] = int(digest, 16) % modulus
+
+    result[:] = unique_result[inverse.ravel()]
+    return result
+
+
+def assign_buckets(user_ids, salt: str = NOTEBOOK_BUCKET_SALT, n_buckets: int = 100) -> np.ndarray:
+    """Analysis buckets as assigned in the hitrate notebook"""
+    return md5_mod(user_ids, salt, n_buckets)
+
+
+def assign_arms(user_ids, salt: str, group_a_percentage: int) -> np.ndarray:
+    """Vectorized ``get_exp_group`` for the two-arm split"""
+    return np.where(md5_mod(user_ids, salt, 100) < group_a_percentage, "control", "test")
+
+
+def bucket_metrics(user_ids, exp_groups, values, salt: str = NOTEBOOK_BUCKET_SALT,
+                   n_buckets: int = 100) -> pd.DataFrame:
+    """Per (exp_group, bucket) sums, view counts and the bucket ratio metric"""
+    buckets = assign_buckets(user_ids, salt, n_buckets)
+    arm_codes, arms = pd.factorize(np.asarray(exp_groups), sort=True)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+
+    cells = arm_codes * n_buckets + buckets
+    size = len(arms) * n_buckets
+    sums = np.bincount(cells[valid], weights=values[valid], minlength=size)
+    views = np.bincount(cells[valid], minlength=size)
+
+    frame = pd.DataFrame({
+        "exp_group": np.repeat(np.asarray(arms), n_buckets),
+        "bucket": np.tile(np.arange(n_buckets), len(arms)),
+        "value": sums,
+        "views": views,
+    })
+    frame = frame[frame["views"] > 0].reset_index(drop=True)
+    frame["metric"] = frame["value"] / frame["views"]
+    return frame
+
+
+def _bootstrap_worker(args):
+    control, treatment, n_resamples, seed = args
+    rng = np.random.default_rng(seed)
+    control_idx = rng.integers(0, len(control), (n_resamples, len(control)))
+    treatment_idx = rng.integers(0, len(treatment), (n_resamples, len(treatment)))
+    return (treatment[treatment_idx].mean(axis=1)
+            - control[control_idx].mean(axis=1))
+
+
+def bootstrap_difference(control, treatment, n_resamples: int = 10000, n_jobs: int = 1,
+                         seed: int = 0, chunk: int = 2000) -> np.ndarray:
+    """Bootstrap distribution of mean(treatment) - mean(control) over buckets"""
+    control = np.asarray(control, dtype=np.float64)
+    treatment = np.asarray(treatment, dtype=np.float64)
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(control, treatment, size, s) for size, s in zip(sizes, seeds)]
+
+    if n_jobs == 1:
+        parts = [_bootstrap_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_bootstrap_worker, tasks))
+    return np.concatenate(parts)
+
+
+def compare_arms(buckets: pd.DataFrame, control: str = "control", treatment: str = "test",
+                 n_resamples: int = 10000, n_jobs: int = 1, alpha: float = 0.05,
+                 seed: int = 0) -> dict:
+    """Bootstrap CI, t-test and Mann-Whitney on bucket-level metrics"""
+    a = buckets.loc[buckets["exp_group"] == control, "metric"].to_numpy()
+    b = buckets.loc[buckets["exp_group"] == treatment, "metric"].to_numpy()
+    diffs = bootstrap_difference(a, b, n_resamples, n_jobs, seed)
+    low, high = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    p_bootstrap = min(1.0, 2 * min((diffs <= 0).mean(), (diffs >= 0).mean()))
+    return {
+        "control": control,
+        "treatment": treatment,
+        "control_mean": float(a.mean()),
+        "treatment_mean": float(b.mean()),
+        "difference": float(b.mean() - a.mean()),
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "p_bootstrap": float(p_bootstrap),
+        "p_ttest": float(ttest_ind(a, b).pvalue),
+        "p_mannwhitney": float(mannwhitneyu(a, b).pvalue),
+        "buckets": [int(len(a)), int(len(b))],
+    }
+
+
+def main():
+    from app.analytics.evaluation import LikeIndex, iter_view_metrics, WINDOW_SECONDS
+
+    parser = argparse.ArgumentParser(description="Bucketed A/B test on served recommendations")
+    parser.add_argument("--views", required=True)
+    parser.add_argument("--likes", required=True)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--metric", default="hitrate",
+                        choices=["hitrate", "precision", "recall", "ndcg"])
+    parser.add_argument("--window", type=int, default=WINDOW_SECONDS)
+    parser.add_argument("--salt", default=NOTEBOOK_BUCKET_SALT)
+    parser.add_argument("--buckets", type=int, default=100)
+    parser.add_argument("--control", default="control")
+    parser.add_argument("--treatment", default="test")
+    parser.add_argument("--bootstrap", type=int, default=10000)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    likes = LikeIndex.from_csv(args.likes, args.window, args.chunksize)
+    parts = [
+        bucket_metrics(m["user_id"], m["exp_group"], m[args.metric], args.salt, args.buckets)
+        for m in iter_view_metrics(args.views, likes, args.k, args.chunksize)
+    ]
+    buckets = (pd.concat(parts).groupby(["exp_group", "bucket"], as_index=False)
+               [["value", "views"]].sum())
+    buckets["metric"] = buckets["value"] / buckets["views"]
+
+    result = compare_arms(buckets, args.control, args.treatment,
+                          args.bootstrap, args.jobs)
+    result["metric"] = args.metric
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
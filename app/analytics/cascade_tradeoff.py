@@ -0,0 +1,118 @@
+"""NDCG@K versus latency of cascade ranking for several pre-ranker cut-offs.
+
+For a sample of users the catalog is ranked by the CatBoost model alone and
+through the cascade with each N (pre-ranker keeps N posts, CatBoost ranks
+them). Quality is NDCG@K against labelled interactions when ``--labels`` is
+given (``user_id, post_id, target``), and always against the full model's
+own top K, so the cost of truncation is visible without labels.
+
+Usage:
+    python -m app.analytics.cascade_tradeoff --model final_model.cbm \\
+        --prerank final_model.prerank.npz --users user_data.csv --posts post_data.csv \\
+        --n 100,300,1000 [--labels test_balanced.csv]
+"""
+import argparse
+import json
+from datetime import datetime
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRanker
+from app.core.features import build_features
+from app.core.prerank import BilinearPreRanker
+
+
+def ndcg_at_k(ranked, relevance: dict, k: int = 10) -> float:
+    """NDCG@k of ``ranked`` ids with graded ``relevance`` (missing ids are 0)"""
+    gains = np.array([relevance.get(post_id, 0.0) for post_id in ranked[:k]], dtype=float)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.sort(np.fromiter(relevance.values(), dtype=float))[::-1][:k]
+    idcg = float(ideal @ discounts[:len(ideal)])
+    if idcg == 0:
+        return float("nan")
+    return float(gains @ discounts[:len(gains)]) / idcg
+
+
+def rank_posts(model, user_id, user_row, candidates, time, k):
+    """Top ``k`` post ids of the model over ``candidates``"""
+    df = build_features(user_id, candidates, user_row, time)
+    df["score"] = model.predict(df[list(model.feature_names_)])
+    return df.nlargest(k, "score")["post_id"].to_list()
+
+
+def tradeoff(model, preranker, user_features, post_features, cutoffs, labels=None,
+             sample: int = 200, k: int = 10, time: datetime = None, seed: int = 0) -> pd.DataFrame:
+    """One row per cut-off (0 = full catalog) with quality and latency"""
+    time = time or datetime(2021, 12, 1, 12)
+    preranker = preranker.bind(post_features)
+    users = user_features.sample(min(sample, len(user_features)), random_state=seed)
+    label_groups = {}
+    if labels is not None:
+        label_groups = {
+            user_id: dict(zip(group["post_id"], group["target"].astype(float)))
+            for user_id, group in labels[labels["user_id"].isin(users["user_id"])].groupby("user_id")
+        }
+
+    results = {n: {"latency": [], "ndcg_full": [], "ndcg_labels": []} for n in [0] + list(cutoffs)}
+    for user_id in users["user_id"]:
+        user_row = user_features[user_features["user_id"] == user_id]
+        full_top = None
+        for n in results:
+            start = perf_counter()
+            if n:
+                candidates = post_features.iloc[np.sort(preranker.top_n(user_row, n))]
+            else:
+                candidates = post_features
+            top = rank_posts(model, user_id, user_row, candidates, time, k)
+            results[n]["latency"].append(perf_counter() - start)
+
+            if full_top is None:
+                full_top = {post_id: 1.0 for post_id in top}
+            results[n]["ndcg_full"].append(ndcg_at_k(top, full_top, k))
+            if user_id in label_groups:
+                results[n]["ndcg_labels"].append(ndcg_at_k(top, label_groups[user_id], k))
+
+    full_latency = np.median(results[0]["latency"])
+    rows = []
+    for n, r in results.items():
+        latency = np.median(r["latency"])
+        rows.append({
+            "top_n": n or len(post_features),
+            f"ndcg@{k}_vs_full": float(np.nanmean(r["ndcg_full"])),
+            f"ndcg@{k}_labels": float(np.nanmean(r["ndcg_labels"])) if r["ndcg_labels"] else None,
+            "latency_ms_p50": latency * 1000,
+            "saved_ms_p50": (full_latency - latency) * 1000,
+            "speedup": full_latency / latency,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade ranking quality/latency tradeoff")
+    parser.add_argument("--model", required=True, help="CatBoost .cbm file")
+    parser.add_argument("--prerank", required=True, help="Pre-ranker .npz file")
+    parser.add_argument("--users", required=True, help="user_data.csv")
+    parser.add_argument("--posts", required=True, help="post_data.csv")
+    parser.add_argument("--labels", help="CSV with user_id, post_id, target")
+    parser.add_argument("--n", default="100,200,500,1000,2000", help="Comma separated cut-offs")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print JSON records")
+    args = parser.parse_args()
+
+    model = CatBoostRanker()
+    model.load_model(args.model)
+    report = tradeoff(
+        model, BilinearPreRanker.load(args.prerank),
+        pd.read_csv(args.users), pd.read_csv(args.posts),
+        [int(n) for n in args.n.split(",")],
+        labels=pd.read_csv(args.labels) if args.labels else None,
+        sample=args.sample, k=args.k)
+    if args.json:
+        print(json.dumps(report.to_dict(orient="records"), indent=2))
+    else:
+        print(report.to_string(index=False, float_format="%.4f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Trade CatBoost trees for predict latency.
+
+Evaluates prefixes of a trained ranker (``CatBoostRanker.shrink`` keeps
+the first N trees) on a validation set and times each on a synthetic
+catalog of ``--catalog`` rows resampled from the validation features, the
+size of one request's candidate block. The smallest model whose NDCG@10 is
+within ``--min-quality`` of the full model is written to ``--output``,
+ready to be used as ``MODEL_CONTROL_PATH`` / ``MODEL_TEST_PATH``.
+
+Usage:
+    python -m app.analytics.compress_model --model final_model.cbm \\
+        --validation test_balanced.csv --users user_data.csv --posts post_data.csv \\
+        --output final_model.small.cbm
+"""
+import argparse
+import json
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRanker
+
+
+def ranking_metrics(groups, scores, targets, k_ndcg: int = 10, k_hit: int = 5) -> dict:
+    """Mean NDCG@k_ndcg and HitRate@k_hit over query groups"""
+    groups = np.asarray(groups)
+    scores = np.asarray(scores, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    order = np.lexsort((-scores, groups))
+    groups, targets = groups[order], targets[order]
+
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    rank = np.arange(len(groups)) - np.repeat(starts, sizes)
+    group_index = np.repeat(np.arange(len(starts)), sizes)
+
+    discounts = 1.0 / np.log2(rank + 2.0)
+    in_top = rank < k_ndcg
+    dcg = np.bincount(group_index, weights=np.where(in_top, targets * discounts, 0.0),
+                      minlength=len(starts))
+    # Ideal DCG: the same groups with targets sorted descending
+    ideal_targets = targets[np.lexsort((-targets, group_index))]
+    idcg = np.bincount(group_index, weights=np.where(in_top, ideal_targets * discounts, 0.0),
+                       minlength=len(starts))
+    hits = np.bincount(group_index, weights=(rank < k_hit) & (targets > 0),
+                       minlength=len(starts))
+
+    has_relevant = idcg > 0
+    return {
+        f"ndcg@{k_ndcg}": float(np.mean(dcg[has_relevant] / idcg[has_relevant])),
+        f"hitrate@{k_hit}": float(np.mean(hits[has_relevant] > 0)),
+    }
+
+
+def tree_grid(tree_count: int, steps: int = 8) -> list:
+    """Roughly geometric tree counts up to ``tree_count``"""
+    grid = np.unique(np.geomspace(max(1, tree_count // 2 ** steps), tree_count, steps + 1).round())
+    return [int(n) for n in grid]
+
+
+def time_predict(model, frame: pd.DataFrame, repeats: int = 20) -> float:
+    """Median seconds of one ``predict`` over ``frame``"""
+    model.predict(frame)
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        model.predict(frame)
+        timings.append(perf_counter() - start)
+    return float(np.median(timings))
+
+
+def evaluate_tree_counts(model, validation: pd.DataFrame, tree_counts, group: str = "user_id",
+                         target: str = "target", catalog_size: int = 7000,
+                         repeats: int = 20, seed: int = 0) -> pd.DataFrame:
+    """Quality on ``validation`` and predict latency for each tree count"""
+    features = list(model.feature_names_)
+    catalog = validation[features].sample(
+        catalog_size, replace=True, random_state=seed).reset_index(drop=True)
+
+    rows = []
+    for n in tree_counts:
+        shrunk = model.copy()
+        shrunk.shrink(ntree_end=n)
+        scores = shrunk.predict(validation[features])
+        metrics = ranking_metrics(validation[group], scores, validation[target])
+        rows.append({"trees": n, **metrics,
+                     "predict_ms": time_predict(shrunk, catalog, repeats) * 1000})
+    report = pd.DataFrame(rows)
+    full = report.iloc[-1]
+    report["ndcg_ratio"] = report["ndcg@10"] / full["ndcg@10"]
+    report["speedup"] = full["predict_ms"] / report["predict_ms"]
+    return report
+
+
+def smallest_within(report: pd.DataFrame, min_quality: float) -> int:
+    """Fewest trees whose NDCG@10 is at least ``min_quality`` of the full model"""
+    ok = report[report["ndcg_ratio"] >= min_quality]
+    return int(ok["trees"].min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate and shrink a CatBoost ranker")
+    parser.add_argument("--model", required=True, help="CatBoost .cbm file")
+    parser.add_argument("--validation", required=True,
+                        help="CSV with user_id, post_id, target (plus features or --users/--posts)")
+    parser.add_argument("--users", help="user_data.csv to join on user_id")
+    parser.add_argument("--posts", help="post_data.csv to join on post_id")
+    parser.add_argument("--trees", help="Comma separated tree counts (default: geometric grid)")
+    parser.add_argument("--min-quality", type=float, default=0.99,
+                        help="Required NDCG@10 as a fraction of the full model")
+    parser.add_argument("--catalog", type=int, default=7000, help="Synthetic catalog rows")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="Where to write the smallest acceptable model")
+    parser.add_argument("--json", action="store_true", help="Print JSON records")
+    args = parser.parse_args()
+
+    model = CatBoostRanker()
+    model.load_model(args.model)
+    validation = pd.read_csv(args.validation)
+    if args.posts:
+        validation = validation.merge(pd.read_csv(args.posts), on="post_id", how="left")
+    if args.users:
+        validation = validation.merge(pd.read_csv(args.users), on="user_id", how="left")
+
+    tree_counts = ([int(n) for n in args.trees.split(",")] if args.trees
+                   else tree_grid(model.tree_count_))
+    if tree_counts[-1] != model.tree_count_:
+        tree_counts.append(model.tree_count_)
+    report = evaluate_tree_counts(model, validation, sorted(set(tree_counts)),
+                                  catalog_size=args.catalog, repeats=args.repeats)
+    if args.json:
+        print(json.dumps(report.to_dict(orient="records"), indent=2))
+    else:
+        print(report.to_string(index=False, float_format="%.4f"))
+
+    if args.output:
+        trees = smallest_within(report, args.min_quality)
+        shrunk = model.copy()
+        shrunk.shrink(ntree_end=trees)
+        shrunk.save_model(args.output, format="cbm")
+        print(f"Wrote {args.output} with {trees} of {model.tree_count_} trees")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Parallel, time-budgeted random search over CatBoostRanker settings.
+
+The train and eval pools of a dataset built by ``app.core.training_data``
+are quantized once and saved in CatBoost's binary format. Every worker
+process loads them a single time and reuses them for all of its trials,
+so trials skip feature parsing and quantization (``border_count`` is
+therefore fixed for the whole search).
+
+Each trial samples a configuration from ``SEARCH_SPACE`` and trains with
+``--threads-per-trial`` threads, ``--workers`` trials at a time. A trial
+stops early when:
+    early     - eval NDCG@10 has not improved for ``--early-stopping`` rounds
+    pruned    - at a checkpoint its best NDCG@10 is below the
+                ``--prune-quantile`` of finished trials at that checkpoint
+    deadline  - the search budget (``--budget-minutes``) ran out
+No new trials start once the budget is spent. The leaderboard has eval
+NDCG@10 (best iteration), tree count, fit time and predict latency on a
+``--catalog`` row block (one request's candidates).
+
+Usage:
+    python -m app.analytics.tune_ranker --data training_cache/<key> \\
+        --trials 40 --workers 4 --threads-per-trial 2 --budget-minutes 60 \\
+        --output leaderboard.csv
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRanker, Pool
+from app.analytics.compress_model import time_predict
+from app.core.training_data import TrainingData
+
+FEATURES = ['gender', 'age', 'topic', 'country', 'city', 'os', 'rating']
+CAT_FEATURES = ['topic', 'city', 'os', 'country']
+METRIC = 'NDCG:top=10'
+
+# name: (kind, low, high)
+SEARCH_SPACE = {
+    'depth': ('int', 4, 10),
+    'learning_rate': ('log', 0.02, 0.3),
+    'l2_leaf_reg': ('log', 1.0, 30.0),
+    'random_strength': ('log', 0.1, 10.0),
+    'bagging_temperature': ('uniform', 0.0, 1.0),
+}
+
+
+def sample_params(rng: np.random.Generator, space: dict = SEARCH_SPACE) -> dict:
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def quantize_pools(data: TrainingData, directory: str, features=FEATURES,
+                   cat_features=CAT_FEATURES, border_count: int = 254):
+    """Quantize the train and test parts once; returns their file paths"""
+    train = data.pool(features, cat_features=cat_features, part='train')
+    train.quantize(border_count=border_count)
+    borders = os.path.join(directory, 'borders.tsv')
+    train.save_quantization_borders(borders)
+    test = data.pool(features, cat_features=cat_features, part='test')
+    test.quantize(input_borders=borders)
+
+    paths = os.path.join(directory, 'train.qbin'), os.path.join(directory, 'test.qbin')
+    train.save(paths[0])
+    test.save(paths[1])
+    return paths
+
+
+def prune_reference(results, quantile: float, min_trials: int) -> dict:
+    """Per-checkpoint NDCG@10 a running trial has to reach to continue"""
+    curves = [r['checkpoints'] for r in results if r['stopped'] != 'pruned']
+    if len(curves) < min_trials:
+        return {}
+    reference = {}
+    for iteration in sorted(set().union(*curves)):
+        values = [c[iteration] for c in curves if iteration in c]
+        if len(values) >= min_trials:
+            reference[iteration] = float(np.quantile(values, quantile))
+    return reference
+
+
+class TrialMonitor:
+    """CatBoost callback: stops a trial at the deadline or when it falls behind"""
+
+    def __init__(self, reference: dict, deadline: float, every: int):
+        self.reference = reference
+        self.deadline = deadline
+        self.every = every
+        self.best = -np.inf
+        self.checkpoints = {}
+        self.reason = None
+
+    def after_iteration(self, info) -> bool:
+        self.best = max(self.best, info.metrics['validation'][f'{METRIC};type=Base'][-1])
+        iteration = info.iteration
+        if iteration % self.every == 0:
+            self.checkpoints[iteration] = self.best
+            if self.best < self.reference.get(iteration, -np.inf):
+                self.reason = 'pruned'
+                return False
+        if time.time() > self.deadline:
+            self.reason = 'deadline'
+            return False
+        return True
+
+
+_worker = {}
+
+
+def _init_worker(train_path: str, test_path: str, catalog: pd.DataFrame):
+    """Load the quantized pools once per worker process"""
+    _worker['train'] = Pool('quantized://' + train_path)
+    _worker['test'] = Pool('quantized://' + test_path)
+    _worker['catalog'] = catalog
+
+
+def run_trial(trial: int, params: dict, base_params: dict, reference: dict,
+              deadline: float, checkpoint_every: int, repeats: int) -> dict:
+    monitor = TrialMonitor(reference, deadline, checkpoint_every)
+    model = CatBoostRanker(**base_params, **params)
+    start = time.perf_counter()
+    model.fit(_worker['train'], eval_set=_worker['test'], use_best_model=True,
+              callbacks=[monitor])
+    fit_seconds = time.perf_counter() - start
+
+    curve = model.get_evals_result()['validation'][METRIC + ';type=Base']
+    early = (monitor.reason is None
+             and len(curve) < base_params['iterations'])
+    return {
+        'trial': trial,
+        **params,
+        'ndcg@10': float(max(curve)),
+        'best_iteration': int(np.argmax(curve)),
+        'trees': model.tree_count_,
+        'stopped': monitor.reason or ('early' if early else 'completed'),
+        'fit_seconds': round(fit_seconds, 2),
+        'predict_ms': time_predict(model, _worker['catalog'], repeats) * 1000,
+        'checkpoints': monitor.checkpoints,
+    }
+
+
+def search(data: TrainingData, trials: int = 20, workers: int = 1, threads_per_trial: int = 1,
+           budget_seconds: float = 3600.0, iterations: int = 1000, early_stopping: int = 50,
+           checkpoint_every: int = 50, prune_quantile: float = 0.5, min_trials: int = 3,
+           catalog_size: int = 7000, repeats: int = 10, features=FEATURES,
+           cat_features=CAT_FEATURES, border_count: int = 254, seed: int = 0,
+           work_dir: str = None) -> pd.DataFrame:
+    """Run the search and return the leaderboard, best NDCG@10 first"""
+    if 'train' not in data.parts or 'test' not in data.parts:
+        raise ValueError("The dataset needs 'train' and 'test' parts")
+    deadline = time.time() + budget_seconds
+    rng = np.random.default_rng(seed)
+    base_params = {
+        'iterations': iterations,
+        'loss_function': 'YetiRank',
+        'eval_metric': METRIC,
+        'early_stopping_rounds': early_stopping,
+        'thread_count': threads_per_trial,
+        'random_seed': seed,
+        'verbose': False,
+        'allow_writing_files': False,
+    }
+    catalog = data.frame(features, part='test').sample(
+        catalog_size, replace=True, random_state=seed).reset_index(drop=True)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        train_path, test_path = quantize_pools(data, directory, features, cat_features,
+                                               border_count)
+        results = []
+        pending = set()
+        submitted = 0
+        # CatBoost keeps its own thread pool, which does not survive fork()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(train_path, test_path, catalog)) as pool:
+            while True:
+                while len(pending) < workers and submitted < trials and time.time() < deadline:
+                    reference = prune_reference(results, prune_quantile, min_trials)
+                    pending.add(pool.submit(
+                        run_trial, submitted, sample_params(rng), base_params, reference,
+                        deadline, checkpoint_every, repeats))
+                    submitted += 1
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+
+    leaderboard = pd.DataFrame(results).drop(columns='checkpoints')
+    return leaderboard.sort_values('ndcg@10', ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search for the ranker")
+    parser.add_argument("--data", required=True,
+                        help="Dataset directory written by app.core.training_data (train/test parts)")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--threads-per-trial", type=int, default=2)
+    parser.add_argument("--budget-minutes", type=float, default=60.0)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--early-stopping", type=int, default=50)
+    parser.add_argument("--prune-quantile", type=float, default=0.5,
+                        help="Stop a trial below this quantile of finished trials at a checkpoint")
+    parser.add_argument("--catalog", type=int, default=7000, help="Rows per predict latency call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the leaderboard as CSV")
+    parser.add_argument("--json", action="store_true", help="Print JSON records")
+    args = parser.parse_args()
+
+    leaderboard = search(
+        TrainingData(args.data), trials=args.trials, workers=args.workers,
+        threads_per_trial=args.threads_per_trial, budget_seconds=args.budget_minutes * 60,
+        iterations=args.iterations, early_stopping=args.early_stopping,
+        prune_quantile=args.prune_quantile, catalog_size=args.catalog, seed=args.seed)
+    if args.output:
+        leaderboard.to_csv(args.output, index=False)
+    if args.json:
+        print(json.dumps(leaderboard.to_dict(orient="records"), indent=2))
+    else:
+        print(leaderboard.to_string(index=False, float_format="%.4f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.api import feedback, recommendations
+from app.core.memory import AllocationTrace, memory_report
+from app.core.profiler import StackSampler, ProfilerGate, ProfilerBusyError
+from app.core.logging_config import get_logger
+from app.config import ADMIN_TOKEN, PROFILER_MAX_SECONDS, PROFILER_COOLDOWN_SECONDS
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+profiler_gate = ProfilerGate(cooldown=PROFILER_COOLDOWN_SECONDS)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only when it carries the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/profile", response_class=PlainTextResponse,
+            dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    focus: str = Query("app.", description="Keep only stacks through modules with this prefix; empty keeps all"),
+):
+    """Sample stacks of the live worker and return them in collapsed format"""
+    seconds = min(seconds, PROFILER_MAX_SECONDS)
+
+    try:
+        profiler_gate.acquire()
+    except ProfilerBusyError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)})
+
+    logger.info(
+        "Starting stack profile for %ss at %sms interval", seconds, interval_ms)
+    sampler = StackSampler(interval=interval_ms / 1000.0, focus=focus)
+    try:
+        sampler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+        profiler_gate.release()
+
+    logger.info(
+        "Stack profile finished: %d samples, %d unique stacks",
+        sampler.samples, len(sampler.stacks))
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={"X-Profile-Samples": str(sampler.samples)})
+
+
+def memory_components() -> dict:
+    """Long-lived serving state, biggest first; later entries skip what earlier ones hold"""
+    components = {
+        "user_features": recommendations.user_features,
+        "post_features": recommendations.post_features,
+    }
+    if recommendations.experiments is not None:
+        for arm, model in recommendations.experiments.loaded_models().items():
+            components[f"model:{arm}"] = model
+    service = recommendations.recommender_service
+    if service is not None:
+        components.update({
+            "seen_filter": service.seen,
+            "precomputed": service.precomputed,
+            "prerank": service.cascade,
+            "segment_cache": service.segment_cache,
+            "recommender": service,
+        })
+    components.update({
+        "recent_likes": feedback.recent_likes,
+        "feedback_buffer": feedback.feedback_ingestor,
+        "exposure_buffer": recommendations.exposure_logger,
+        "shadow": recommendations.shadow_scorer,
+    })
+    return components
+
+
+@router.get("/memory", dependencies=[Depends(require_admin)])
+async def memory(
+    trace_seconds: float = Query(0.0, ge=0, description="Trace allocations of live traffic for this long; 0 skips tracing"),
+    top: int = Query(20, ge=1, le=200),
+):
+    """Deep memory usage per component, optionally with top allocation sites"""
+    trace = None
+    if trace_seconds > 0:
+        trace_seconds = min(trace_seconds, PROFILER_MAX_SECONDS)
+        try:
+            profiler_gate.acquire()
+        except ProfilerBusyError as e:
+            raise HTTPException(
+                status_code=429, detail=str(e),
+                headers={"Retry-After": str(int(e.retry_after) + 1)})
+
+        logger.info("Tracing allocations for %.1fs", trace_seconds)
+        tracer = AllocationTrace().start()
+        try:
+            await asyncio.sleep(trace_seconds)
+        finally:
+            try:
+                # The snapshot and its grouping into sites are slow with deep
+                # tracebacks; the gate stays held until they are done
+                trace = await asyncio.to_thread(tracer.stop, top)
+            finally:
+                profiler_gate.release()
+        trace["seconds"] = trace_seconds
+
+    # Walking large object columns takes a while; keep the event loop free
+    report = await asyncio.to_thread(memory_report, memory_components())
+    if trace is not None:
+        report["allocations"] = trace
+    return report
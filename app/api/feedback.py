@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, HTTPException
+from app.schemas.schemas import FeedbackBatch, FeedbackAccepted
+from app.core.feedback import (
+    RecentLikes,
+    FeedAction,
+    BufferFullError,
+    create_feedback_ingestor
+)
+from app.core.logging_config import get_logger
+from app.config import FEEDBACK_MAX_REQUEST_ACTIONS
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+# Likes accepted but not yet in feed_action; read by the recommendation handler
+recent_likes = RecentLikes()
+feedback_ingestor = None
+# Ids of the loaded user and post features; other ids would violate the
+# feed_action foreign keys and are rejected up front
+known_users = None
+known_posts = None
+
+
+def initialize_feedback(seen=None, user_ids=None, post_ids=None):
+    """Start the feedback writer - called from initialize_services"""
+    global feedback_ingestor, known_users, known_posts
+    known_users = pd.Index(user_ids).unique() if user_ids is not None else None
+    known_posts = pd.Index(post_ids).unique() if post_ids is not None else None
+    feedback_ingestor = create_feedback_ingestor(recent_likes, seen=seen)
+    feedback_ingestor.start()
+
+
+def update_known_posts(post_ids):
+    """Accept feedback for the posts of a reloaded catalog"""
+    global known_posts
+    known_posts = pd.Index(post_ids).unique()
+
+
+def unknown_ids(actions) -> dict:
+    """Up to 10 user and post ids per kind that are not in the loaded features"""
+    unknown = {}
+    for kind, known in (("user_id", known_users), ("post_id", known_posts)):
+        if known is None:
+            continue
+        ids = np.array([getattr(a, kind) for a in actions])
+        missing = np.unique(ids[known.get_indexer(ids) < 0])
+        if len(missing):
+            unknown[kind] = missing[:10].tolist()
+    return unknown
+
+
+def shutdown_feedback():
+    """Write pending actions and stop the writer - called during shutdown"""
+    global feedback_ingestor
+    if feedback_ingestor is not None:
+        feedback_ingestor.stop()
+        feedback_ingestor = None
+
+
+@router.post("/feedback/", response_model=FeedbackAccepted, status_code=202)
+def post_feedback(batch: FeedbackBatch):
+    """Accept a batch of likes and views; they are written to feed_action shortly after"""
+    if feedback_ingestor is None:
+        raise HTTPException(
+            status_code=503, detail="Feedback ingestion is not initialized")
+    if len(batch.actions) > FEEDBACK_MAX_REQUEST_ACTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {FEEDBACK_MAX_REQUEST_ACTIONS} actions per request")
+    unknown = unknown_ids(batch.actions)
+    if unknown:
+        raise HTTPException(status_code=400, detail={"unknown_ids": unknown})
+
+    try:
+        accepted = feedback_ingestor.submit(
+            FeedAction(a.user_id, a.post_id, a.action, a.time) for a in batch.actions)
+    except BufferFullError as e:
+        logger.warning("Feedback rejected: %s", e)
+        raise HTTPException(
+            status_code=503, detail="Feedback buffer full",
+            headers={"Retry-After": str(max(1, math.ceil(feedback_ingestor.flush_interval)))})
+
+    return FeedbackAccepted(accepted=accepted)
@@ -1,14 +1,63 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.db.database import get_db
 from app.schemas.schemas import Response
 from app.models.models import Post, Feed
-from app.core.recommender import RecommenderService
-from app.core.model_loader import load_models
+from app.core.recommender import RecommenderService, CatalogReloader
+from app.core.degradation import RECOMMENDATIONS_BY_TIER
+from app.core.experiments import ExperimentRegistry, configured_arms
+from app.core.exposure import create_exposure_logger
+from app.core.shadow import create_shadow_scorer
+from app.core.precompute import HourOfWeekRankings
+from app.core.prerank import BilinearPreRanker, Cascade, parse_top_n
+from app.core.seen_filter import SeenFilter, SeenFilterLoader
+from app.api.feedback import (
+    recent_likes,
+    initialize_feedback,
+    shutdown_feedback,
+    update_known_posts
+)
+from app.db import database
+from app.db.health import db_breaker, DB_DEGRADED
 from app.core.features import load_features
-from app.core.logging_config import get_logger
-from app.config import USER_FEATURES_QUERY, POST_FEATURES_QUERY
+from app.core.logging_config import get_logger, should_log_request
+from app.core.metrics import stage, set_exp_group, current_timings
+from app.core.admission import (
+    AdmissionController,
+    OverloadedError,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT,
+    set_deadline,
+    reset_deadline,
+    remaining_time,
+    track
+)
+from app.config import (
+    USER_FEATURES_QUERY,
+    POST_FEATURES_QUERY,
+    CATALOG_RELOAD_SECONDS,
+    SEGMENT_COLUMNS,
+    PRECOMPUTE_ENABLED,
+    PRERANK_PATH,
+    PRERANK_TOP_N,
+    SEEN_FILTER_ENABLED,
+    SEEN_FILTER_BITS,
+    SEEN_FILTER_HASHES,
+    SEEN_FILTER_POLL_SECONDS,
+    SEEN_FILTER_LOOKBACK_SECONDS,
+    SEEN_FILTER_QUERY,
+    PRECOMPUTE_DEPTH,
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    REQUEST_DEADLINE_MS
+)
 
 logger = get_logger(__name__)
 
@@ -17,38 +66,100 @@ router = APIRouter()
 # Global variables (will be initialized in startup event)
 user_features = None
 post_features = None
-model_control = None
-model_test = None
+experiments = None
 recommender_service = None
+model_versions = {}
+exposure_logger = None
+shadow_scorer = None
+seen_loader = None
+catalog_reloader = None
+
+admission_controller = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+)
+track(admission_controller)
 
 
 def initialize_services():
     """Initialize models and features - called during startup"""
-    global user_features, post_features, model_control, model_test, recommender_service
+    global user_features, post_features, experiments, recommender_service
+    global model_versions, exposure_logger, shadow_scorer, seen_loader, catalog_reloader
 
     logger.info("Initializing recommendation services")
 
     try:
-        # Load features using configurable SQL queries
-        logger.info("Loading user features")
-        user_features = load_features(USER_FEATURES_QUERY)
+        # Features (configurable SQL queries) and the models of the arms that
+        # receive traffic load in parallel; the model thread also pays for
+        # importing catboost while the feature queries wait on the database
+        logger.info("Loading user features, post features and ML models")
+        experiments = ExperimentRegistry(configured_arms())
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+            user_future = pool.submit(load_features, USER_FEATURES_QUERY)
+            post_future = pool.submit(load_features, POST_FEATURES_QUERY)
+            models_future = pool.submit(experiments.preload)
+            user_features = user_future.result()
+            post_features = post_future.result()
+            models_future.result()
+        model_versions = experiments.versions()
+
+        # Challengers are scored off the request path and skipped while
+        # requests are queueing for admission
+        shadow_scorer = create_shadow_scorer(
+            experiments.store, under_load=lambda: admission_controller.queued > 0)
 
-        logger.info("Loading post features")
-        post_features = load_features(POST_FEATURES_QUERY)
+        # Hour-of-week tables are built in the background; requests use the
+        # model until their segment's table is ready
+        precomputed = None
+        if PRECOMPUTE_ENABLED:
+            precomputed = HourOfWeekRankings(SEGMENT_COLUMNS, PRECOMPUTE_DEPTH)
+            precomputed.refresh(
+                {arm: experiments.model(arm) for arm in experiments.active_arms()},
+                model_versions, post_features, user_features)
 
-        # Load models
-        logger.info("Loading ML models")
-        model_control, model_test = load_models()
+        cascade = None
+        if PRERANK_PATH:
+            logger.info("Loading pre-ranker from %s", PRERANK_PATH)
+            cascade = Cascade(BilinearPreRanker.load(PRERANK_PATH), parse_top_n(PRERANK_TOP_N))
+
+        # Viewed posts are loaded in the background and polled afterwards
+        seen = None
+        if SEEN_FILTER_ENABLED:
+            seen = SeenFilter(user_features["user_id"], SEEN_FILTER_BITS, SEEN_FILTER_HASHES)
+            seen_loader = SeenFilterLoader(
+                seen, database.engine, SEEN_FILTER_QUERY,
+                poll_interval=SEEN_FILTER_POLL_SECONDS,
+                lookback=SEEN_FILTER_LOOKBACK_SECONDS)
+            seen_loader.start()
 
         # Initialize recommender service
         logger.info("Initializing recommender service")
         recommender_service = RecommenderService(
-            model_control=model_control,
-            model_test=model_test,
             user_features=user_features,
-            post_features=post_features
+            post_features=post_features,
+            experiments=experiments,
+            shadow=shadow_scorer,
+            precomputed=precomputed,
+            cascade=cascade,
+            seen=seen
         )
 
+        exposure_logger = create_exposure_logger()
+        if exposure_logger is not None:
+            exposure_logger.start()
+
+        # Posted likes and views update the seen filter and liked posts at once
+        initialize_feedback(seen, user_features["user_id"], post_features["post_id"])
+
+        # A reloaded catalog that changed replaces the cached and precomputed
+        # rankings built from the old one
+        if CATALOG_RELOAD_SECONDS > 0:
+            catalog_reloader = CatalogReloader(
+                lambda: load_features(POST_FEATURES_QUERY), swap_catalog,
+                CATALOG_RELOAD_SECONDS, current=post_features)
+            catalog_reloader.start()
+
         logger.info("All services initialized successfully")
 
     except Exception as e:
@@ -56,10 +167,110 @@ def initialize_services():
         raise
 
 
-@router.get("/post/recommendations/", response_model=Response)
+def swap_catalog(new_post_features):
+    """Serve a reloaded post catalog"""
+    global post_features
+    recommender_service.update_catalog(new_post_features)
+    post_features = new_post_features
+    update_known_posts(new_post_features["post_id"])
+
+
+def shutdown_services():
+    """Stop background workers and flush writers - called during shutdown"""
+    global exposure_logger, shadow_scorer, seen_loader, catalog_reloader
+
+    if catalog_reloader is not None:
+        catalog_reloader.stop()
+        catalog_reloader = None
+    shutdown_feedback()
+    if seen_loader is not None:
+        seen_loader.stop()
+        seen_loader = None
+    if shadow_scorer is not None:
+        shadow_scorer.shutdown()
+        shadow_scorer = None
+    if exposure_logger is not None:
+        exposure_logger.stop()
+        exposure_logger = None
+
+
+def services_ready() -> bool:
+    return recommender_service is not None
+
+
+def guarded_query(db: Session, stage_name: str, query):
+    """``query()`` through the database circuit breaker.
+
+    None when the circuit is open or the query fails, in which case the
+    caller serves the stage from memory.
+    """
+    if not db_breaker.allow():
+        DB_DEGRADED.inc(stage_name)
+        return None
+    try:
+        result = query()
+    except PoolTimeoutError as e:
+        # Out of pooled connections or request deadline; the database is not at fault
+        DB_DEGRADED.inc(stage_name)
+        logger.warning("No connection for %s in time, serving from memory: %s", stage_name, e)
+        return None
+    except SQLAlchemyError as e:
+        db_breaker.record_failure()
+        DB_DEGRADED.inc(stage_name)
+        logger.warning("Database query for %s failed, serving from memory: %s", stage_name, e)
+        try:
+            db.rollback()
+        except SQLAlchemyError:
+            pass
+        return None
+    db_breaker.record_success()
+    return result
+
+
+def posts_from_features(post_ids) -> list:
+    """Post id, text and topic of ``post_ids`` from the in-memory post features"""
+    if not {"text", "topic"} <= set(post_features.columns):
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    rows = post_features.loc[post_features["post_id"].isin(post_ids),
+                             ["post_id", "text", "topic"]]
+    by_id = {row.post_id: row for row in rows.itertuples(index=False)}
+    return [{"id": int(post_id), "text": by_id[post_id].text, "topic": by_id[post_id].topic}
+            for post_id in post_ids if post_id in by_id]
+
+
+async def admit_request():
+    """Set the request deadline and hold an admission slot for the request"""
+    token = set_deadline(REQUEST_DEADLINE_MS / 1000.0)
+    try:
+        if not ADMISSION_ENABLED:
+            yield
+            return
+
+        start = perf_counter()
+        try:
+            await admission_controller.acquire(remaining_time())
+        except OverloadedError as e:
+            ADMISSION_REJECTED.inc(e.reason)
+            logger.warning("Request rejected by admission control: %s", e.reason)
+            raise HTTPException(
+                status_code=503, detail="Service overloaded",
+                headers={"Retry-After": str(int(e.retry_after))})
+        ADMISSION_WAIT.observe(perf_counter() - start)
+
+        try:
+            yield
+        finally:
+            admission_controller.release()
+    finally:
+        # The deadline does not outlive the request in a reused context
+        reset_deadline(token)
+
+
+@router.get("/post/recommendations/", response_model=Response,
+            dependencies=[Depends(admit_request)])
 def recommended_posts(user_id: int, time: datetime, limit: int = 5, db: Session = Depends(get_db)):
     """Get post recommendations for a user"""
-    logger.info(f"Received recommendation request for user {user_id}")
+    logger.debug("Received recommendation request for user %s", user_id)
 
     # Validate input parameters
     if limit <= 0 or limit > 100:
@@ -67,47 +278,68 @@ def recommended_posts(user_id: int, time: datetime, limit: int = 5, db: Session
             status_code=400, detail="Limit must be between 1 and 100")
 
     try:
-        # Get user liked posts
-        logger.debug(f"Fetching liked posts for user {user_id}")
-        liked_post_ids = [
-            row[0] for row in (
+        # Get user liked posts. Pending likes are read before the database so
+        # a like being committed meanwhile is still found in one of the two.
+        # Without the database only the pending likes are excluded.
+        with stage("likes"):
+            pending_likes = recent_likes.get(user_id)
+            rows = guarded_query(db, "likes", lambda: (
                 db.query(Feed.post_id)
                 .filter(Feed.user_id == user_id, Feed.action == "like")
                 .distinct()
                 .all()
-            )
-        ]
-        logger.debug(
-            f"Found {len(liked_post_ids)} liked posts for user {user_id}")
+            ))
+            liked_post_ids = [row[0] for row in rows or ()]
+            if pending_likes:
+                liked_post_ids = list(set(liked_post_ids).union(pending_likes))
+        logger.debug("Found %d liked posts for user %s",
+                     len(liked_post_ids), user_id)
 
         # Get recommendations from service
         try:
-            rec_posts, exp_group = recommender_service.recommend(
-                user_id, time, liked_post_ids, limit)
+            # Whatever is left of the request deadline is the ranking budget
+            rec_posts, exp_group, tier = recommender_service.recommend(
+                user_id, time, liked_post_ids, limit,
+                time_budget=remaining_time())
+            set_exp_group(exp_group)
+            RECOMMENDATIONS_BY_TIER.inc(exp_group, tier)
         except KeyError:
-            logger.warning(f"User {user_id} not found in features")
+            logger.warning("User %s not found in features", user_id)
             raise HTTPException(
                 status_code=404, detail=f"User {user_id} not found")
         except Exception as e:
             logger.error(
-                f"Recommendation generation failed for user {user_id}: {e}")
+                "Recommendation generation failed for user %s: %s", user_id, e)
             raise HTTPException(
                 status_code=500, detail="Failed to generate recommendations")
 
-        # Get post details from database
-        logger.debug(
-            f"Fetching {len(rec_posts)} recommended posts from database")
-        recommendations = db.query(Post).filter(Post.id.in_(rec_posts)).all()
+        # Get post details from database, or from the post features without it
+        with stage("posts"):
+            recommendations = guarded_query(db, "posts", lambda: db.query(Post).filter(
+                Post.id.in_(rec_posts)).all())
+            if recommendations is None:
+                recommendations = posts_from_features(rec_posts)
+
+        if exposure_logger is not None:
+            exposure_logger.log(
+                user_id, exp_group, model_versions.get(exp_group, "unknown"),
+                tier, rec_posts, time)
 
         response = Response(exp_group=exp_group,
-                            recommendations=recommendations)
-        logger.info(
-            f"Successfully generated {len(recommendations)} recommendations for user {user_id}")
+                            recommendations=recommendations,
+                            tier=tier)
+
+        # One structured, sampled summary line per request
+        if logger.isEnabledFor(logging.INFO) and should_log_request():
+            logger.info(
+                "recommendation user_id=%s exp_group=%s tier=%s limit=%d liked=%d returned=%d timings=[%s]",
+                user_id, exp_group, tier, limit, len(liked_post_ids),
+                len(recommendations), current_timings())
 
         return response
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in recommendation endpoint: {e}")
+        logger.error("Unexpected error in recommendation endpoint: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
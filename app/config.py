@@ -1,23 +1,24 @@
-from dotenv import load_dotenv
 import os
 from typing import Optional
 
-load_dotenv()
+# Settings are read from the environment only; importing this module does
+# no I/O. `.env` is loaded by the entry points: `uvicorn --env-file .env`
+# for the service and load_dotenv() in the scripts.
 
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
+# Database configuration. LOCAL_DB_PATH runs the service on an embedded
+# SQLite file (built by scripts/build_local_db.py) instead of DATABASE_URL
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH")
+DATABASE_URL = f"sqlite:///{LOCAL_DB_PATH}" if LOCAL_DB_PATH else os.getenv("DATABASE_URL")
 
 # Model configuration
 MODEL_CONTROL_PATH = os.getenv("MODEL_CONTROL_PATH")
 MODEL_TEST_PATH = os.getenv("MODEL_TEST_PATH")
-if not MODEL_CONTROL_PATH or not MODEL_TEST_PATH:
-    raise ValueError(
-        "MODEL_CONTROL_PATH and MODEL_TEST_PATH environment variables are required")
 
 # Feature loading configuration
 CHUNKSIZE = int(os.getenv("CHUNKSIZE", "200000"))
+# Seconds between reloads of the post catalog (POST_FEATURES_QUERY); 0 loads
+# it once at startup. A changed catalog rebuilds the rankings built from it.
+CATALOG_RELOAD_SECONDS = float(os.getenv("CATALOG_RELOAD_SECONDS", "0"))
 
 # SQL Queries for feature loading
 USER_FEATURES_QUERY = os.getenv(
@@ -33,6 +34,19 @@ POST_FEATURES_QUERY = os.getenv(
 AB_TEST_ENABLED = os.getenv("AB_TEST_ENABLED", "False").lower() == "true"
 SALT = os.getenv("SALT", "salt")
 GROUP_A_PERCENTAGE = int(os.getenv("GROUP_A_PERCENTAGE", "50"))
+# Experiment arms as "name:model_path:weight,..."; defaults to control/test
+# built from MODEL_CONTROL_PATH, MODEL_TEST_PATH and GROUP_A_PERCENTAGE.
+# With AB_TEST_ENABLED=false every user is served by DEFAULT_ARM.
+EXPERIMENT_ARMS = os.getenv("EXPERIMENT_ARMS", "")
+DEFAULT_ARM = os.getenv("DEFAULT_ARM", "control")
+
+# Shadow scoring of challenger models, "name:model_path,..."; off when empty
+SHADOW_MODELS = os.getenv("SHADOW_MODELS", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.01"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "8"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+# CatBoost threads per challenger predict; keeps shadow work off most cores
+SHADOW_THREADS = int(os.getenv("SHADOW_THREADS", "1"))
 
 # Database pool configuration
 DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
@@ -40,11 +54,114 @@ DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
 DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
 DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
 
-# Retry configuration
+# Database health: background probe every DB_PROBE_INTERVAL seconds, and a
+# circuit breaker that skips request-path queries for DB_CIRCUIT_RESET_SECONDS
+# after DB_CIRCUIT_FAILURES failures in a row (requests are served from memory)
+DB_PROBE_INTERVAL = float(os.getenv("DB_PROBE_INTERVAL", "5"))
+DB_CIRCUIT_FAILURES = int(os.getenv("DB_CIRCUIT_FAILURES", "5"))
+DB_CIRCUIT_RESET_SECONDS = float(os.getenv("DB_CIRCUIT_RESET_SECONDS", "15"))
+
+# Admission control for the recommendations endpoint
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+# Defaults to the pool capacity, so admitted requests never queue on the pool
+ADMISSION_MAX_CONCURRENCY = int(os.getenv(
+    "ADMISSION_MAX_CONCURRENCY", str(DB_POOL_SIZE + max(DB_MAX_OVERFLOW, 0))))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "250"))
+REQUEST_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", "1000"))
+
+# Degraded ranking tiers used when a request runs out of time
+SEGMENT_COLUMNS = [
+    c.strip() for c in os.getenv("SEGMENT_COLUMNS", "gender,country,os").split(",")
+    if c.strip()
+]
+SEGMENT_CACHE_SIZE = int(os.getenv("SEGMENT_CACHE_SIZE", "10000"))
+SEGMENT_CACHE_DEPTH = int(os.getenv("SEGMENT_CACHE_DEPTH", "200"))
+# Every Nth request that would skip the model runs it anyway to re-measure
+# the stage costs; 0 never probes
+STAGE_PROBE_EVERY = int(os.getenv("STAGE_PROBE_EVERY", "100"))
+
+# Cascade ranking: a bilinear pre-ranker keeps the top N posts for the model.
+# PRERANK_TOP_N is one N for every arm or "arm:N,..."; 0 scores the full catalog
+PRERANK_PATH = os.getenv("PRERANK_PATH", "")
+PRERANK_TOP_N = os.getenv("PRERANK_TOP_N", "0")
+
+# Per-user Bloom filter of viewed posts (see app/core/seen_filter.py for sizing)
+SEEN_FILTER_ENABLED = os.getenv("SEEN_FILTER_ENABLED", "False").lower() == "true"
+SEEN_FILTER_BITS = int(os.getenv("SEEN_FILTER_BITS", "512"))
+SEEN_FILTER_HASHES = int(os.getenv("SEEN_FILTER_HASHES", "4"))
+SEEN_FILTER_POLL_SECONDS = float(os.getenv("SEEN_FILTER_POLL_SECONDS", "60"))
+# Each poll re-reads views this far behind the newest one, for late commits
+SEEN_FILTER_LOOKBACK_SECONDS = float(os.getenv("SEEN_FILTER_LOOKBACK_SECONDS", "300"))
+SEEN_FILTER_QUERY = os.getenv(
+    "SEEN_FILTER_QUERY",
+    "SELECT user_id, post_id, time FROM public.feed_action WHERE action = 'view'"
+)
+
+# Hour-of-week ranking tables for models without per-user features
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "False").lower() == "true"
+PRECOMPUTE_DEPTH = int(os.getenv("PRECOMPUTE_DEPTH", "200"))
+
+# Exposure logging of served recommendations: none, database or file
+EXPOSURE_SINK = os.getenv("EXPOSURE_SINK", "none").lower()
+EXPOSURE_LOG_DIR = os.getenv("EXPOSURE_LOG_DIR", "logs/exposures")
+EXPOSURE_FILE_MAX_BYTES = int(
+    os.getenv("EXPOSURE_FILE_MAX_BYTES", str(64 * 1024 * 1024)))
+EXPOSURE_BUFFER_SIZE = int(os.getenv("EXPOSURE_BUFFER_SIZE", "100000"))
+EXPOSURE_BATCH_SIZE = int(os.getenv("EXPOSURE_BATCH_SIZE", "1000"))
+EXPOSURE_FLUSH_INTERVAL = float(os.getenv("EXPOSURE_FLUSH_INTERVAL", "1.0"))
+
+# Feedback ingestion: buffered bulk inserts into feed_action
+FEEDBACK_BUFFER_SIZE = int(os.getenv("FEEDBACK_BUFFER_SIZE", "200000"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "5000"))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "0.5"))
+FEEDBACK_MAX_REQUEST_ACTIONS = int(os.getenv("FEEDBACK_MAX_REQUEST_ACTIONS", "10000"))
+# Flushes a batch is retried for while the database is unavailable
+FEEDBACK_WRITE_ATTEMPTS = int(os.getenv("FEEDBACK_WRITE_ATTEMPTS", "5"))
+
+# Training data builder (scripts/train_model.py)
+TRAINING_DATA_DIR = os.getenv("TRAINING_DATA_DIR", "training_cache")
+# Rows sampled from the training data to fit the pre-ranker
+PRERANK_TRAIN_ROWS = int(os.getenv("PRERANK_TRAIN_ROWS", "2000000"))
+TRAINING_ACTIONS_QUERY = os.getenv(
+    "TRAINING_ACTIONS_QUERY",
+    "SELECT user_id, post_id, time, "
+    "CASE WHEN action = 'like' THEN 1 ELSE 0 END AS target FROM public.feed_action"
+)
+
+# Text embedding features (scripts/build_text_features.py)
+TEXT_FEATURES_TABLE = os.getenv("TEXT_FEATURES_TABLE", "public.post_text_df")
+TEXT_EMBEDDING_MODEL = os.getenv("TEXT_EMBEDDING_MODEL", "distilbert-base-cased")
+TEXT_EMBEDDING_CACHE = os.getenv("TEXT_EMBEDDING_CACHE", "ml_models/text_embeddings.npz")
+TEXT_CLUSTER_MODEL = os.getenv("TEXT_CLUSTER_MODEL", "ml_models/text_clusters.npz")
+
+# Retry configuration (exponential backoff from RETRY_DELAY with full jitter)
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 RETRY_DELAY = float(os.getenv("RETRY_DELAY", "1.0"))
 
+# Admin endpoints (disabled when ADMIN_TOKEN is not set)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
+PROFILER_COOLDOWN_SECONDS = float(os.getenv("PROFILER_COOLDOWN_SECONDS", "60"))
+
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = os.getenv(
     "LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of requests that emit the per-request summary line
+LOG_REQUEST_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "1.0"))
+
+
+def check_required_settings():
+    """Raise when a setting the service cannot start without is missing.
+
+    Checked at startup rather than on import, so tools and tests can import
+    app modules without the full environment.
+    """
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL (or LOCAL_DB_PATH) environment variable is required")
+    if not MODEL_CONTROL_PATH or not MODEL_TEST_PATH:
+        raise ValueError(
+            "MODEL_CONTROL_PATH and MODEL_TEST_PATH environment variables are required")
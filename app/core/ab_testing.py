@@ -1,6 +1,9 @@
 import hashlib
 from app.config import SALT,GROUP_A_PERCENTAGE
 
+def get_bucket(user_id: int, salt: str = SALT, n_buckets: int = 100) -> int:
+    h = hashlib.md5((str(user_id) + salt).encode()).hexdigest()
+    return int(h, 16) % n_buckets
+
 def get_exp_group(user_id: int) -> str:
-    h = hashlib.md5((str(user_id) + SALT).encode()).hexdigest()
-    return "control" if int(h, 16) % 100 < GROUP_A_PERCENTAGE else "test"
+    return "control" if get_bucket(user_id) < GROUP_A_PERCENTAGE else "test"
@@ -0,0 +1,123 @@
+"""Admission control for the request path.
+
+A fixed number of requests run at once; up to ``max_queue`` more wait in FIFO
+order. Waiting happens on the event loop, so queued requests do not hold
+threadpool threads or DB connections. Requests that cannot be admitted in
+time are rejected with ``OverloadedError``.
+"""
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from time import monotonic
+from typing import Optional
+from app.core.metrics import REGISTRY, Counter, Gauge, Histogram
+
+_deadline = ContextVar("request_deadline", default=None)
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Service overloaded: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded wait queue"""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """Wait for a slot, raise OverloadedError if none frees up in time"""
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise OverloadedError("queue_full")
+
+        wait = self.queue_timeout if timeout is None else min(
+            timeout, self.queue_timeout)
+        if wait <= 0:
+            raise OverloadedError("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A slot handed over by release() keeps in_flight unchanged
+            await asyncio.wait_for(waiter, wait)
+        except asyncio.TimeoutError:
+            raise OverloadedError("queue_timeout")
+        except asyncio.CancelledError:
+            # Client went away after the slot was handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self):
+        """Hand the slot to the oldest live waiter or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+def set_deadline(seconds: float):
+    """Set the deadline of the current request, ``seconds`` from now"""
+    return _deadline.set(monotonic() + seconds)
+
+
+def reset_deadline(token):
+    """Restore the deadline replaced by ``set_deadline`` (its return value)"""
+    _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current request's deadline, None without one"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - monotonic()
+
+
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "recsys_admission_in_flight",
+    "Recommendation requests currently executing"
+))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "recsys_admission_queued",
+    "Recommendation requests waiting for admission"
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "recsys_admission_rejected_total",
+    "Recommendation requests rejected by admission control",
+    ("reason",)
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "recsys_admission_wait_seconds",
+    "Time spent waiting for admission"
+))
+
+
+def track(controller: AdmissionController):
+    """Expose the controller's in-flight and queue counts on /metrics"""
+    ADMISSION_IN_FLIGHT.set_function(lambda: controller.in_flight)
+    ADMISSION_QUEUED.set_function(lambda: controller.queued)
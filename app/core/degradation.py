@@ -0,0 +1,128 @@
+"""Cheaper ranking tiers used when a request is short on time.
+
+Tiers, from most to least expensive:
+    model   - full catalog scored by the arm's model
+    precomputed - the model's hour-of-week ranking for the user segment
+                  (same result as ``model``, see ``app.core.precompute``)
+    segment - ranking cached from a recent model run for the same user segment
+    popular - precomputed popularity list
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from app.core.metrics import REGISTRY, Counter
+
+TIER_MODEL = "model"
+TIER_PRECOMPUTED = "precomputed"
+TIER_SEGMENT = "segment"
+TIER_POPULAR = "popular"
+
+RECOMMENDATIONS_BY_TIER = REGISTRY.register(Counter(
+    "recsys_recommendations_total",
+    "Recommendation responses by experiment group and ranking tier",
+    ("exp_group", "tier")
+))
+
+
+class StageCostEstimator:
+    """Exponentially weighted moving average of stage durations.
+
+    A stage is only measured when it runs, so an estimate raised by one
+    slow call would keep the stage skipped for good. ``probe`` lets every
+    ``probe_every``-th request that would skip run the stages anyway, and
+    the new measurements bring the estimate back down.
+    """
+
+    def __init__(self, alpha: float = 0.2, probe_every: int = 100):
+        self.alpha = alpha
+        self.probe_every = probe_every
+        self._costs = {}
+        self._skips = 0
+        self._lock = threading.Lock()
+
+    def update(self, name: str, seconds: float):
+        previous = self._costs.get(name)
+        self._costs[name] = seconds if previous is None else (
+            self.alpha * seconds + (1 - self.alpha) * previous)
+
+    def estimate(self, *names) -> float:
+        return sum(self._costs.get(name, 0.0) for name in names)
+
+    def probe(self) -> bool:
+        """Called instead of skipping; True when this request should run the stages"""
+        if self.probe_every <= 0:
+            return False
+        with self._lock:
+            self._skips += 1
+            return self._skips % self.probe_every == 0
+
+
+class SegmentRankingCache:
+    """Bounded LRU of ranked post ids per (exp_group, user segment)"""
+
+    def __init__(self, columns, max_segments: int = 10000, depth: int = 200):
+        self.columns = list(columns)
+        self.max_segments = max_segments
+        self.depth = depth
+        self._rankings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rankings)
+
+    def segment_key(self, exp_group: str, user_row: pd.DataFrame):
+        """Key of the user's segment, None if the segment columns are missing"""
+        if not self.columns or any(c not in user_row.columns for c in self.columns):
+            return None
+        values = user_row.iloc[0]
+        return (exp_group,) + tuple(values[c] for c in self.columns)
+
+    def put(self, key, ranked_post_ids):
+        if key is None:
+            return
+        ranking = np.asarray(ranked_post_ids[:self.depth], dtype=np.int32)
+        with self._lock:
+            self._rankings[key] = ranking
+            self._rankings.move_to_end(key)
+            while len(self._rankings) > self.max_segments:
+                self._rankings.popitem(last=False)
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            ranking = self._rankings.get(key)
+            if ranking is not None:
+                self._rankings.move_to_end(key)
+            return ranking
+
+    def invalidate(self):
+        with self._lock:
+            self._rankings.clear()
+
+
+def popularity_ranking(post_features: pd.DataFrame) -> np.ndarray:
+    """Post ids ordered by the ``rating`` feature, catalog order without it"""
+    if "rating" in post_features.columns:
+        ordered = post_features.sort_values(
+            "rating", ascending=False, kind="stable")
+    else:
+        ordered = post_features
+    if "post_id" in ordered.columns:
+        return ordered["post_id"].to_numpy()
+    return ordered.index.to_numpy()
+
+
+def top_unliked(ranking: np.ndarray, liked_posts, limit: int, exclude=None) -> list:
+    """First ``limit`` ids of ``ranking`` that the user has not liked.
+
+    ``exclude`` maps ids to a mask of posts to move behind the rest (e.g.
+    already seen ones); they are only served when nothing else is left.
+    """
+    if len(liked_posts):
+        ranking = ranking[~np.isin(ranking, np.asarray(liked_posts))]
+    if exclude is not None and len(ranking):
+        seen = exclude(ranking)
+        ranking = np.concatenate([ranking[~seen], ranking[seen]])
+    return ranking[:limit].tolist()
@@ -0,0 +1,160 @@
+"""Experiment registry: N weighted arms, each served by a model file.
+
+Users are hashed into ``n_buckets`` buckets with ``get_bucket`` and the
+bucket -> arm table is built once, so assigning a request is a hash plus a
+tuple lookup. Models are resolved through a ``ModelStore``: arms sharing a
+file share one model, and models of arms that never receive traffic are not
+loaded unless asked for.
+"""
+import threading
+from typing import NamedTuple, Optional
+from app.core.ab_testing import get_bucket
+from app.core.logging_config import get_logger
+from app.core.model_loader import ModelStore, model_version
+from app.config import (
+    AB_TEST_ENABLED,
+    SALT,
+    GROUP_A_PERCENTAGE,
+    EXPERIMENT_ARMS,
+    DEFAULT_ARM,
+    MODEL_CONTROL_PATH,
+    MODEL_TEST_PATH
+)
+
+logger = get_logger(__name__)
+
+
+class Arm(NamedTuple):
+    name: str
+    model_path: Optional[str]
+    weight: float
+
+
+def parse_arms(spec: str) -> list:
+    """Parse ``"name:model_path:weight,..."`` into arms"""
+    arms = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            name, rest = item.split(":", 1)
+            path, weight = rest.rsplit(":", 1)
+            arms.append(Arm(name.strip(), path.strip(), float(weight)))
+        except ValueError:
+            raise ValueError(f"Invalid experiment arm '{item}', expected name:path:weight")
+    return arms
+
+
+def configured_arms() -> list:
+    """Arms from EXPERIMENT_ARMS, or the classic control/test pair"""
+    if EXPERIMENT_ARMS:
+        return parse_arms(EXPERIMENT_ARMS)
+    return [
+        Arm("control", MODEL_CONTROL_PATH, GROUP_A_PERCENTAGE),
+        Arm("test", MODEL_TEST_PATH, 100 - GROUP_A_PERCENTAGE),
+    ]
+
+
+def build_bucket_table(arms, n_buckets: int = 100) -> tuple:
+    """Bucket -> arm name; arm i owns a contiguous range sized by its weight.
+
+    Boundaries are rounded cumulative weights, so a control/test split of
+    p/(100 - p) gives buckets below p to control, like ``get_exp_group``.
+    """
+    total = sum(arm.weight for arm in arms)
+    if total <= 0:
+        raise ValueError("Experiment arm weights must sum to a positive value")
+    table = []
+    cumulative = 0.0
+    for arm in arms:
+        cumulative += arm.weight
+        boundary = round(cumulative / total * n_buckets)
+        table.extend([arm.name] * (boundary - len(table)))
+    return tuple(table)
+
+
+class ExperimentRegistry:
+    """Assigns users to arms and resolves the model serving each arm"""
+
+    def __init__(self, arms, salt: str = SALT, enabled: bool = AB_TEST_ENABLED,
+                 default_arm: str = DEFAULT_ARM, store: Optional[ModelStore] = None,
+                 n_buckets: int = 100):
+        arms = list(arms)
+        if not arms:
+            raise ValueError("At least one experiment arm is required")
+        names = [arm.name for arm in arms]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate experiment arm names: {names}")
+        if any(arm.weight < 0 for arm in arms):
+            raise ValueError("Experiment arm weights must be non-negative")
+
+        self.arms = tuple(arms)
+        self.salt = salt
+        self.enabled = enabled
+        self.n_buckets = n_buckets
+        self.default_arm = default_arm if default_arm in names else names[0]
+        self.bucket_table = build_bucket_table(arms, n_buckets)
+        self.store = store if store is not None else ModelStore()
+        self._paths = {arm.name: arm.model_path for arm in arms}
+        self._models = dict.fromkeys(names)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_models(cls, models: dict, weights: dict, **kwargs):
+        """Registry over already loaded models, keyed by arm name"""
+        registry = cls([Arm(name, None, weights[name]) for name in models], **kwargs)
+        registry._models.update(models)
+        return registry
+
+    @property
+    def arm_names(self) -> tuple:
+        return tuple(self._paths)
+
+    def assign(self, user_id: int) -> str:
+        """Arm serving ``user_id``"""
+        if not self.enabled:
+            return self.default_arm
+        return self.bucket_table[get_bucket(user_id, self.salt, self.n_buckets)]
+
+    def model(self, arm: str):
+        """Model of ``arm``, loaded on first use"""
+        model = self._models[arm]
+        if model is None:
+            with self._lock:
+                model = self._models[arm]
+                if model is None:
+                    model = self.store.get(self._paths[arm])
+                    self._models[arm] = model
+        return model
+
+    def loaded_models(self) -> dict:
+        """Models already in memory, keyed by arm"""
+        return {arm: model for arm, model in self._models.items() if model is not None}
+
+    def active_arms(self) -> tuple:
+        """Arms that can receive traffic with the current configuration"""
+        if not self.enabled:
+            return (self.default_arm,)
+        return tuple(dict.fromkeys(self.bucket_table))
+
+    def preload(self):
+        """Load the models of every active arm"""
+        for arm in self.active_arms():
+            self.model(arm)
+        logger.info("Experiment arms %s active, %d model(s) in memory",
+                    ", ".join(self.active_arms()), len(self.store))
+
+    def versions(self) -> dict:
+        """Model version tag of each active arm, for exposure logging"""
+        versions, by_path = {}, {}
+        for arm in self.active_arms():
+            path = self._paths[arm]
+            if path is None:
+                versions[arm] = "unknown"
+                continue
+            key = self.store.key(path)
+            if key not in by_path:
+                by_path[key] = model_version(path)
+            versions[arm] = by_path[key]
+        return versions
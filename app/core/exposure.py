@@ -0,0 +1,214 @@
+"""Buffered logging of served recommendations (exposures).
+
+The request path appends to a bounded in-memory buffer and never blocks:
+when the buffer is full the exposure is dropped and counted. A background
+thread drains the buffer in batches into a sink (Postgres multi-row insert
+or size-rotated append-only CSV files in the ``views.csv`` layout).
+"""
+import csv
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import NamedTuple
+from sqlalchemy import insert
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY, Counter, Gauge
+from app.models.models import ExposureLog
+from app.db import database
+from app.config import (
+    EXPOSURE_SINK,
+    EXPOSURE_LOG_DIR,
+    EXPOSURE_FILE_MAX_BYTES,
+    EXPOSURE_BUFFER_SIZE,
+    EXPOSURE_BATCH_SIZE,
+    EXPOSURE_FLUSH_INTERVAL
+)
+
+logger = get_logger(__name__)
+
+
+class Exposure(NamedTuple):
+    user_id: int
+    exp_group: str
+    model_version: str
+    tier: str
+    post_ids: tuple
+    timestamp: datetime
+
+
+def format_recommendations(post_ids) -> str:
+    """Format ids the way views.csv stores them: ``[12 7 301]``"""
+    return "[" + " ".join(str(int(post_id)) for post_id in post_ids) + "]"
+
+
+class DatabaseExposureSink:
+    """Writes batches into the exposure_log table with one multi-row insert"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        ExposureLog.__table__.create(engine, checkfirst=True)
+
+    def write(self, batch):
+        rows = [
+            {
+                "user_id": e.user_id,
+                "exp_group": e.exp_group,
+                "model_version": e.model_version,
+                "tier": e.tier,
+                "recommendations": format_recommendations(e.post_ids),
+                "timestamp": e.timestamp,
+            }
+            for e in batch
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(insert(ExposureLog.__table__), rows)
+
+    def close(self):
+        pass
+
+
+def unix_seconds(timestamp: datetime) -> int:
+    """Epoch seconds of ``timestamp``; naive request times are taken as UTC"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+
+class FileExposureSink:
+    """Appends batches to CSV files, starting a new file past ``max_bytes``"""
+
+    FIELDS = ["user_id", "exp_group", "model_version", "tier",
+              "recommendations", "timestamp"]
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._file = None
+        self._writer = None
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_new_file(self):
+        if self._file is not None:
+            self._file.close()
+        self._sequence += 1
+        name = "exposures-{}-{:05d}.csv".format(
+            datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S"), self._sequence)
+        self._file = open(os.path.join(self.directory, name),
+                          "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.FIELDS)
+
+    def write(self, batch):
+        if self._file is None or self._file.tell() >= self.max_bytes:
+            self._open_new_file()
+        self._writer.writerows(
+            (e.user_id, e.exp_group, e.model_version, e.tier,
+             format_recommendations(e.post_ids), unix_seconds(e.timestamp))
+            for e in batch
+        )
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+EXPOSURES_DROPPED = REGISTRY.register(Counter(
+    "recsys_exposures_dropped_total",
+    "Exposures dropped because the buffer was full or the sink failed",
+    ("reason",)
+))
+EXPOSURES_WRITTEN = REGISTRY.register(Counter(
+    "recsys_exposures_written_total",
+    "Exposures written to the sink"
+))
+EXPOSURE_BUFFER = REGISTRY.register(Gauge(
+    "recsys_exposure_buffer_size",
+    "Exposures waiting in the in-memory buffer"
+))
+
+
+class ExposureLogger:
+    """Bounded exposure buffer with a background batch writer"""
+
+    def __init__(self, sink, max_buffer: int = 100000, batch_size: int = 1000,
+                 flush_interval: float = 1.0):
+        self.sink = sink
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def log(self, user_id, exp_group, model_version, tier, post_ids, timestamp):
+        """Queue an exposure; never blocks, drops when the buffer is full"""
+        if len(self._buffer) >= self.max_buffer:
+            EXPOSURES_DROPPED.inc("buffer_full")
+            return False
+        self._buffer.append(Exposure(
+            user_id, exp_group, model_version, tier, tuple(post_ids), timestamp))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Write everything currently buffered, in batches"""
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            try:
+                self.sink.write(batch)
+                EXPOSURES_WRITTEN.inc(amount=len(batch))
+            except Exception as e:
+                EXPOSURES_DROPPED.inc("sink_error", amount=len(batch))
+                logger.error("Failed to write %d exposures: %s", len(batch), e)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        EXPOSURE_BUFFER.set_function(lambda: len(self._buffer))
+        self._thread = threading.Thread(
+            target=self._run, name="exposure-writer", daemon=True)
+        self._thread.start()
+        logger.info("Exposure logger started with %s",
+                    type(self.sink).__name__)
+
+    def stop(self):
+        """Stop the writer thread after a final flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.sink.close()
+
+
+def create_exposure_logger(sink_name: str = EXPOSURE_SINK, engine=None):
+    """Build the configured exposure logger, None when logging is disabled"""
+    if sink_name == "none":
+        return None
+    if sink_name == "database":
+        sink = DatabaseExposureSink(engine or database.engine)
+    elif sink_name == "file":
+        sink = FileExposureSink(EXPOSURE_LOG_DIR, EXPOSURE_FILE_MAX_BYTES)
+    else:
+        raise ValueError(f"Unknown exposure sink: {sink_name}")
+    return ExposureLogger(
+        sink,
+        max_buffer=EXPOSURE_BUFFER_SIZE,
+        batch_size=EXPOSURE_BATCH_SIZE,
+        flush_interval=EXPOSURE_FLUSH_INTERVAL
+    )
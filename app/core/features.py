@@ -2,7 +2,7 @@ import pandas as pd
 from sqlalchemy import create_engine
 from app.config import DATABASE_URL, CHUNKSIZE
 from app.core.logging_config import get_logger
-from app.db.database import retry_on_failure
+from app.db.database import attach_public_schema, retry_on_failure
 from datetime import datetime
 
 logger = get_logger(__name__)
@@ -12,7 +12,7 @@ logger = get_logger(__name__)
 def batch_load_sql(query: str) -> pd.DataFrame:
     """Load data from database in chunks with error handling"""
     logger.info(f"Loading data with query: {query[:100]}...")
-    engine = create_engine(DATABASE_URL)
+    engine = attach_public_schema(create_engine(DATABASE_URL))
     conn = engine.connect().execution_options(stream_results=True)
     chunks = []
 
@@ -40,12 +40,12 @@ def load_features(query: str) -> pd.DataFrame:
 
 def build_features(user_id: int, post_features: pd.DataFrame, user_features: pd.DataFrame, time: datetime):
     """Build features for recommendation with logging"""
-    logger.debug(f"Building features for user {user_id}")
+    logger.debug("Building features for user %s", user_id)
 
     user_row = user_features[user_features["user_id"] == user_id]
     if user_row.empty:
         logger.warning(
-            f"User {user_id} not found in user features - cold start")
+            "User %s not found in user features - cold start", user_id)
         return pd.DataFrame()  # cold start
 
     df = post_features.merge(user_row, how="cross")
@@ -53,5 +53,5 @@ def build_features(user_id: int, post_features: pd.DataFrame, user_features: pd.
     df["hour"] = time.hour
 
     logger.debug(
-        f"Built features for user {user_id}: {len(df)} post-user combinations")
+        "Built features for user %s: %d post-user combinations", user_id, len(df))
     return df
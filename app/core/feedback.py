@@ -0,0 +1,262 @@
+"""Ingestion of feed actions (likes and views) posted by clients.
+
+Accepted actions are applied to in-process state at once (recent likes,
+the seen-post filter) and buffered for a background thread that writes
+them to ``feed_action`` with multi-row inserts, every ``batch_size``
+actions or ``flush_interval`` seconds. A like stays in ``RecentLikes``
+until its row is committed. Readers take the overlay *before* querying
+the database, so a like is always visible in one of the two.
+
+A batch that violates a constraint is written row by row, so only the
+offending rows are dropped. A batch that fails for any other reason
+(database down) is retried at the next flush, up to ``max_attempts``
+flushes, before it is dropped.
+"""
+import threading
+from collections import deque
+from typing import NamedTuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY, Counter, Gauge
+from app.models.models import Feed
+from app.db import database
+from app.config import (
+    FEEDBACK_BUFFER_SIZE,
+    FEEDBACK_BATCH_SIZE,
+    FEEDBACK_FLUSH_INTERVAL,
+    FEEDBACK_WRITE_ATTEMPTS
+)
+
+logger = get_logger(__name__)
+
+FEEDBACK_RECEIVED = REGISTRY.register(Counter(
+    "recsys_feedback_received_total",
+    "Feed actions accepted by the feedback endpoint",
+    ("action",)
+))
+FEEDBACK_WRITTEN = REGISTRY.register(Counter(
+    "recsys_feedback_written_total",
+    "Feed actions written to feed_action"
+))
+FEEDBACK_DROPPED = REGISTRY.register(Counter(
+    "recsys_feedback_dropped_total",
+    "Feed actions rejected or lost",
+    ("reason",)
+))
+FEEDBACK_BUFFER = REGISTRY.register(Gauge(
+    "recsys_feedback_buffer_size",
+    "Feed actions waiting to be written"
+))
+
+
+class FeedAction(NamedTuple):
+    user_id: int
+    post_id: int
+    action: str
+    time: object
+
+
+class BufferFullError(Exception):
+    """Raised when a batch does not fit into the ingest buffer"""
+
+
+class RecentLikes:
+    """Likes accepted but not yet committed to feed_action"""
+
+    def __init__(self):
+        self._likes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(posts) for posts in self._likes.values())
+
+    def add(self, user_id: int, post_id: int):
+        with self._lock:
+            self._likes.setdefault(user_id, {})
+            self._likes[user_id][post_id] = self._likes[user_id].get(post_id, 0) + 1
+
+    def committed(self, user_id: int, post_id: int):
+        with self._lock:
+            posts = self._likes.get(user_id)
+            if posts is None or post_id not in posts:
+                return
+            posts[post_id] -= 1
+            if not posts[post_id]:
+                del posts[post_id]
+            if not posts:
+                del self._likes[user_id]
+
+    def get(self, user_id: int) -> list:
+        posts = self._likes.get(user_id)
+        return list(posts) if posts else []
+
+
+def _insert_statement(engine):
+    """Multi-row insert that skips rows already in feed_action"""
+    table = Feed.__table__
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+class FeedbackIngestor:
+    """Applies feed actions to in-memory state and writes them in batches"""
+
+    def __init__(self, engine, recent_likes: RecentLikes, seen=None,
+                 max_buffer: int = 200000, batch_size: int = 5000,
+                 flush_interval: float = 0.5, max_attempts: int = 5):
+        self.engine = engine
+        self.recent_likes = recent_likes
+        self.seen = seen
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._statement = _insert_statement(engine)
+        self._buffer = deque()
+        # Batch whose write failed, retried before anything newer
+        self._retry = []
+        self._attempts = 0
+        self._append_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._buffer) + len(self._retry)
+
+    def submit(self, actions) -> int:
+        """Accept a batch of ``FeedAction``; all or nothing when the buffer is full"""
+        actions = list(actions)
+        counts = {}
+        with self._append_lock:
+            if len(self._buffer) + len(actions) > self.max_buffer:
+                FEEDBACK_DROPPED.inc("buffer_full", amount=len(actions))
+                raise BufferFullError(f"{len(self._buffer)} actions already pending")
+            for a in actions:
+                counts[a.action] = counts.get(a.action, 0) + 1
+                if a.action == "like":
+                    self.recent_likes.add(a.user_id, a.post_id)
+            self._buffer.extend(actions)
+
+        if self.seen is not None and actions:
+            self.seen.add_many([a.user_id for a in actions], [a.post_id for a in actions])
+        for action, count in counts.items():
+            FEEDBACK_RECEIVED.inc(action, amount=count)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return len(actions)
+
+    def flush(self):
+        """Write everything currently buffered, in batches.
+
+        Stops at the first batch that cannot be written; it is retried at
+        the next flush.
+        """
+        with self._flush_lock:
+            if self._retry and not self._write(self._retry):
+                return
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                if not self._write(batch):
+                    return
+
+    def _write(self, batch) -> bool:
+        """Write ``batch``; False when (what is left of) it was kept to retry"""
+        pending = deque(batch)
+        try:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(self._statement, [a._asdict() for a in pending])
+            except IntegrityError:
+                self._write_rows(pending)
+            else:
+                FEEDBACK_WRITTEN.inc(amount=len(pending))
+                self._release(pending)
+        except Exception as e:
+            self._attempts += 1
+            if self._attempts < self.max_attempts:
+                logger.warning("Failed to write %d feed actions (attempt %d/%d): %s",
+                               len(pending), self._attempts, self.max_attempts, e)
+                self._retry = list(pending)
+                return False
+            FEEDBACK_DROPPED.inc("db_error", amount=len(pending))
+            logger.error("Dropped %d feed actions after %d attempts: %s",
+                         len(pending), self._attempts, e)
+            self._release(pending)
+        self._retry = []
+        self._attempts = 0
+        return True
+
+    def _write_rows(self, pending: deque):
+        """Insert ``pending`` one row per transaction, dropping rows that violate a constraint.
+
+        Rows leave ``pending`` once written or rejected, so on any other
+        error it holds exactly the rows still to write.
+        """
+        rejected = 0
+        try:
+            while pending:
+                a = pending[0]
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(self._statement, [a._asdict()])
+                    FEEDBACK_WRITTEN.inc()
+                except IntegrityError:
+                    rejected += 1
+                self._release([pending.popleft()])
+        finally:
+            if rejected:
+                FEEDBACK_DROPPED.inc("invalid", amount=rejected)
+                logger.warning("Dropped %d feed actions violating a constraint", rejected)
+
+    def _release(self, batch):
+        # Committed or given up for good: the overlay entry is no longer needed
+        for a in batch:
+            if a.action == "like":
+                self.recent_likes.committed(a.user_id, a.post_id)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        FEEDBACK_BUFFER.set_function(lambda: len(self))
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+        logger.info("Feedback ingestor started (batch %d, every %.2fs)",
+                    self.batch_size, self.flush_interval)
+
+    def stop(self):
+        """Stop the writer thread after a final flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if len(self):
+            FEEDBACK_DROPPED.inc("shutdown", amount=len(self))
+            logger.error("Shutting down with %d feed actions not written", len(self))
+
+
+def create_feedback_ingestor(recent_likes: RecentLikes, seen=None, engine=None):
+    return FeedbackIngestor(
+        engine or database.engine,
+        recent_likes,
+        seen=seen,
+        max_buffer=FEEDBACK_BUFFER_SIZE,
+        batch_size=FEEDBACK_BATCH_SIZE,
+        flush_interval=FEEDBACK_FLUSH_INTERVAL,
+        max_attempts=FEEDBACK_WRITE_ATTEMPTS
+    )
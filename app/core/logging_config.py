@@ -1,18 +1,77 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from app.config import LOG_LEVEL, LOG_FORMAT
+from app.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_FILE,
+    LOG_QUEUE_SIZE,
+    LOG_REQUEST_SAMPLE_RATE
+)
+from app.core.metrics import REGISTRY, Gauge
+
+_queue_handler = None
+_listener = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener lives in this process, so the record is passed as is and
+        # message formatting happens on the listener thread, not the caller's.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+LOG_RECORDS_DROPPED = REGISTRY.register(Gauge(
+    "recsys_log_records_dropped",
+    "Log records dropped because the logging queue was full",
+    function=lambda: _queue_handler.dropped if _queue_handler else 0
+))
 
 
 def setup_logging():
-    """Setup logging configuration for the application"""
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL.upper()),
-        format=LOG_FORMAT,
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('app.log')
-        ]
-    )
+    """Setup logging configuration for the application.
+
+    Callers only enqueue records on a bounded queue; a QueueListener thread
+    formats them and writes to stdout and the log file.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+
+    level = getattr(logging, LOG_LEVEL.upper())
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(LOG_FILE)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
     # Set specific loggers
     loggers = [
@@ -25,7 +84,26 @@ def setup_logging():
 
     for logger_name in loggers:
         logger = logging.getLogger(logger_name)
-        logger.setLevel(getattr(logging, LOG_LEVEL.upper()))
+        logger.setLevel(level)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener = None
+
+
+def should_log_request(sample_rate: float = None) -> bool:
+    """Decide whether the per-request summary line is emitted"""
+    rate = LOG_REQUEST_SAMPLE_RATE if sample_rate is None else sample_rate
+    return rate >= 1.0 or random.random() < rate
 
 
 def get_logger(name: str) -> logging.Logger:
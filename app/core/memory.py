@@ -0,0 +1,193 @@
+"""Memory accounting for the serving process.
+
+``deep_sizeof`` estimates the bytes held by one object graph:
+    DataFrame / Series / Index  - ``memory_usage(deep=True)``
+    numpy arrays                - ``nbytes`` of the array owning the buffer
+    CatBoost models             - size of the serialized model (the trees
+                                  live in native memory, invisible to Python)
+    containers                  - the container plus its items
+    app objects                 - their attributes (``__dict__``/``__slots__``)
+Anything else (locks, threads, engines, functions) counts shallow. Objects
+are counted once per ``seen`` set, so components sharing a frame or a
+model do not count it twice.
+
+``AllocationTrace`` runs tracemalloc over a window and groups live
+allocations by the innermost ``app/`` line on their stack, which names the
+request-path code that caused them even when pandas did the allocating.
+"""
+import gc
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict, deque
+from typing import NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SHALLOW_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), None when unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _array_bytes(array: np.ndarray, seen: set) -> int:
+    owner = array
+    while isinstance(owner.base, np.ndarray):
+        owner = owner.base
+    # Keyed apart from object ids: the owner may be ``array`` itself
+    key = ("buffer", id(owner))
+    if key in seen:
+        return 0
+    seen.add(key)
+    return owner.nbytes if owner.base is None else array.nbytes
+
+
+def _model_bytes(model) -> int:
+    try:
+        return len(model._serialize_model())
+    except Exception:
+        return sys.getsizeof(model)
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by ``obj`` and everything it references"""
+    if seen is None:
+        seen = set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, _SHALLOW_TYPES):
+        return sys.getsizeof(obj)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return _array_bytes(obj, seen)
+    if hasattr(obj, "_serialize_model"):
+        return _model_bytes(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in list(obj.items()))
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(deep_sizeof(item, seen) for item in list(obj))
+
+    # Only walk into our own objects; library internals count shallow
+    if not type(obj).__module__.startswith("app."):
+        return size
+    for name in getattr(type(obj), "__slots__", ()):
+        size += deep_sizeof(getattr(obj, name, None), seen)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes) + sum(
+            deep_sizeof(value, seen) for value in list(attributes.values()))
+    return size
+
+
+def memory_report(components: dict) -> dict:
+    """Bytes per component (in order, shared objects counted once) against RSS"""
+    gc.collect()
+    seen = set()
+    sizes = {name: deep_sizeof(obj, seen) for name, obj in components.items()}
+    accounted = sum(sizes.values())
+    rss = rss_bytes()
+    return {
+        "rss_bytes": rss,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "components": sizes,
+        "accounted_bytes": accounted,
+        "unaccounted_bytes": rss - accounted if rss is not None else None,
+        "threads": threading.active_count(),
+    }
+
+
+def _site(traceback, prefix: str) -> str:
+    """Innermost frame under ``prefix``, else the allocating frame"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(prefix):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(prefix))}:{frame.lineno}"
+    frame = traceback[-1]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def allocation_sites(snapshot: tracemalloc.Snapshot, prefix: str = APP_DIR,
+                     top: int = 20) -> list:
+    """Live allocations whose stack passes through ``prefix``, grouped by site"""
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(True, os.path.join(prefix, "*"), all_frames=True)])
+    sites = defaultdict(lambda: [0, 0])
+    for trace in snapshot.traces:
+        site = sites[_site(trace.traceback, prefix)]
+        site[0] += trace.size
+        site[1] += 1
+    ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return [{"site": site, "bytes": size, "count": count} for site, (size, count) in ranked]
+
+
+class AllocationTrace:
+    """tracemalloc over a window; the peak shows per-request garbage as well"""
+
+    def __init__(self, nframes: int = 25):
+        self.nframes = nframes
+        self._owner = False
+        self._start = 0
+
+    def start(self):
+        self._owner = not tracemalloc.is_tracing()
+        if self._owner:
+            tracemalloc.start(self.nframes)
+        tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self, top: int = 20, prefix: str = APP_DIR) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._owner:
+            tracemalloc.stop()
+        return {
+            "retained_bytes": current - self._start,
+            "peak_bytes": peak - self._start,
+            "top": allocation_sites(snapshot, prefix, top),
+        }
+
+
+class Allocations(NamedTuple):
+    peak_bytes: int
+    retained_bytes: int
+
+
+def measure_allocations(func, *args, **kwargs) -> tuple:
+    """``func(*args, **kwargs)`` and its peak and retained Python allocations"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+        return result, Allocations(peak - base, current - base)
+    finally:
+        if started:
+            tracemalloc.stop()
@@ -0,0 +1,300 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Stage timers are cheap (one ``perf_counter`` pair and a list append) and are
+collected per request in a context variable. When the request finishes the
+collected stages are folded into histograms labeled by experiment group and
+rendered as a ``Server-Timing`` header.
+"""
+import bisect
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for labeled metrics"""
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def collect(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(
+                labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge that is either set explicitly or read from a callback"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = function
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(
+                labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set_function(self, function):
+        """Read the (unlabeled) gauge value from ``function`` at scrape time"""
+        self._function = function
+
+    def value(self, *labelvalues):
+        if self._function is not None and not labelvalues:
+            return self._function()
+        return self._values.get(labelvalues, 0)
+
+    def collect(self):
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [bucket counts (non-cumulative, +Inf last), sum, count]
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def collect(self):
+        with self._lock:
+            items = sorted(
+                (labels, (list(series[0]), series[1], series[2]))
+                for labels, series in self._series.items()
+            )
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labelnames, labels, ('le', _format_value(float(bound))))}"
+                    f" {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {repr(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "recsys_stage_duration_seconds",
+    "Duration of recommendation request stages",
+    ("stage", "exp_group")
+))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "recsys_request_duration_seconds",
+    "Total duration of instrumented requests",
+    ("exp_group",)
+))
+
+
+class RequestTimings:
+    """Stage durations collected during a single request"""
+    __slots__ = ("start", "stages", "exp_group")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.stages = []
+        self.exp_group = "unknown"
+
+    def record(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def server_timing(self, total=None) -> str:
+        """Format the collected stages as a Server-Timing header value"""
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name,
+                 seconds in self.stages]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+    def __str__(self):
+        return self.server_timing()
+
+
+_current_timings = ContextVar("request_timings", default=None)
+
+
+class _Stage:
+    """Context manager that records the wall time of one stage"""
+    __slots__ = ("name", "start", "elapsed")
+
+    def __init__(self, name):
+        self.name = name
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = perf_counter() - self.start
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.record(self.name, self.elapsed)
+        return False
+
+
+def stage(name: str) -> _Stage:
+    """Time a block as a named request stage::
+
+        with stage("predict"):
+            scores = model.predict(X)
+    """
+    return _Stage(name)
+
+
+def begin_request():
+    """Start collecting stage timings for the current request context"""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    return timings, token
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+def set_exp_group(exp_group: str):
+    """Label the current request's timings with its experiment group"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.exp_group = exp_group
+
+
+def end_request(timings: RequestTimings, token=None) -> float:
+    """Fold collected stages into the histograms, return total seconds"""
+    total = perf_counter() - timings.start
+    if token is not None:
+        _current_timings.reset(token)
+    if timings.stages:
+        for name, seconds in timings.stages:
+            STAGE_DURATION.observe(seconds, name, timings.exp_group)
+        REQUEST_DURATION.observe(total, timings.exp_group)
+    return total
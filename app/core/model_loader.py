@@ -1,11 +1,26 @@
-from catboost import CatBoostRanker
 from app.config import MODEL_CONTROL_PATH, MODEL_TEST_PATH
 from app.core.logging_config import get_logger
+import hashlib
 import os
+import sys
+import threading
 
 logger = get_logger(__name__)
 
 
+def import_ranker():
+    """``CatBoostRanker``, importing catboost on first use rather than with this module.
+
+    catboost also imports its Jupyter widget, and IPython with it when that
+    is installed. The service never plots, so the widget is skipped, which
+    saves a few hundred milliseconds per worker start.
+    """
+    if "catboost" not in sys.modules:
+        sys.modules.setdefault("catboost.widget", None)
+    from catboost import CatBoostRanker
+    return CatBoostRanker
+
+
 def load_models():
     """Load ML models with error handling and logging"""
     logger.info("Starting model loading process")
@@ -18,6 +33,8 @@ def load_models():
         raise FileNotFoundError(
             f"Test model file not found: {MODEL_TEST_PATH}")
 
+    CatBoostRanker = import_ranker()
+
     try:
         logger.info(f"Loading control model from {MODEL_CONTROL_PATH}")
         model_control = CatBoostRanker()
@@ -37,6 +54,59 @@ def load_models():
         raise
 
 
+def model_version(path: str) -> str:
+    """Version tag of a model file: its name plus a short content hash"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{os.path.basename(path)}@{digest.hexdigest()[:8]}"
+
+
+def load_model(path: str):
+    """Load a single CatBoost ranker from ``path``"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model file not found: {path}")
+    model = import_ranker()()
+    model.load_model(path)
+    return model
+
+
+class ModelStore:
+    """Loads each model file at most once, on first use.
+
+    Paths are keyed by their real path, so arms that point at the same file
+    (directly or through a symlink) share one in-memory model.
+    """
+
+    def __init__(self, loader=load_model):
+        self.loader = loader
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def key(self, path: str) -> str:
+        return os.path.realpath(path)
+
+    def is_loaded(self, path: str) -> bool:
+        return self.key(path) in self._models
+
+    def get(self, path: str):
+        key = self.key(path)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                logger.info("Loading model from %s", path)
+                model = self.loader(path)
+                self._models[key] = model
+            return model
+
+    def __len__(self):
+        return len(self._models)
+
+
 # Global variables for models (will be initialized in startup event)
 model_control = None
 model_test = None
@@ -0,0 +1,145 @@
+"""Hour-of-week ranking tables for models without per-user features.
+
+``build_features`` only adds ``day_of_week`` and ``hour`` to the post and
+user columns, so a model whose user-side features are all segment columns
+ranks every user of a segment identically within one of the 168
+hour-of-week slots. For such models the catalog is scored once per
+(arm, segment) over all 168 slots in a background thread, and the top
+``depth`` post ids of each slot are kept as an int32 ``(168, depth)``
+array. Requests are then served by lookup plus liked-post filtering.
+
+Tables are tied to the model version and a hash of the catalog they were
+built from; ``refresh`` drops them and rebuilds in the background.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from app.core.degradation import top_unliked
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SLOTS = 7 * 24
+TIME_COLUMNS = ("day_of_week", "hour")
+
+
+def slot_of(time) -> int:
+    """Hour-of-week slot of ``time``, Monday 00:00 is slot 0"""
+    return time.weekday() * 24 + time.hour
+
+
+def catalog_fingerprint(post_features: pd.DataFrame) -> int:
+    return int(pd.util.hash_pandas_object(post_features, index=True).sum())
+
+
+def is_precomputable(model, post_features: pd.DataFrame, segment_columns) -> bool:
+    """True if every model feature is a post, segment or time column"""
+    allowed = set(post_features.columns) | set(segment_columns) | set(TIME_COLUMNS)
+    return set(model.feature_names_) <= allowed
+
+
+def rank_slots(model, post_features: pd.DataFrame, segment_values: dict,
+               depth: int) -> np.ndarray:
+    """Top ``depth`` post ids of every hour-of-week slot, shape (168, depth)"""
+    n_posts = len(post_features)
+    depth = min(depth, n_posts)
+    frame = post_features.iloc[np.tile(np.arange(n_posts), SLOTS)].reset_index(drop=True)
+    for column, value in segment_values.items():
+        frame[column] = value
+    slots = np.repeat(np.arange(SLOTS), n_posts)
+    frame["day_of_week"] = slots // 24
+    frame["hour"] = slots % 24
+
+    scores = np.asarray(model.predict(frame[list(model.feature_names_)])).reshape(SLOTS, n_posts)
+    top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+
+    if "post_id" in post_features.columns:
+        post_ids = post_features["post_id"].to_numpy()
+    else:
+        post_ids = post_features.index.to_numpy()
+    return post_ids[top].astype(np.int32)
+
+
+class HourOfWeekRankings:
+    """Per (arm, segment) hour-of-week tables, built in the background"""
+
+    def __init__(self, segment_columns, depth: int = 200):
+        self.segment_columns = list(segment_columns)
+        self.depth = depth
+        self._tables = {}
+        self._fingerprint = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._tables)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(table.nbytes for table in self._tables.values())
+
+    def lookup(self, segment_key, time, liked_posts, limit: int, exclude=None):
+        """Precomputed top ``limit`` unliked posts, None if not available"""
+        table = self._tables.get(segment_key)
+        if table is None:
+            return None
+        top_posts = top_unliked(table[slot_of(time)], liked_posts, limit, exclude)
+        return top_posts if len(top_posts) == limit else None
+
+    def refresh(self, models: dict, versions: dict, post_features: pd.DataFrame,
+                user_features: pd.DataFrame, background: bool = True, force: bool = False):
+        """Rebuild all tables if the arm models or the catalog changed"""
+        fingerprint = (tuple(sorted(versions.items())), catalog_fingerprint(post_features))
+        if fingerprint == self._fingerprint and not force:
+            return
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._tables = {}
+            self._fingerprint = fingerprint
+
+        eligible = {
+            arm: model for arm, model in models.items()
+            if is_precomputable(model, post_features, self.segment_columns)
+        }
+        if not eligible or any(c not in user_features.columns for c in self.segment_columns):
+            logger.info("No arm qualifies for hour-of-week precompute")
+            return
+        segments = user_features[self.segment_columns].drop_duplicates()
+
+        args = (generation, eligible, post_features, segments)
+        if not background:
+            self._build(*args)
+            return
+        self._thread = threading.Thread(
+            target=self._build, args=args, name="precompute", daemon=True)
+        self._thread.start()
+
+    def _build(self, generation, models, post_features, segments):
+        built = 0
+        for arm, model in models.items():
+            for values in segments.itertuples(index=False, name=None):
+                if generation != self._generation:
+                    logger.info("Precompute generation %d superseded", generation)
+                    return
+                key = (arm,) + values
+                try:
+                    table = rank_slots(
+                        model, post_features,
+                        dict(zip(self.segment_columns, values)), self.depth)
+                except Exception as e:
+                    logger.error("Precompute failed for %s: %s", key, e)
+                    continue
+                with self._lock:
+                    if generation == self._generation:
+                        self._tables[key] = table
+                        built += 1
+        logger.info("Precomputed %d hour-of-week tables (%.1f MB) for arms %s",
+                    built, self.nbytes / 1e6, ", ".join(models))
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
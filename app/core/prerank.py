@@ -0,0 +1,201 @@
+"""Cheap bilinear pre-ranker for cascade ranking.
+
+User and post feature rows are encoded into small dense vectors (bias,
+standardized numeric columns, one-hot of the most frequent categories) and
+scored with ``score = x_user @ W @ x_post``. With the encoded catalog kept
+as a matrix ``P``, scoring every post for a user is a single matrix-vector
+product ``P @ (W.T @ x_user)``; the top N posts then go to CatBoost.
+
+The weights are fitted with mini-batch logistic regression on the same
+interaction data as ``scripts/train_model.py`` and stored as ``.npz``.
+"""
+import json
+import numpy as np
+import pandas as pd
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+USER_NUMERIC = ["gender", "age"]
+USER_CATEGORICAL = ["country", "city", "os"]
+POST_NUMERIC = ["rating"]
+POST_CATEGORICAL = ["topic"]
+
+
+class FeatureEncoder:
+    """Dense encoding: bias, standardized numerics, capped one-hot categories"""
+
+    def __init__(self, numeric, categorical, max_categories: int = 50):
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.max_categories = max_categories
+        self.means = {}
+        self.stds = {}
+        self.vocab = {}
+
+    @property
+    def size(self) -> int:
+        return 1 + len(self.numeric) + sum(len(v) for v in self.vocab.values())
+
+    def fit(self, frame: pd.DataFrame):
+        for column in self.numeric:
+            values = frame[column].astype(float)
+            self.means[column] = float(values.mean())
+            self.stds[column] = float(values.std()) or 1.0
+        for column in self.categorical:
+            counts = frame[column].astype(str).value_counts()
+            self.vocab[column] = list(counts.index[:self.max_categories])
+        return self
+
+    def transform(self, frame: pd.DataFrame) -> np.ndarray:
+        out = np.zeros((len(frame), self.size), dtype=np.float32)
+        out[:, 0] = 1.0
+        offset = 1
+        for column in self.numeric:
+            values = frame[column].to_numpy(dtype=float)
+            out[:, offset] = np.nan_to_num((values - self.means[column]) / self.stds[column])
+            offset += 1
+        rows = np.arange(len(frame))
+        for column in self.categorical:
+            vocab = self.vocab[column]
+            codes = pd.Categorical(frame[column].astype(str), categories=vocab).codes
+            known = codes >= 0
+            out[rows[known], offset + codes[known]] = 1.0
+            offset += len(vocab)
+        return out
+
+    def to_dict(self) -> dict:
+        return {"numeric": self.numeric, "categorical": self.categorical,
+                "max_categories": self.max_categories, "means": self.means,
+                "stds": self.stds, "vocab": self.vocab}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        encoder = cls(data["numeric"], data["categorical"], data["max_categories"])
+        encoder.means, encoder.stds, encoder.vocab = data["means"], data["stds"], data["vocab"]
+        return encoder
+
+
+class BilinearPreRanker:
+    """``sigmoid(x_user @ W @ x_post)`` click model over encoded features"""
+
+    def __init__(self, user_encoder: FeatureEncoder, post_encoder: FeatureEncoder,
+                 weights: np.ndarray = None):
+        self.user_encoder = user_encoder
+        self.post_encoder = post_encoder
+        self.weights = weights
+        self.post_matrix = None
+
+    @classmethod
+    def fit(cls, interactions: pd.DataFrame, target: str = "target",
+            user_numeric=USER_NUMERIC, user_categorical=USER_CATEGORICAL,
+            post_numeric=POST_NUMERIC, post_categorical=POST_CATEGORICAL,
+            epochs: int = 3, learning_rate: float = 0.1, l2: float = 1e-5,
+            batch_size: int = 8192, seed: int = 0):
+        """Fit on rows holding user and post feature columns plus ``target``"""
+        user_encoder = FeatureEncoder(user_numeric, user_categorical).fit(interactions)
+        post_encoder = FeatureEncoder(post_numeric, post_categorical).fit(interactions)
+        y = interactions[target].to_numpy(dtype=np.float32)
+
+        rng = np.random.default_rng(seed)
+        weights = np.zeros((user_encoder.size, post_encoder.size), dtype=np.float32)
+        grad_sq = np.full_like(weights, 1e-8)
+        for epoch in range(epochs):
+            order = rng.permutation(len(interactions))
+            loss = 0.0
+            for start in range(0, len(order), batch_size):
+                batch = interactions.iloc[order[start:start + batch_size]]
+                xu = user_encoder.transform(batch)
+                xp = post_encoder.transform(batch)
+                yb = y[order[start:start + batch_size]]
+                logits = np.einsum("ij,ij->i", xu @ weights, xp)
+                prob = 1.0 / (1.0 + np.exp(-logits))
+                loss += float(-np.sum(yb * np.log(prob + 1e-7)
+                                      + (1 - yb) * np.log(1 - prob + 1e-7)))
+                grad = xu.T @ ((prob - yb)[:, None] * xp) / len(yb) + l2 * weights
+                # Adagrad
+                grad_sq += grad * grad
+                weights -= learning_rate * grad / np.sqrt(grad_sq)
+            logger.info("Pre-ranker epoch %d: logloss %.4f", epoch + 1, loss / len(order))
+        return cls(user_encoder, post_encoder, weights)
+
+    def save(self, path: str):
+        meta = json.dumps({"user": self.user_encoder.to_dict(),
+                           "post": self.post_encoder.to_dict()})
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, meta=np.array(meta))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            weights = data["weights"]
+        return cls(FeatureEncoder.from_dict(meta["user"]),
+                   FeatureEncoder.from_dict(meta["post"]), weights)
+
+    def bind(self, post_features: pd.DataFrame):
+        """Pre-ranker over the encoded catalog; rows keep ``post_features`` order.
+
+        Returns a new pre-ranker sharing the weights, so a bound catalog is
+        never changed under a reader.
+        """
+        bound = BilinearPreRanker(self.user_encoder, self.post_encoder, self.weights)
+        bound.post_matrix = np.ascontiguousarray(self.post_encoder.transform(post_features))
+        return bound
+
+    def score(self, user_row: pd.DataFrame) -> np.ndarray:
+        """Scores of every bound post for the user"""
+        user_vector = self.user_encoder.transform(user_row)[0] @ self.weights
+        return self.post_matrix @ user_vector
+
+    def top_n(self, user_row: pd.DataFrame, n: int) -> np.ndarray:
+        """Catalog row positions of the ``n`` best scored posts (unordered)"""
+        scores = self.score(user_row)
+        if n >= len(scores):
+            return np.arange(len(scores))
+        return np.argpartition(-scores, n - 1)[:n]
+
+
+def parse_top_n(spec: str) -> dict:
+    """Parse ``"300"`` (every arm) or ``"control:300,test:0"`` into ``{arm: n}``.
+
+    The key ``None`` holds the default for arms that are not listed.
+    """
+    spec = spec.strip()
+    if not spec:
+        return {None: 0}
+    if ":" not in spec:
+        return {None: int(spec)}
+    top_n = {None: 0}
+    for item in spec.split(","):
+        arm, _, n = item.strip().partition(":")
+        top_n[arm.strip()] = int(n)
+    return top_n
+
+
+class Cascade:
+    """Picks the candidate posts each arm's model is asked to score.
+
+    A bound cascade keeps the catalog together with its encoding and is not
+    changed afterwards; a new catalog gets a new cascade from ``bind``.
+    """
+
+    def __init__(self, preranker: BilinearPreRanker, top_n: dict,
+                 post_features: pd.DataFrame = None):
+        self.preranker = preranker
+        self.top_n = top_n
+        self.post_features = post_features
+
+    def n_for(self, arm: str) -> int:
+        return self.top_n.get(arm, self.top_n.get(None, 0))
+
+    def bind(self, post_features: pd.DataFrame) -> "Cascade":
+        return Cascade(self.preranker.bind(post_features), self.top_n, post_features)
+
+    def candidates(self, arm: str, user_row: pd.DataFrame) -> pd.DataFrame:
+        """Top N posts of the pre-ranker, or the full bound catalog when N is 0"""
+        n = self.n_for(arm)
+        if n <= 0 or n >= len(self.post_features):
+            return self.post_features
+        # Catalog order keeps score ties broken the same way as without the cascade
+        return self.post_features.iloc[np.sort(self.preranker.top_n(user_row, n))]
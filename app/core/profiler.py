@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from collections import Counter
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one runs or during cooldown"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Profiler unavailable, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _frame_label(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """Wall-clock stack sampler over all interpreter threads.
+
+    A background thread reads ``sys._current_frames()`` every ``interval``
+    seconds and aggregates the stacks in collapsed form (``root;...;leaf``),
+    which flamegraph.pl / speedscope / inferno read directly.
+    """
+
+    def __init__(self, interval: float = 0.005, focus: str = "app."):
+        self.interval = interval
+        self.focus = focus
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample_once(self, own_id):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            matched = not self.focus
+            while frame is not None:
+                label = _frame_label(frame)
+                if not matched and label.startswith(self.focus):
+                    matched = True
+                labels.append(label)
+                frame = frame.f_back
+            if matched:
+                labels.reverse()
+                self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            self._sample_once(own_id)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Return ``stack count`` lines for flame graph tools"""
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.stacks.most_common()
+        ) + ("\n" if self.stacks else "")
+
+
+class ProfilerGate:
+    """Allows a single profile at a time with a cooldown between runs"""
+
+    def __init__(self, cooldown: float):
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_finished = None
+
+    def acquire(self):
+        with self._lock:
+            if self._running:
+                raise ProfilerBusyError(self.cooldown)
+            if self._last_finished is not None:
+                remaining = self.cooldown - \
+                    (time.monotonic() - self._last_finished)
+                if remaining > 0:
+                    raise ProfilerBusyError(remaining)
+            self._running = True
+
+    def release(self):
+        with self._lock:
+            self._running = False
+            self._last_finished = time.monotonic()
@@ -1,21 +1,71 @@
-from app.core.ab_testing import get_exp_group
+import threading
+from time import perf_counter
+from typing import NamedTuple, Optional
 from app.core.features import build_features
 from app.core.logging_config import get_logger
+from app.core.metrics import stage
+from app.core.experiments import ExperimentRegistry
+from app.core.precompute import catalog_fingerprint
+from app.core.degradation import (
+    TIER_MODEL,
+    TIER_PRECOMPUTED,
+    TIER_SEGMENT,
+    TIER_POPULAR,
+    StageCostEstimator,
+    SegmentRankingCache,
+    popularity_ranking,
+    top_unliked
+)
+from app.config import (
+    SEGMENT_COLUMNS,
+    SEGMENT_CACHE_SIZE,
+    SEGMENT_CACHE_DEPTH,
+    STAGE_PROBE_EVERY,
+    GROUP_A_PERCENTAGE
+)
 
 logger = get_logger(__name__)
 
 
+class RecommendationResult(NamedTuple):
+    post_ids: list
+    exp_group: str
+    tier: str = TIER_MODEL
+
+
 class RecommenderService:
-    def __init__(self, model_control, model_test, user_features, post_features):
-        self.model_control = model_control
-        self.model_test = model_test
+    def __init__(self, model_control=None, model_test=None, user_features=None,
+                 post_features=None, experiments: Optional[ExperimentRegistry] = None,
+                 shadow=None, precomputed=None, cascade=None, seen=None,
+                 stage_probe_every: int = STAGE_PROBE_EVERY):
+        if experiments is None:
+            experiments = ExperimentRegistry.from_models(
+                {"control": model_control, "test": model_test},
+                {"control": GROUP_A_PERCENTAGE, "test": 100 - GROUP_A_PERCENTAGE})
+        self.experiments = experiments
+        self.shadow = shadow
+        self.precomputed = precomputed
+        self.cascade = cascade.bind(post_features) if cascade is not None else None
+        self.seen = seen
         self.user_features = user_features
         self.post_features = post_features
+        # Stage costs per arm, so a slow arm does not push the others off the model
+        self.stage_probe_every = stage_probe_every
+        self.stage_costs = {}
+        self.segment_cache = SegmentRankingCache(
+            SEGMENT_COLUMNS, max_segments=SEGMENT_CACHE_SIZE, depth=SEGMENT_CACHE_DEPTH)
+        self.popular_posts = popularity_ranking(post_features)
         logger.info("RecommenderService initialized successfully")
 
-    def recommend(self, user_id, time, liked_posts, limit=5):
-        """Generate recommendations for a user"""
-        logger.info(f"Generating recommendations for user {user_id}")
+    def recommend(self, user_id, time, liked_posts, limit=5, time_budget: Optional[float] = None):
+        """Generate recommendations for a user.
+
+        With ``time_budget`` (seconds) the model is skipped whenever the
+        remaining stages are not expected to fit, and the result comes from a
+        cached segment ranking or the popularity list instead.
+        """
+        start = perf_counter()
+        logger.debug("Generating recommendations for user %s", user_id)
 
         # Validate input parameters
         if limit <= 0:
@@ -24,40 +74,175 @@ class RecommenderService:
             liked_posts = list(liked_posts)
 
         # Get experiment group
-        exp_group = get_exp_group(user_id)
+        exp_group = self.experiments.assign(user_id)
         logger.debug(
-            f"User {user_id} assigned to experiment group: {exp_group}")
+            "User %s assigned to experiment group: %s", user_id, exp_group)
+
+        model = self.experiments.model(exp_group)
+
+        user_row = self.user_features[self.user_features["user_id"] == user_id]
+        if user_row.empty:
+            raise KeyError(f"User {user_id} not found in user features")
+        segment_key = self.segment_cache.segment_key(exp_group, user_row)
+        exclude = self.seen.exclude(user_id) if self.seen is not None else None
+
+        if self.precomputed is not None:
+            top_posts = self.precomputed.lookup(segment_key, time, liked_posts, limit, exclude)
+            if top_posts is not None:
+                return RecommendationResult(top_posts, exp_group, TIER_PRECOMPUTED)
+
+        stage_costs = self._stage_costs(exp_group)
+        probing = False
 
-        model = self.model_control if exp_group == "control" else self.model_test
+        def out_of_time(*stages):
+            nonlocal probing
+            if time_budget is None or probing:
+                return False
+            remaining = time_budget - (perf_counter() - start)
+            if remaining >= stage_costs.estimate(*stages):
+                return False
+            # A probe runs the rest of the request on the model to re-measure it
+            probing = remaining > 0 and stage_costs.probe()
+            return not probing
+
+        if out_of_time("prerank", "features", "predict", "sort"):
+            return self._degraded(user_id, exp_group, segment_key, liked_posts, limit, exclude)
+
+        # Keep the pre-ranker's top N posts for the arm's model
+        # The cascade is read once: it holds the catalog its encoding was built from
+        candidates = self.post_features
+        cascade = self.cascade
+        if cascade is not None:
+            with stage("prerank") as prerank_stage:
+                candidates = cascade.candidates(exp_group, user_row)
+            stage_costs.update("prerank", prerank_stage.elapsed)
 
         # Build features
-        logger.debug(f"Building features for user {user_id}")
-        df = build_features(user_id, self.post_features,
-                            self.user_features, time)
+        with stage("features") as features_stage:
+            df = build_features(user_id, candidates, user_row, time)
+        stage_costs.update("features", features_stage.elapsed)
 
-        # Remove liked posts
-        df = df[~df["post_id"].isin(liked_posts)]
+        # Remove liked posts, and seen posts while enough unseen ones remain;
+        # otherwise seen posts are ranked after the unseen ones below
+        pad_with_seen = False
+        with stage("filter"):
+            df = df[~df["post_id"].isin(liked_posts)]
+            if exclude is not None:
+                unseen = ~exclude(df["post_id"].to_numpy())
+                if unseen.sum() >= limit:
+                    df = df[unseen]
+                else:
+                    pad_with_seen = True
         if df.empty:
             logger.warning(
-                f"No recommendations available for user {user_id} - empty dataframe after filtering")
-            return [], exp_group  # fallback
+                "No recommendations available for user %s - empty dataframe after filtering", user_id)
+            return RecommendationResult([], exp_group)  # fallback
+
+        if out_of_time("predict", "sort"):
+            return self._degraded(user_id, exp_group, segment_key, liked_posts, limit, exclude)
 
         # Predict from model
         try:
             cols = list(model.feature_names_)
-            df["score"] = model.predict(df[cols])
-            logger.debug(f"Generated predictions for {len(df)} posts")
+            with stage("predict") as predict_stage:
+                df["score"] = model.predict(df[cols])
+            stage_costs.update("predict", predict_stage.elapsed)
+            logger.debug("Generated predictions for %d posts", len(df))
         except Exception as e:
-            logger.error(f"Prediction failed for user {user_id}: {e}")
-            return [], exp_group
-
-        # Sort predictions and get top posts
-        top_posts = (
-            df.sort_values("score", ascending=False)["post_id"]
-            .head(limit)
-            .tolist()
-        )
-
-        logger.info(
-            f"Generated {len(top_posts)} recommendations for user {user_id} in group {exp_group}")
-        return top_posts, exp_group
+            logger.error("Prediction failed for user %s: %s", user_id, e)
+            return RecommendationResult([], exp_group)
+
+        # Sort predictions and keep enough of the ranking for the segment cache
+        with stage("sort") as sort_stage:
+            ranked = (
+                df.sort_values("score", ascending=False)["post_id"]
+                .head(max(limit, self.segment_cache.depth))
+                .to_numpy()
+            )
+        stage_costs.update("sort", sort_stage.elapsed)
+        self.segment_cache.put(segment_key, ranked)
+        if pad_with_seen:
+            top_posts = top_unliked(ranked, (), limit, exclude)
+        else:
+            top_posts = ranked[:limit].tolist()
+
+        # df is not touched after this point, so the shadow thread may read it
+        if self.shadow is not None:
+            self.shadow.submit(user_id, exp_group, df, top_posts, predict_stage.elapsed)
+
+        logger.debug(
+            "Generated %d recommendations for user %s in group %s",
+            len(top_posts), user_id, exp_group)
+        return RecommendationResult(top_posts, exp_group, TIER_MODEL)
+
+    def update_catalog(self, post_features):
+        """Swap in a new post catalog and drop rankings built from the old one"""
+        self.post_features = post_features
+        self.popular_posts = popularity_ranking(post_features)
+        self.segment_cache.invalidate()
+        self.stage_costs = {}
+        if self.cascade is not None:
+            self.cascade = self.cascade.bind(post_features)
+        if self.precomputed is not None:
+            arms = self.experiments.active_arms()
+            self.precomputed.refresh(
+                {arm: self.experiments.model(arm) for arm in arms},
+                self.experiments.versions(), post_features, self.user_features)
+
+    def _stage_costs(self, exp_group) -> StageCostEstimator:
+        costs = self.stage_costs.get(exp_group)
+        if costs is None:
+            costs = self.stage_costs.setdefault(
+                exp_group, StageCostEstimator(probe_every=self.stage_probe_every))
+        return costs
+
+    def _degraded(self, user_id, exp_group, segment_key, liked_posts, limit, exclude=None):
+        """Serve from the segment cache, falling back to popular posts"""
+        ranking = self.segment_cache.get(segment_key)
+        if ranking is not None:
+            top_posts = top_unliked(ranking, liked_posts, limit, exclude)
+            if len(top_posts) == limit:
+                logger.debug(
+                    "Serving cached segment ranking to user %s", user_id)
+                return RecommendationResult(top_posts, exp_group, TIER_SEGMENT)
+
+        logger.debug("Serving popular posts to user %s", user_id)
+        return RecommendationResult(
+            top_unliked(self.popular_posts, liked_posts, limit, exclude), exp_group, TIER_POPULAR)
+
+
+class CatalogReloader:
+    """Reloads the post catalog in the background and swaps in changed ones"""
+
+    def __init__(self, load, on_change, interval: float = 300.0, current=None):
+        self.load = load
+        self.on_change = on_change
+        self.interval = interval
+        self._fingerprint = catalog_fingerprint(current) if current is not None else None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """Load the catalog once; True if it changed and was handed to ``on_change``"""
+        post_features = self.load()
+        fingerprint = catalog_fingerprint(post_features)
+        if fingerprint == self._fingerprint:
+            return False
+        self.on_change(post_features)
+        self._fingerprint = fingerprint
+        logger.info("Post catalog changed, %d posts swapped in", len(post_features))
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Post catalog reload failed: %s", e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="catalog-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
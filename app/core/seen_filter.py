@@ -0,0 +1,200 @@
+"""Per-user seen-post filter built from ``feed_action`` views.
+
+Every user owns one fixed-size block of ``bits`` bits (a blocked Bloom
+filter). A post sets ``hashes`` bits of its user's block, with positions
+derived from the post and user ids by double hashing. All blocks live in
+one ``(n_users, bits / 64)`` uint64 array, and a query for a whole
+candidate list is a single vectorized gather, so filtering costs one mask
+over the ranking.
+
+Memory is ``bits / 8`` bytes per user plus 8 bytes for the sorted user id
+index: 64 + 8 bytes at the default 512 bits, about 720 MB for 10M users.
+False-positive rate (a fresh post wrongly treated as seen) depends on how
+many posts the user has viewed, ``n``: ``(1 - exp(-k n / m)) ** k``.
+
+    bits  hashes   n=25    n=50    n=100   n=200
+    256   3        1.6%    8.7%    33%     74%
+    512   4        0.10%   1.1%    8.6%    39%
+    1024  5        0.004%  0.05%   0.86%   9.4%
+
+Heavy viewers therefore degrade towards "everything seen"; when too few
+posts survive the mask, callers serve the unseen ones first and pad with
+seen ones.
+Users outside the initial index get their own block on first write.
+"""
+import threading
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_M1 = np.uint64(0x9E3779B97F4A7C15)
+_M2 = np.uint64(0xC2B2AE3D27D4EB4F)
+_M3 = np.uint64(0x165667B19E3779F9)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """64-bit finalizer (splitmix64)"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def false_positive_rate(bits: int, hashes: int, items: int) -> float:
+    """Expected false-positive rate of one block holding ``items`` posts"""
+    return (1.0 - np.exp(-hashes * items / bits)) ** hashes
+
+
+class SeenFilter:
+    """Blocked Bloom filter of viewed posts, one block per user"""
+
+    def __init__(self, user_ids, bits: int = 512, hashes: int = 4):
+        if bits % 64 or bits & (bits - 1):
+            raise ValueError("bits must be a power of two and a multiple of 64")
+        self.bits = bits
+        self.hashes = hashes
+        self.words = bits // 64
+        self.user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        self.blocks = np.zeros((len(self.user_ids), self.words), dtype=np.uint64)
+        self._extra = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return (self.blocks.nbytes + self.user_ids.nbytes
+                + sum(block.nbytes + 8 for block in self._extra.values()))
+
+    @property
+    def bytes_per_user(self) -> float:
+        return self.nbytes / max(1, len(self.user_ids) + len(self._extra))
+
+    def _rows(self, user_ids: np.ndarray) -> np.ndarray:
+        """Block rows of ``user_ids``, -1 for users outside the index"""
+        if not len(self.user_ids):
+            return np.full(len(user_ids), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.user_ids, user_ids), len(self.user_ids) - 1)
+        return np.where(self.user_ids[rows] == user_ids, rows, -1)
+
+    def _positions(self, user_ids: np.ndarray, post_ids: np.ndarray) -> np.ndarray:
+        """(hashes, n) bit positions inside each user's block"""
+        with np.errstate(over="ignore"):
+            key = (post_ids.astype(np.uint64) * _M1) ^ (user_ids.astype(np.uint64) * _M2)
+            h1 = _mix(key)
+            h2 = _mix(key ^ _M3) | np.uint64(1)
+            i = np.arange(self.hashes, dtype=np.uint64)[:, None]
+            return ((h1 + i * h2) & np.uint64(self.bits - 1)).astype(np.int64)
+
+    def add_many(self, user_ids, post_ids):
+        """Mark ``post_ids[i]`` as seen by ``user_ids[i]``"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        if not len(user_ids):
+            return
+        positions = self._positions(user_ids, post_ids)
+        words = positions >> 6
+        masks = np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+        rows = np.broadcast_to(self._rows(user_ids), positions.shape)
+
+        known = rows >= 0
+        with self._lock:
+            np.bitwise_or.at(self.blocks, (rows[known], words[known]), masks[known])
+            if not known.all():
+                for user_id in np.unique(user_ids[~known[0]]):
+                    block = self._extra.get(int(user_id))
+                    if block is None:
+                        block = self._extra[int(user_id)] = np.zeros(self.words, dtype=np.uint64)
+                    mine = (user_ids == user_id)[None, :] & ~known
+                    np.bitwise_or.at(block, words[mine], masks[mine])
+
+    def add(self, user_id: int, post_ids):
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        self.add_many(np.full(len(post_ids), user_id, dtype=np.int64), post_ids)
+
+    def contains(self, user_id: int, post_ids) -> np.ndarray:
+        """Boolean mask: True where the user has (probably) seen the post"""
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        row = self._rows(np.array([user_id], dtype=np.int64))[0]
+        if row >= 0:
+            block = self.blocks[row]
+        else:
+            block = self._extra.get(int(user_id))
+            if block is None:
+                return np.zeros(len(post_ids), dtype=bool)
+        positions = self._positions(np.full(len(post_ids), user_id, dtype=np.int64), post_ids)
+        bits = (block[positions >> 6] >> (positions & 63).astype(np.uint64)) & np.uint64(1)
+        return bits.all(axis=0)
+
+    def exclude(self, user_id: int):
+        """Mask function for ``top_unliked``"""
+        return lambda post_ids: self.contains(user_id, post_ids)
+
+
+class SeenFilterLoader:
+    """Fills a ``SeenFilter`` from feed_action views, then polls for new ones"""
+
+    def __init__(self, seen: SeenFilter, engine, query: str, chunksize: int = 1_000_000,
+                 poll_interval: float = 60.0, lookback: float = 300.0):
+        self.seen = seen
+        self.engine = engine
+        self.query = query
+        self.chunksize = chunksize
+        self.poll_interval = poll_interval
+        self.lookback = lookback
+        self.last_time = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watermark(self):
+        """Start of the next poll: the newest view seen, minus ``lookback``.
+
+        Polls overlap so views sharing the newest timestamp, or committed
+        late with an older one, are still read. Adding a view twice sets the
+        same bits, so the overlap needs no dedupe.
+        """
+        if self.last_time is None:
+            return None
+        return (pd.Timestamp(self.last_time) - pd.Timedelta(seconds=self.lookback)).to_pydatetime()
+
+    def load(self, since=None) -> int:
+        """Add views at or after ``since`` (all when None); returns rows read"""
+        query = self.query
+        params = None
+        if since is not None:
+            query = f"SELECT * FROM ({self.query}) AS views WHERE time >= :since"
+            params = {"since": since}
+        total = 0
+        start = perf_counter()
+        with self.engine.connect() as conn:
+            for chunk in pd.read_sql(text(query), conn.execution_options(stream_results=True),
+                                     params=params, chunksize=self.chunksize):
+                self.seen.add_many(chunk["user_id"].to_numpy(), chunk["post_id"].to_numpy())
+                if len(chunk):
+                    latest = chunk["time"].max()
+                    self.last_time = latest if self.last_time is None else max(self.last_time, latest)
+                total += len(chunk)
+        logger.info("Seen filter: read %d views in %.1fs (%.1f MB)",
+                    total, perf_counter() - start, self.seen.nbytes / 1e6)
+        return total
+
+    def _run(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error("Seen filter initial load failed: %s", e)
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.load(since=self.watermark())
+            except Exception as e:
+                logger.error("Seen filter refresh failed: %s", e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="seen-filter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,170 @@
+"""Shadow scoring of challenger models on live traffic.
+
+For a sampled fraction of model-tier requests the feature block that was
+scored for the user is handed to a small background executor, where each
+challenger ranks the same candidates. The top-K overlap with the served
+ranking and the challenger's scoring latency are recorded next to the
+served model's. Submission never blocks: when too much shadow work is
+pending, or the service reports it is under load, the sample is dropped.
+Challengers predict with ``threads`` CatBoost threads (one by default), so
+shadow scoring takes at most that many cores from live requests.
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY, Counter, Histogram
+from app.config import (
+    SHADOW_MODELS,
+    SHADOW_SAMPLE_RATE,
+    SHADOW_MAX_PENDING,
+    SHADOW_WORKERS,
+    SHADOW_THREADS
+)
+
+logger = get_logger(__name__)
+
+OVERLAP_BUCKETS = (0.0, 0.2, 0.4, 0.6, 0.8, 0.9, 1.0)
+
+SHADOW_SCORED = REGISTRY.register(Counter(
+    "recsys_shadow_scored_total",
+    "Requests scored by a shadow challenger",
+    ("model",)
+))
+SHADOW_DROPPED = REGISTRY.register(Counter(
+    "recsys_shadow_dropped_total",
+    "Sampled shadow requests dropped before scoring",
+    ("reason",)
+))
+SHADOW_LATENCY = REGISTRY.register(Histogram(
+    "recsys_shadow_predict_seconds",
+    "Challenger scoring latency of the shadow feature block",
+    ("model",)
+))
+SHADOW_OVERLAP = REGISTRY.register(Histogram(
+    "recsys_shadow_topk_overlap",
+    "Share of the served top-K also in the challenger's top-K",
+    ("model", "served"),
+    buckets=OVERLAP_BUCKETS
+))
+
+
+def parse_shadow_models(spec: str) -> dict:
+    """Parse ``"name:model_path,..."`` into ``{name: model_path}``"""
+    models = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, path = item.partition(":")
+        if not sep or not path:
+            raise ValueError(f"Invalid shadow model '{item}', expected name:path")
+        models[name.strip()] = path.strip()
+    return models
+
+
+def topk_overlap(served, challenger) -> float:
+    """Share of ``served`` ids that are also in ``challenger``"""
+    if not len(served):
+        return 0.0
+    return len(set(served) & set(challenger)) / len(served)
+
+
+class ShadowScorer:
+    """Scores sampled requests with challenger models off the request path"""
+
+    def __init__(self, challengers: dict, sample_rate: float = 0.01,
+                 max_pending: int = 8, workers: int = 1, under_load=None,
+                 threads: int = 1):
+        self.challengers = dict(challengers)
+        self.threads = threads
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.under_load = under_load
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="shadow")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, user_id, served_group, features, served_posts, served_seconds) -> bool:
+        """Queue shadow scoring of ``features`` for a sampled request.
+
+        ``features`` must not be modified by the caller afterwards.
+        """
+        if not self.challengers or random.random() >= self.sample_rate:
+            return False
+        if self.under_load is not None and self.under_load():
+            SHADOW_DROPPED.inc("under_load")
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                SHADOW_DROPPED.inc("queue_full")
+                return False
+            self._pending += 1
+        try:
+            future = self._executor.submit(
+                self._score, user_id, served_group, features,
+                list(served_posts), served_seconds)
+        except RuntimeError:
+            # Executor already shut down
+            self._done()
+            SHADOW_DROPPED.inc("shutdown")
+            return False
+        # Also runs for work cancelled by shutdown(), which never starts
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _score(self, user_id, served_group, features, served_posts, served_seconds):
+        k = len(served_posts)
+        try:
+            for name, model in self.challengers.items():
+                start = perf_counter()
+                scores = model.predict(features[list(model.feature_names_)],
+                                       thread_count=self.threads)
+                elapsed = perf_counter() - start
+                order = scores.argsort()[::-1][:k]
+                challenger_posts = features["post_id"].to_numpy()[order]
+                overlap = topk_overlap(served_posts, challenger_posts)
+
+                SHADOW_SCORED.inc(name)
+                SHADOW_LATENCY.observe(elapsed, name)
+                SHADOW_OVERLAP.observe(overlap, name, served_group)
+                logger.info(
+                    "shadow model=%s served=%s user_id=%s overlap@%d=%.2f "
+                    "predict_ms=%.1f served_predict_ms=%.1f",
+                    name, served_group, user_id, k, overlap,
+                    elapsed * 1000, served_seconds * 1000)
+        except Exception as e:
+            SHADOW_DROPPED.inc("error")
+            logger.error("Shadow scoring failed for user %s: %s", user_id, e)
+
+    def shutdown(self):
+        """Stop the executor and drop shadow work that has not started"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_shadow_scorer(store, under_load=None, spec: str = SHADOW_MODELS):
+    """Build the configured shadow scorer, None when no challengers are set"""
+    paths = parse_shadow_models(spec)
+    if not paths or SHADOW_SAMPLE_RATE <= 0:
+        return None
+    challengers = {name: store.get(path) for name, path in paths.items()}
+    logger.info("Shadow scoring %s on %.1f%% of requests",
+                ", ".join(challengers), SHADOW_SAMPLE_RATE * 100)
+    return ShadowScorer(
+        challengers,
+        sample_rate=SHADOW_SAMPLE_RATE,
+        max_pending=SHADOW_MAX_PENDING,
+        workers=SHADOW_WORKERS,
+        under_load=under_load,
+        threads=SHADOW_THREADS
+    )
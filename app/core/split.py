@@ -0,0 +1,56 @@
+"""Per-user balanced temporal train/test split for ranking data.
+
+Vectorized version of ``make_split`` from ``notebooks/ranking.ipynb``.
+Users with fewer than ``min_per_class`` positives or negatives are
+dropped. For the rest, the first half of each class (in input order) goes
+to train and the remainder to test, so every user appears in both sets
+with the same class balance. Both outputs are sorted by time.
+
+The rows are assembled in the order the notebook's loop concatenated them
+(users ascending, positives before negatives, input order within a class)
+before the final sort, so the result is identical to the loop version,
+including the order of rows with equal timestamps.
+"""
+import numpy as np
+import pandas as pd
+
+
+def split_masks(user_ids, targets, min_per_class: int = 28):
+    """Boolean (train, test) masks over the input rows"""
+    targets = np.asarray(targets)
+    frame = pd.DataFrame({
+        "user": np.asarray(user_ids),
+        "target": targets,
+        "positive": targets == 1,
+        "negative": targets == 0,
+    })
+    by_user = frame.groupby("user", sort=False)
+    positives = by_user["positive"].transform("sum").to_numpy()
+    negatives = by_user["negative"].transform("sum").to_numpy()
+    eligible = ((positives >= min_per_class) & (negatives >= min_per_class)
+                & (frame["positive"] | frame["negative"]).to_numpy())
+
+    # Position of each row within its user's positives (or negatives)
+    rank = frame.groupby(["user", "target"], sort=False).cumcount().to_numpy()
+    half = np.where(frame["positive"].to_numpy(), positives, negatives) // 2
+    train = eligible & (rank < half)
+    test = eligible & (rank >= half)
+    return train, test
+
+
+def _assemble(data: pd.DataFrame, mask: np.ndarray, user_ids: np.ndarray,
+              targets: np.ndarray, time_col: str) -> pd.DataFrame:
+    rows = np.flatnonzero(mask)
+    # users ascending, positives first, then input order - the loop's concat order
+    order = np.lexsort((rows, targets[rows] != 1, user_ids[rows]))
+    return data.iloc[rows[order]].sort_values(time_col).reset_index(drop=True)
+
+
+def make_split(all_data: pd.DataFrame, min_per_class: int = 28, user_col: str = "user_id",
+               target_col: str = "target", time_col: str = "timestamp"):
+    """Split interactions into (train, test), keeping each user in both sets"""
+    user_ids = all_data[user_col].to_numpy()
+    targets = all_data[target_col].to_numpy()
+    train, test = split_masks(user_ids, targets, min_per_class)
+    return (_assemble(all_data, train, user_ids, targets, time_col),
+            _assemble(all_data, test, user_ids, targets, time_col))
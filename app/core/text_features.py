@@ -0,0 +1,311 @@
+"""Incremental text-embedding features for posts.
+
+Post texts are embedded with a transformer encoder (CLS token of
+``distilbert-base-cased`` by default, as in ``notebooks/ranking.ipynb``)
+on CPU. Embeddings are cached by a hash of model name and text, so a run
+only embeds posts that are new or whose text changed.
+
+The embeddings are projected with a PCA and clustered with KMeans, both
+fitted once (``TextClusterModel.fit``, needs scikit-learn) and stored as
+plain arrays. Later runs reuse the fitted arrays to produce:
+    TextCluster            - index of the nearest cluster centre
+    DistanceToCluster_<i>  - euclidean distance to centre i in PCA space
+
+``torch`` and ``transformers`` are imported only when something needs
+embedding, so a run on an unchanged catalog needs neither.
+"""
+import hashlib
+import os
+import tempfile
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL = "distilbert-base-cased"
+
+
+def text_hashes(texts, model_name: str) -> np.ndarray:
+    """16-byte digests of ``model_name`` + text, as an ``S16`` array"""
+    prefix = model_name.encode() + b"\0"
+    return np.array([
+        hashlib.blake2b(prefix + str(t).encode(), digest_size=16).digest() for t in texts
+    ], dtype="S16")
+
+
+def _save_npz(path: str, **arrays):
+    """Write an .npz next to ``path`` and move it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".npz", dir=directory)
+    os.close(fd)
+    try:
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class EmbeddingCache:
+    """Embeddings keyed by text hash, stored in one .npz file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.keys = np.empty(0, dtype="S16")
+        self.vectors = None
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                self.keys = stored["keys"]
+                self.vectors = stored["vectors"]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Row of each key in ``vectors``, -1 when missing"""
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        order = np.argsort(self.keys)
+        pos = np.minimum(np.searchsorted(self.keys, keys, sorter=order), len(self.keys) - 1)
+        rows = order[pos]
+        return np.where(self.keys[rows] == keys, rows, -1)
+
+    def get(self, keys: np.ndarray) -> np.ndarray:
+        rows = self.lookup(keys)
+        if (rows < 0).any():
+            raise KeyError(f"{int((rows < 0).sum())} texts are not embedded")
+        return self.vectors[rows]
+
+    def update(self, keys: np.ndarray, vectors: np.ndarray):
+        if not len(keys):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors is None:
+            self.keys, self.vectors = keys.copy(), vectors
+            return
+        self.keys = np.concatenate([self.keys, keys])
+        self.vectors = np.concatenate([self.vectors, vectors])
+
+    def retain(self, keys: np.ndarray):
+        """Drop cached texts that are not in ``keys`` (no longer in the catalog)"""
+        rows = self.lookup(np.unique(keys))
+        rows = np.sort(rows[rows >= 0])
+        if len(rows) < len(self.keys):
+            self.keys, self.vectors = self.keys[rows], self.vectors[rows]
+
+    def save(self):
+        _save_npz(self.path, keys=self.keys, vectors=self.vectors)
+
+
+class TransformerEmbedder:
+    """CLS-token embeddings from a Hugging Face encoder on CPU"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 32,
+                 max_length: int = 512, threads: int = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.threads = threads
+        self._tokenizer = None
+        self._model = None
+
+    def _load(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModel.from_pretrained(self.model_name).eval()
+
+    def embed(self, texts) -> np.ndarray:
+        import torch
+        if self._model is None:
+            self._load()
+        texts = [str(t) for t in texts]
+        # Similar lengths per batch keep padding (and wasted compute) small
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        out = None
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                index = order[start:start + self.batch_size]
+                batch = self._tokenizer(
+                    [texts[i] for i in index], padding=True, truncation=True,
+                    max_length=self.max_length, return_tensors="pt")
+                cls = self._model(**batch).last_hidden_state[:, 0, :].numpy()
+                if out is None:
+                    out = np.empty((len(texts), cls.shape[1]), dtype=np.float32)
+                out[index] = cls
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
+
+
+class TextClusterModel:
+    """Fitted PCA + KMeans as arrays; transform needs numpy only"""
+
+    def __init__(self, offset: float, pca_mean: np.ndarray, components: np.ndarray,
+                 centers: np.ndarray, model_name: str = DEFAULT_MODEL):
+        self.offset = float(offset)
+        self.pca_mean = np.asarray(pca_mean, dtype=np.float64)
+        self.components = np.asarray(components, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.model_name = model_name
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centers)
+
+    @property
+    def columns(self) -> list:
+        return ["TextCluster"] + [f"DistanceToCluster_{i}" for i in range(self.n_clusters)]
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, n_components: int = 50, n_clusters: int = 15,
+            model_name: str = DEFAULT_MODEL, seed: int = 0):
+        """Fit as the notebook does: center by the global mean, PCA, KMeans"""
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import PCA
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        offset = embeddings.mean()
+        pca = PCA(n_components=n_components, random_state=seed)
+        reduced = pca.fit_transform(embeddings - offset)
+        kmeans = KMeans(n_clusters=n_clusters, random_state=seed, n_init=10).fit(reduced)
+        return cls(offset, pca.mean_, pca.components_, kmeans.cluster_centers_, model_name)
+
+    def transform(self, embeddings: np.ndarray) -> pd.DataFrame:
+        reduced = (np.asarray(embeddings, dtype=np.float64) - self.offset - self.pca_mean) \
+            @ self.components.T
+        distances = np.sqrt(np.maximum(
+            (reduced ** 2).sum(axis=1, keepdims=True) - 2 * reduced @ self.centers.T
+            + (self.centers ** 2).sum(axis=1), 0.0))
+        frame = pd.DataFrame(distances, columns=self.columns[1:])
+        frame.insert(0, "TextCluster", distances.argmin(axis=1))
+        return frame
+
+    def save(self, path: str):
+        _save_npz(path, offset=self.offset, pca_mean=self.pca_mean, components=self.components,
+                  centers=self.centers, model_name=self.model_name)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as stored:
+            return cls(stored["offset"], stored["pca_mean"], stored["components"],
+                       stored["centers"], str(stored["model_name"]))
+
+
+def embed_posts(texts, cache: EmbeddingCache, embedder, model_name: str):
+    """Embeddings for ``texts`` and how many were computed (missing from ``cache``)"""
+    keys = text_hashes(texts, model_name)
+    missing = np.flatnonzero(cache.lookup(keys) < 0)
+    # Posts with identical text are embedded once
+    new_keys, first = np.unique(keys[missing], return_index=True)
+    if len(new_keys):
+        start = perf_counter()
+        texts = np.asarray(texts, dtype=object)
+        cache.update(new_keys, embedder.embed(texts[missing[first]]))
+        logger.info("Embedded %d new or changed posts in %.1fs",
+                    len(new_keys), perf_counter() - start)
+    return cache.get(keys), len(new_keys)
+
+
+def _write_text_features(engine, table: str, features: pd.DataFrame, drop_columns):
+    """Update the text feature columns of ``table`` in place, in one transaction.
+
+    Rows are updated from ``<table>_text_staging`` by post_id, so the table
+    keeps its indexes, constraints, grants and other columns, and readers
+    see either the old or the new values.
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    schema, _, name = table.rpartition(".")
+    prefix = f"{quote(schema)}." if schema else ""
+    target = f"{prefix}{quote(name)}"
+    staging = f"{prefix}{quote(name + '_text_staging')}"
+    features.to_sql(f"{name}_text_staging", engine, schema=schema or None,
+                    if_exists="replace", index=False)
+
+    existing = {column["name"] for column in inspect(engine).get_columns(name, schema=schema or None)}
+    columns = [c for c in features.columns if c != "post_id"]
+    try:
+        with engine.begin() as conn:
+            for column in drop_columns:
+                conn.execute(text(f"ALTER TABLE {target} DROP COLUMN {quote(column)}"))
+            for column in columns:
+                if column not in existing:
+                    kind = "INTEGER" if column == "TextCluster" else "FLOAT"
+                    conn.execute(text(f"ALTER TABLE {target} ADD COLUMN {quote(column)} {kind}"))
+            assignments = ", ".join(
+                f"{quote(c)} = staged.{quote(c)}" for c in columns)
+            conn.execute(text(
+                f"UPDATE {target} SET {assignments} FROM {staging} AS staged "
+                f"WHERE {target}.post_id = staged.post_id"))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+
+
+def update_post_features(engine, table: str, source_query: str, cache_path: str,
+                         cluster_path: str, embedder=None, refit: bool = False,
+                         n_components: int = 50, n_clusters: int = 15) -> dict:
+    """Recompute text features and write changed rows back into ``table``.
+
+    Only posts whose features changed are written, with one UPDATE from a
+    staging table (see ``_write_text_features``).
+    """
+    start = perf_counter()
+    with engine.connect() as conn:
+        posts = pd.read_sql(text(source_query), conn)
+
+    cluster_model = None
+    if not refit and os.path.exists(cluster_path):
+        cluster_model = TextClusterModel.load(cluster_path)
+    model_name = cluster_model.model_name if cluster_model else getattr(
+        embedder, "model_name", DEFAULT_MODEL)
+    if embedder is None:
+        embedder = TransformerEmbedder(model_name)
+    elif embedder.model_name != model_name:
+        raise ValueError(f"Clusters were fitted on {model_name} embeddings, "
+                         f"not {embedder.model_name}; refit them")
+
+    cache = EmbeddingCache(cache_path)
+    embeddings, embedded = embed_posts(posts["text"].tolist(), cache, embedder, model_name)
+    cached = len(cache)
+    cache.retain(text_hashes(posts["text"].tolist(), model_name))
+    if embedded or len(cache) != cached:
+        cache.save()
+
+    if cluster_model is None:
+        cluster_model = TextClusterModel.fit(embeddings, n_components, n_clusters, model_name)
+        cluster_model.save(cluster_path)
+        logger.info("Fitted text clusters (%d components, %d clusters)",
+                    n_components, n_clusters)
+
+    text_features = cluster_model.transform(embeddings)
+    old_columns = [c for c in posts.columns
+                   if c == "TextCluster" or str(c).startswith("DistanceToCluster_")]
+    if sorted(old_columns) == sorted(cluster_model.columns):
+        distances = cluster_model.columns[1:]
+        changed = (
+            (posts["TextCluster"].to_numpy() != text_features["TextCluster"].to_numpy())
+            | ~np.isclose(posts[distances].to_numpy(dtype=float),
+                          text_features[distances].to_numpy(), atol=1e-4).all(axis=1)
+        )
+    else:
+        changed = np.ones(len(posts), dtype=bool)
+
+    if changed.any():
+        rows = text_features[changed]
+        rows.insert(0, "post_id", posts["post_id"].to_numpy()[changed])
+        _write_text_features(engine, table, rows,
+                             [c for c in old_columns if c not in cluster_model.columns])
+
+    report = {
+        "posts": len(posts),
+        "embedded": embedded,
+        "written": bool(changed.any()),
+        "updated": int(changed.sum()),
+        "seconds": round(perf_counter() - start, 2),
+    }
+    logger.info("Text features: %s", report)
+    return report
@@ -0,0 +1,357 @@
+"""Streaming builder and columnar cache for ranking training data.
+
+Interactions are read chunk by chunk, either from CSV files or from
+``feed_action`` through a server-side cursor, joined with the (small) user
+and post feature tables and converted to compact dtypes. Each chunk is
+written as one shard of per-column ``.npy`` files. When the last chunk is
+in, the shards are merged into one file per column, with rows ordered by
+``user_id`` (CatBoost needs the rows of a group to be contiguous) and by
+split part within a user.
+
+The dataset directory is named after a checksum of its sources and
+schema, so a second run with unchanged inputs only memory-maps the
+columns. String columns are stored as int32 codes plus their categories
+in ``meta.json``; ``TrainingData.pool`` hands them to CatBoost as
+categoricals, so the model sees the original values.
+
+Interactions without matching user or post features are dropped.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from catboost import Pool
+from sqlalchemy import text
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Compact dtypes for the known columns; others are downcast generically
+DTYPES = {
+    "user_id": "int32",
+    "post_id": "int32",
+    "target": "int8",
+    "gender": "int8",
+    "age": "int16",
+    "exp_group": "int8",
+    "hour": "int8",
+    "day_of_week": "int8",
+    "rating": "float32",
+    "topic": "category",
+    "country": "category",
+    "city": "category",
+    "os": "category",
+    "source": "category",
+}
+
+# Keep "time" for consumers that need it; it is stored as int64 nanoseconds
+TIME_COLUMNS = ("time", "timestamp")
+
+
+def file_checksum(path: str, block_size: int = 1 << 22) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_checksum(frame: pd.DataFrame) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(map(str, frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def dataset_key(*sources) -> str:
+    """Cache key of a dataset built from ``sources`` (strings)"""
+    digest = hashlib.blake2b(digest_size=10)
+    digest.update(f"schema={SCHEMA_VERSION};{json.dumps(DTYPES, sort_keys=True)}".encode())
+    for source in sources:
+        digest.update(b"\0" + str(source).encode())
+    return digest.hexdigest()
+
+
+def compact(frame: pd.DataFrame) -> pd.DataFrame:
+    """Convert columns to the smallest dtypes that hold them"""
+    for col in frame.columns:
+        dtype = DTYPES.get(col)
+        if dtype is not None:
+            frame[col] = frame[col].astype(dtype)
+        elif col in TIME_COLUMNS:
+            frame[col] = pd.to_datetime(frame[col])
+        elif pd.api.types.is_float_dtype(frame[col]):
+            frame[col] = frame[col].astype("float32")
+        elif pd.api.types.is_integer_dtype(frame[col]):
+            frame[col] = pd.to_numeric(frame[col], downcast="integer")
+        elif pd.api.types.is_bool_dtype(frame[col]):
+            frame[col] = frame[col].astype("int8")
+        else:
+            frame[col] = frame[col].astype("category")
+    return frame
+
+
+def _drop_index_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    """Drop ``Unnamed: 0`` columns left by ``to_csv`` without ``index=False``"""
+    unnamed = [c for c in frame.columns if str(c).startswith("Unnamed:")]
+    return frame.drop(columns=unnamed) if unnamed else frame
+
+
+def join_features(actions: pd.DataFrame, user_features: pd.DataFrame,
+                  post_features: pd.DataFrame) -> pd.DataFrame:
+    """Attach user and post features to one chunk of interactions"""
+    frame = actions.merge(post_features, on="post_id", how="inner")
+    frame = frame.merge(user_features, on="user_id", how="inner")
+    for col in TIME_COLUMNS:
+        if col in frame.columns and "hour" not in frame.columns:
+            time = pd.to_datetime(frame[col])
+            frame["hour"] = time.dt.hour.astype("int8")
+            frame["day_of_week"] = time.dt.weekday.astype("int8")
+    return frame
+
+
+class ShardWriter:
+    """Writes chunks as per-column .npy shards and merges them on close"""
+
+    def __init__(self, directory: str, parts=("all",), sort_by: str = "user_id"):
+        self.directory = directory
+        self.parts = list(parts)
+        self.sort_by = sort_by
+        self.rows = 0
+        self._shards = []
+        self._columns = None
+        self._dtypes = {}
+        self._categories = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _encode(self, name: str, series: pd.Series) -> np.ndarray:
+        """Column values as a plain array; categoricals become global codes"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            known = self._categories.setdefault(name, pd.Index([]))
+            new = series.cat.categories.difference(known)
+            if len(new):
+                known = self._categories[name] = known.append(new)
+            return known.get_indexer(series.astype(object)).astype(np.int32)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        return series.to_numpy()
+
+    def write(self, chunk: pd.DataFrame, part: str = "all"):
+        if not len(chunk):
+            return
+        if self._columns is None:
+            self._columns = list(chunk.columns)
+            self._dtypes = {
+                col: "category" if isinstance(chunk[col].dtype, pd.CategoricalDtype)
+                else "datetime64[ns]" if pd.api.types.is_datetime64_any_dtype(chunk[col])
+                else str(chunk[col].dtype)
+                for col in self._columns
+            }
+        shard = os.path.join(self.directory, f"shard-{len(self._shards):05d}")
+        os.makedirs(shard)
+        for col in self._columns:
+            np.save(os.path.join(shard, f"{col}.npy"), self._encode(col, chunk[col]))
+        self._shards.append((shard, self.parts.index(part), len(chunk)))
+        self.rows += len(chunk)
+
+    def _gather(self, col: str) -> np.ndarray:
+        return np.concatenate([np.load(os.path.join(shard, f"{col}.npy"))
+                               for shard, _, _ in self._shards])
+
+    def close(self) -> dict:
+        """Merge shards into one file per column; returns the metadata"""
+        if self._columns is None:
+            raise ValueError("No rows were written")
+        part = np.concatenate([np.full(n, code, dtype=np.int8) for _, code, n in self._shards])
+        if self.sort_by in self._columns:
+            order = np.lexsort((part, self._gather(self.sort_by)))
+        else:
+            order = np.argsort(part, kind="stable")
+
+        for col in self._columns:
+            values = self._gather(col)
+            out = np.lib.format.open_memmap(
+                os.path.join(self.directory, f"{col}.npy"), mode="w+",
+                dtype=values.dtype, shape=values.shape)
+            np.take(values, order, out=out)
+            out.flush()
+            del out, values
+        np.save(os.path.join(self.directory, "_part.npy"), part[order])
+        for shard, _, _ in self._shards:
+            shutil.rmtree(shard)
+
+        meta = {
+            "schema": SCHEMA_VERSION,
+            "rows": self.rows,
+            "parts": self.parts,
+            "part_rows": {name: int((part == code).sum()) for code, name in enumerate(self.parts)},
+            "sorted_by": self.sort_by if self.sort_by in self._columns else None,
+            "columns": self._columns,
+            "dtypes": self._dtypes,
+            "categories": {col: index.tolist() for col, index in self._categories.items()},
+        }
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=1, default=str)
+        return meta
+
+
+class TrainingData:
+    """Memory-mapped dataset written by ``ShardWriter``"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.parts = self.meta["parts"]
+        self._part = np.load(os.path.join(directory, "_part.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self) -> list:
+        return self.meta["columns"]
+
+    def column(self, name: str, part: str = None, rows: np.ndarray = None):
+        """One column (values, not codes) for the whole dataset, one part or ``rows``"""
+        values = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+        if rows is not None:
+            values = values[rows]
+        elif part is not None:
+            values = values[self._part == self.parts.index(part)]
+        dtype = self.meta["dtypes"][name]
+        if dtype == "category":
+            return pd.Categorical.from_codes(
+                values, categories=self.meta["categories"][name], validate=False)
+        if dtype.startswith("datetime64"):
+            return np.asarray(values).view(dtype)
+        return values
+
+    def frame(self, columns=None, part: str = None) -> pd.DataFrame:
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({col: self.column(col, part) for col in columns}, copy=False)
+
+    def sample(self, n: int, columns=None, seed: int = 0) -> pd.DataFrame:
+        """``n`` random rows (all when fewer), in dataset order.
+
+        Only the pages holding the drawn rows are read from the columns.
+        """
+        columns = self.columns if columns is None else list(columns)
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(self), size=min(n, len(self)), replace=False))
+        return pd.DataFrame({col: self.column(col, rows=rows) for col in columns}, copy=False)
+
+    def pool(self, features, label: str = "target", group_id: str = "user_id",
+             cat_features=(), part: str = None) -> Pool:
+        """CatBoost pool for ``part`` (all rows when None), grouped by ``group_id``"""
+        return Pool(
+            data=self.frame(features, part),
+            label=np.asarray(self.column(label, part)),
+            group_id=np.asarray(self.column(group_id, part)),
+            cat_features=list(cat_features)
+        )
+
+
+def _build(cache_dir: str, key: str, parts, fill) -> TrainingData:
+    """Return the cached dataset ``key``, running ``fill(writer)`` if missing"""
+    directory = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        logger.info("Using cached training data %s", directory)
+        return TrainingData(directory)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir)
+    start = perf_counter()
+    try:
+        writer = ShardWriter(tmp, parts)
+        fill(writer)
+        meta = writer.close()
+        os.replace(tmp, directory)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    logger.info("Built training data %s: %d rows in %.1fs (%s)",
+                directory, meta["rows"], perf_counter() - start, meta["part_rows"])
+    return TrainingData(directory)
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """Read a small feature table with compact dtypes"""
+    return compact(_drop_index_columns(pd.read_csv(path, dtype=DTYPES)))
+
+
+def build_from_csv(actions: dict, user_path: str, post_path: str, cache_dir: str,
+                   chunksize: int = 500_000, split=None) -> TrainingData:
+    """Dataset from interaction CSVs, one per part (``{"train": path, ...}``).
+
+    With ``split`` (such as ``app.core.split.make_split``), ``actions`` holds
+    a single file that is read whole and divided into "train" and "test" by
+    ``split(frame)``.
+    """
+    if split is not None and len(actions) != 1:
+        raise ValueError("split needs exactly one actions file")
+    key = dataset_key(
+        "csv",
+        *(f"{part}:{file_checksum(path)}" for part, path in actions.items()),
+        f"user:{file_checksum(user_path)}",
+        f"post:{file_checksum(post_path)}",
+        f"split:{getattr(split, '__qualname__', repr(split))}")
+    parts = ["train", "test"] if split is not None else list(actions)
+
+    def fill(writer):
+        user_features = read_table(user_path)
+        post_features = read_table(post_path)
+        if split is not None:
+            frames = dict(zip(parts, split(read_table(next(iter(actions.values()))))))
+            for part, frame in frames.items():
+                for start in range(0, len(frame), chunksize):
+                    chunk = frame.iloc[start:start + chunksize]
+                    writer.write(join_features(chunk, user_features, post_features), part)
+            return
+        for part, path in actions.items():
+            for chunk in pd.read_csv(path, dtype=DTYPES, chunksize=chunksize):
+                chunk = compact(_drop_index_columns(chunk))
+                writer.write(join_features(chunk, user_features, post_features), part)
+
+    return _build(cache_dir, key, parts, fill)
+
+
+def build_from_sql(engine, actions_query: str, user_features: pd.DataFrame,
+                   post_features: pd.DataFrame, cache_dir: str,
+                   fingerprint_query: str = "SELECT COUNT(*), MAX(time) FROM feed_action",
+                   test_since=None, chunksize: int = 500_000) -> TrainingData:
+    """Dataset streamed from the database with a server-side cursor.
+
+    ``fingerprint_query`` is run first and its result is part of the cache
+    key, so new actions trigger a rebuild. With ``test_since``, rows at or
+    after that time go to the "test" part and the rest to "train".
+    """
+    with engine.connect() as conn:
+        fingerprint = tuple(conn.execute(text(fingerprint_query)).one())
+    user_features = compact(user_features.copy())
+    post_features = compact(post_features.copy())
+    key = dataset_key(
+        "sql", actions_query, fingerprint, test_since,
+        f"user:{frame_checksum(user_features)}", f"post:{frame_checksum(post_features)}")
+    parts = ["train", "test"] if test_since is not None else ["all"]
+    cutoff = pd.Timestamp(test_since) if test_since is not None else None
+
+    def fill(writer):
+        with engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+            for chunk in pd.read_sql(text(actions_query), conn, chunksize=chunksize):
+                chunk = join_features(compact(chunk), user_features, post_features)
+                if cutoff is None:
+                    writer.write(chunk)
+                    continue
+                is_test = (pd.to_datetime(chunk["time"]) >= cutoff).to_numpy()
+                writer.write(chunk[~is_test], "train")
+                writer.write(chunk[is_test], "test")
+
+    return _build(cache_dir, key, parts, fill)
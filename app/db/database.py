@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.pool import QueuePool
 from app.config import (
     DATABASE_URL,
@@ -10,53 +11,191 @@ from app.config import (
     MAX_RETRIES,
     RETRY_DELAY
 )
+from app.core.admission import remaining_time
 from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY, Counter, Gauge, Histogram
+import asyncio
+import random
+import threading
 import time
+from contextvars import ContextVar
 from functools import wraps
 
 logger = get_logger(__name__)
 
-# Create engine with connection pool settings
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=DB_POOL_SIZE,
-    max_overflow=DB_MAX_OVERFLOW,
-    pool_timeout=DB_POOL_TIMEOUT,
-    pool_recycle=DB_POOL_RECYCLE,
-    pool_pre_ping=True,  # Verify connections before use
-    echo=False  # Set to True for SQL query logging
-)
 
-SessionLocal = sessionmaker(bind=engine)
+def attach_public_schema(engine):
+    """Attach a SQLite database file to itself as schema ``public``.
+
+    The default ``public.*`` queries then run unchanged against a local
+    database. Other engines are returned as they are.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+    path = engine.url.database
+    if not path or path == ":memory:":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, _):
+        dbapi_connection.execute("ATTACH DATABASE ? AS public", (path,))
+    return engine
+
+
+POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "recsys_db_pool_checkout_seconds",
+    "Time to get a connection from the pool, including opening a new one"
+))
+POOL_TIMEOUTS = REGISTRY.register(Counter(
+    "recsys_db_pool_timeouts_total",
+    "Pool checkouts that gave up after DB_POOL_TIMEOUT or the request deadline"
+))
+POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "recsys_db_pool_checked_out",
+    "Connections currently checked out of the pool"
+))
+POOL_SATURATION = REGISTRY.register(Gauge(
+    "recsys_db_pool_saturation",
+    "Checked-out connections over pool size plus max overflow"
+))
+
+
+# Checkout timeout of the current ``_do_get`` call, bounded by the request deadline
+_checkout_timeout = ContextVar("pool_checkout_timeout", default=None)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how often they time out.
+
+    Inside a request a checkout waits at most until the request deadline
+    (``app.core.admission``) instead of the full pool timeout.
+    """
+
+    @property
+    def _timeout(self):
+        timeout = _checkout_timeout.get()
+        return self._pool_timeout if timeout is None else timeout
+
+    @_timeout.setter
+    def _timeout(self, value):
+        self._pool_timeout = value
+
+    def _do_get(self):
+        start = time.perf_counter()
+        remaining = remaining_time()
+        token = None
+        if remaining is not None:
+            token = _checkout_timeout.set(max(0.0, min(self._pool_timeout, remaining)))
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            if token is not None:
+                _checkout_timeout.reset(token)
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def pool_saturation(pool) -> float:
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+# Engine and session factory are created on first use, not on import
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The shared engine with connection pool settings, created on first use"""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise ValueError(
+                        "DATABASE_URL (or LOCAL_DB_PATH) environment variable is required")
+                engine = attach_public_schema(create_engine(
+                    DATABASE_URL,
+                    poolclass=InstrumentedQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,  # Verify connections before use
+                    echo=False  # Set to True for SQL query logging
+                ))
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+                POOL_CHECKED_OUT.set_function(engine.pool.checkedout)
+                POOL_SATURATION.set_function(lambda: pool_saturation(engine.pool))
+    return _engine
+
+
+def __getattr__(name):
+    # ``database.engine`` and ``database.SessionLocal`` still work, lazily
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        get_engine()
+        return _session_factory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def backoff_delay(delay: float, attempt: int) -> float:
+    """Exponential backoff with full jitter, so retrying workers spread out"""
+    return random.uniform(0, delay * (2 ** attempt))
 
 
 def retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY):
-    """Decorator for retrying database operations on failure"""
+    """Decorator for retrying database operations on failure.
+
+    Coroutine functions are retried with ``asyncio.sleep`` between attempts,
+    so waiting for a retry never blocks the event loop.
+    """
+    def failed(attempt, e):
+        logger.warning(
+            "Database operation failed (attempt %d/%d): %s", attempt + 1, max_retries, e)
+
+    def gave_up(e):
+        logger.error("Database operation failed after %d attempts: %s", max_retries, e)
+
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(max_retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        failed(attempt, e)
+                        if attempt == max_retries - 1:
+                            gave_up(e)
+                            raise
+                        await asyncio.sleep(backoff_delay(delay, attempt))
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
             for attempt in range(max_retries):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    last_exception = e
-                    logger.warning(
-                        f"Database operation failed (attempt {attempt + 1}/{max_retries}): {e}")
-                    if attempt < max_retries - 1:
-                        # Exponential backoff
-                        time.sleep(delay * (2 ** attempt))
-            logger.error(
-                f"Database operation failed after {max_retries} attempts: {last_exception}")
-            raise last_exception
+                    failed(attempt, e)
+                    if attempt == max_retries - 1:
+                        gave_up(e)
+                        raise
+                    time.sleep(backoff_delay(delay, attempt))
         return wrapper
     return decorator
 
 
 def get_db():
     """Get database session with connection logging"""
-    db = SessionLocal()
+    get_engine()
+    db = _session_factory()
     try:
         logger.debug("Database connection established")
         yield db
@@ -69,12 +208,31 @@ def get_db():
         db.close()
 
 
-@retry_on_failure()
+def ping(engine=None):
+    """Run ``SELECT 1``; raises when the database cannot be reached"""
+    with (engine or get_engine()).connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
 def test_connection():
     """Test database connection"""
     try:
-        with engine.connect() as conn:
-            conn.execute("SELECT 1")
+        retry_on_failure()(ping)()
+        logger.info("Database connection test successful")
+        return True
+    except Exception as e:
+        logger.error(f"Database connection test failed: {e}")
+        return False
+
+
+async def check_connection():
+    """``test_connection`` for the event loop: the query runs in a thread"""
+    @retry_on_failure()
+    async def attempt():
+        await asyncio.to_thread(ping)
+
+    try:
+        await attempt()
         logger.info("Database connection test successful")
         return True
     except Exception as e:
@@ -0,0 +1,214 @@
+"""Database health without blocking the event loop.
+
+``DatabaseProber`` runs ``SELECT 1`` in a background thread every
+``interval`` seconds and keeps the last result, so ``/health`` reads a
+cached status instead of waiting on the database. A probe that hangs
+leaves the status to go stale, and a stale status counts as unhealthy.
+
+``CircuitBreaker`` guards the queries on the request path:
+    closed    - queries run; ``failure_threshold`` failures in a row open it
+    open      - queries are skipped at once and the caller serves what it
+                has in memory, for ``reset_timeout`` seconds
+    half_open - one trial query is let through; success closes the circuit,
+                failure opens it again
+Probe results feed the same breaker, so an outage opens it even between
+requests, failing probes keep it open without trial requests, and a
+recovered database closes it at the next probe.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from app.config import DB_PROBE_INTERVAL, DB_CIRCUIT_FAILURES, DB_CIRCUIT_RESET_SECONDS
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY, Counter, Gauge, Histogram
+from app.db.database import ping
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DB_UP = REGISTRY.register(Gauge(
+    "recsys_db_up",
+    "Result of the last database probe (1 up, 0 down)"
+))
+DB_PROBE_DURATION = REGISTRY.register(Histogram(
+    "recsys_db_probe_seconds",
+    "Duration of background database probes"
+))
+DB_CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "recsys_db_circuit_state",
+    "Database circuit breaker state (0 closed, 1 half-open, 2 open)"
+))
+DB_CIRCUIT_REJECTED = REGISTRY.register(Counter(
+    "recsys_db_circuit_rejected_total",
+    "Database calls skipped because the circuit was open"
+))
+DB_DEGRADED = REGISTRY.register(Counter(
+    "recsys_db_degraded_total",
+    "Request stages served from memory because the database was unavailable",
+    ("stage",)
+))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is skipped because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._set_state(CLOSED)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the database now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    DB_CIRCUIT_REJECTED.inc()
+                    return False
+                self._set_state(HALF_OPEN)
+            # Half-open: one trial call at a time
+            if self._trial_running:
+                DB_CIRCUIT_REJECTED.inc()
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            if self._state != CLOSED:
+                logger.info("Database circuit closed")
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == CLOSED and self._failures < self.failure_threshold:
+                return
+            if self._state != OPEN:
+                logger.warning("Database circuit opened after %d failures", self._failures)
+            # Failures while open (probes) push the next trial further out
+            self._opened_at = self._clock()
+            self._set_state(OPEN)
+
+    def call(self, func, *args, **kwargs):
+        """``func(*args, **kwargs)`` through the breaker; ``CircuitOpenError`` when skipped"""
+        if not self.allow():
+            raise CircuitOpenError("Database circuit is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def _set_state(self, state: str):
+        self._state = state
+        DB_CIRCUIT_STATE.set(_STATE_VALUES[state])
+
+
+class DatabaseProber:
+    """Probes the database in a background thread and caches the result"""
+
+    def __init__(self, probe, breaker: Optional[CircuitBreaker] = None,
+                 interval: float = 5.0, clock=time.monotonic):
+        self.probe = probe
+        self.breaker = breaker
+        self.interval = interval
+        self._clock = clock
+        self._last = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """Run one probe, record it and return whether the database is up"""
+        start = time.perf_counter()
+        try:
+            self.probe()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        DB_PROBE_DURATION.observe(elapsed)
+        DB_UP.set(0 if error else 1)
+        if self.breaker is not None:
+            if error:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if error and (self._last is None or self._last["healthy"]):
+            logger.error("Database probe failed: %s", error)
+        elif not error and self._last is not None and not self._last["healthy"]:
+            logger.info("Database probe succeeded again")
+        self._last = {
+            "healthy": error is None,
+            "latency_ms": round(elapsed * 1000, 2),
+            "error": error,
+            "checked": self._clock(),
+            "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        return error is None
+
+    def status(self) -> dict:
+        """The cached result; unhealthy when missing or older than three intervals"""
+        last = self._last
+        circuit = self.breaker.state if self.breaker is not None else None
+        if last is None:
+            return {"healthy": False, "error": "Not probed yet", "circuit": circuit}
+        age = self._clock() - last["checked"]
+        status = {key: value for key, value in last.items() if key != "checked"}
+        status["age_seconds"] = round(age, 2)
+        status["circuit"] = circuit
+        if age > 3 * self.interval:
+            status["healthy"] = False
+            status["error"] = f"Probe stalled for {age:.0f}s"
+        return status
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Database probe error: %s", e)
+            if self._stopped.wait(self.interval):
+                return
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="db-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+
+# Shared by the request path, /health and the startup/shutdown handlers
+db_breaker = CircuitBreaker(DB_CIRCUIT_FAILURES, DB_CIRCUIT_RESET_SECONDS)
+db_prober = DatabaseProber(ping, db_breaker, DB_PROBE_INTERVAL)
@@ -1,11 +1,20 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.recommendations import router as rec_router, initialize_services
-from app.core.logging_config import setup_logging, get_logger
-from app.db.database import test_connection
+from fastapi.responses import Response
+from app.api.recommendations import (
+    router as rec_router,
+    initialize_services,
+    shutdown_services,
+    services_ready
+)
+from app.api.admin import router as admin_router
+from app.api.feedback import router as feedback_router
+from app.core.logging_config import setup_logging, shutdown_logging, get_logger
+from app.core import metrics
+from app.db.database import check_connection
+from app.db.health import db_prober
+from app.config import check_required_settings
 
-# Setup logging
-setup_logging()
 logger = get_logger(__name__)
 
 app = FastAPI(
@@ -21,24 +30,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """Collect per-stage timings and report them in a Server-Timing header"""
+    timings, token = metrics.begin_request()
+    try:
+        response = await call_next(request)
+    finally:
+        total = metrics.end_request(timings, token)
+    response.headers["Server-Timing"] = timings.server_timing(total)
+    return response
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    # Logging opens LOG_FILE and starts its listener thread, so it is set up
+    # here rather than on import
+    setup_logging()
     logger.info("Starting ML Post Recommender service")
 
     try:
+        check_required_settings()
+
         # Test database connection
         logger.info("Testing database connection")
-        if not test_connection():
+        if not await check_connection():
             raise Exception("Database connection failed")
 
         # Initialize recommendation services
         logger.info("Initializing recommendation services")
         initialize_services()
 
+        # /health reads the prober's cached status from here on
+        db_prober.start()
+
         logger.info("Service startup completed successfully")
 
     except Exception as e:
@@ -50,21 +80,37 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down ML Post Recommender service")
+    db_prober.stop()
+    shutdown_services()
+    shutdown_logging()
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    try:
-        # Test database connection
-        if not test_connection():
-            raise HTTPException(
-                status_code=503, detail="Database connection failed")
+    """Health check endpoint.
+
+    Reads the database status cached by the background prober, so it never
+    waits on the database. While the database is down the service still
+    answers from memory and reports itself degraded.
+    """
+    if not services_ready():
+        raise HTTPException(status_code=503, detail="Service not initialized")
+
+    database = db_prober.status()
+    if not database["healthy"]:
+        return {"status": "degraded", "message": "Database unavailable, serving from memory",
+                "database": database}
+    return {"status": "healthy", "message": "Service is running", "database": database}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=metrics.REGISTRY.render(),
+                    media_type=metrics.PROMETHEUS_CONTENT_TYPE)
 
-        return {"status": "healthy", "message": "Service is running"}
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(status_code=503, detail="Service unhealthy")
 
 # Include routers
 app.include_router(rec_router, prefix="/api/v1", tags=["recommendations"])
+app.include_router(feedback_router, prefix="/api/v1", tags=["feedback"])
+app.include_router(admin_router, prefix="/api/v1/admin", tags=["admin"])
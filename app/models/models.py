@@ -65,3 +65,23 @@ class Feed(Base):
         Index('idx_feed_time', 'time'),
         Index('idx_feed_user_time', 'user_id', 'time'),
     )
+
+
+class ExposureLog(Base):
+    """Recommendations served to a user, as consumed by the A/B analysis"""
+    __tablename__ = 'exposure_log'
+
+    id = Column(Integer, primary_key=True, autoincrement=True,
+                doc="Exposure identifier")
+    user_id = Column(Integer, nullable=False, doc="User identifier")
+    exp_group = Column(String, nullable=False, doc="Experiment group served")
+    model_version = Column(String, nullable=False,
+                           doc="Version of the model behind the arm")
+    tier = Column(String, nullable=False, doc="Ranking tier that produced the list")
+    recommendations = Column(String, nullable=False,
+                             doc="Ranked post ids, e.g. '[12 7 301]'")
+    timestamp = Column(DateTime, nullable=False, doc="Request timestamp")
+
+    __table_args__ = (
+        Index('idx_exposure_user_time', 'user_id', 'timestamp'),
+    )
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal
 
 
 class PostGet(BaseModel):
@@ -10,7 +11,7 @@ class PostGet(BaseModel):
                        example="technology")
 
     class Config:
-        orm_mode = True
+        from_attributes = True
         schema_extra = {
             "example": {
                 "id": 123,
@@ -25,6 +26,8 @@ class Response(BaseModel):
                            description="Experiment group (control/test)", example="control")
     recommendations: List[PostGet] = Field(...,
                                            description="List of recommended posts")
+    tier: str = Field("model",
+                      description="Ranking tier that produced the list (model/precomputed/segment/popular)", example="model")
 
     class Config:
         schema_extra = {
@@ -41,6 +44,25 @@ class Response(BaseModel):
                         "text": "Sample post 2",
                         "topic": "science"
                     }
-                ]
+                ],
+                "tier": "model"
             }
         }
+
+
+class FeedActionIn(BaseModel):
+    user_id: int = Field(..., description="User ID", example=123)
+    post_id: int = Field(..., description="Post ID", example=456)
+    action: Literal["like", "view"] = Field(...,
+                                            description="Action type", example="like")
+    time: datetime = Field(..., description="Action timestamp",
+                           example="2024-01-15T10:30:00")
+
+
+class FeedbackBatch(BaseModel):
+    actions: List[FeedActionIn] = Field(...,
+                                        description="Feed actions to ingest")
+
+
+class FeedbackAccepted(BaseModel):
+    accepted: int = Field(..., description="Number of actions accepted", example=2)
@@ -0,0 +1,113 @@
+"""Sustained ingest throughput of the feedback writer.
+
+Posts ``--requests`` batches of ``--actions`` random likes/views through
+``FeedbackIngestor.submit`` while its background thread writes them to
+``feed_action``, then reports:
+    submit_us           - median latency of one submit call (request path)
+    accepted_per_sec    - actions accepted per second by submit
+    written_per_sec     - actions committed per second, submit to last flush
+    rejected            - batches refused because the buffer was full
+
+Runs against ``--database-url`` (default: a temporary SQLite file); point
+it at a scratch PostgreSQL database to measure the production path.
+
+Usage:
+    python -m benchmarks.bench_feedback --requests 2000 --actions 100
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("MODEL_CONTROL_PATH", "unused.cbm")
+os.environ.setdefault("MODEL_TEST_PATH", "unused.cbm")
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+
+from app.core.feedback import (  # noqa: E402
+    BufferFullError,
+    FeedAction,
+    FeedbackIngestor,
+    RecentLikes
+)
+from app.models.models import Feed  # noqa: E402
+
+
+def run(engine, requests: int, actions: int, batch_size: int, flush_interval: float,
+        max_buffer: int, users: int = 100_000, posts: int = 7000, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    ingestor = FeedbackIngestor(engine, RecentLikes(), max_buffer=max_buffer,
+                                batch_size=batch_size, flush_interval=flush_interval)
+    ingestor.start()
+
+    # Distinct timestamps keep every generated row unique
+    base = datetime(2024, 1, 1)
+    latencies = []
+    rejected = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        user_ids = rng.integers(1, users, actions)
+        post_ids = rng.integers(1, posts, actions)
+        kinds = np.where(rng.random(actions) < 0.1, "like", "view")
+        batch = [
+            FeedAction(int(u), int(p), str(k), base + timedelta(microseconds=i * actions + j))
+            for j, (u, p, k) in enumerate(zip(user_ids, post_ids, kinds))
+        ]
+        t0 = time.perf_counter()
+        try:
+            ingestor.submit(batch)
+        except BufferFullError:
+            rejected += 1
+        latencies.append(time.perf_counter() - t0)
+    submit_seconds = time.perf_counter() - start
+    ingestor.stop()
+    total_seconds = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        written = conn.execute(select(func.count()).select_from(Feed.__table__)).scalar()
+
+    return {
+        "dialect": engine.dialect.name,
+        "requests": requests,
+        "actions_per_request": actions,
+        "batch_size": batch_size,
+        "flush_interval": flush_interval,
+        "submit_us": round(statistics.median(latencies) * 1e6, 1),
+        "accepted_per_sec": round((requests - rejected) * actions / submit_seconds),
+        "written": written,
+        "written_per_sec": round(written / total_seconds),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--actions", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--max-buffer", type=int, default=200_000)
+    args = parser.parse_args()
+
+    results = []
+    for batch_size in args.batch_size:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = args.database_url or f"sqlite:///{os.path.join(tmp, 'feedback.db')}"
+            engine = create_engine(url)
+            Feed.__table__.drop(engine, checkfirst=True)
+            Feed.__table__.create(engine)
+            results.append(run(engine, args.requests, args.actions, batch_size,
+                               args.flush_interval, args.max_buffer))
+            engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Requests/sec of the recommendations endpoint with different logging setups.
+
+Modes:
+    off    - logging disabled
+    sync   - StreamHandler + FileHandler on the root logger (the old setup)
+    queue  - QueueHandler/QueueListener pipeline from setup_logging()
+
+The recommender service and DB session are stubbed so the numbers isolate
+the cost of the request path plus logging.
+
+Usage:
+    python -m benchmarks.bench_logging --requests 2000 --threads 4
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_logging_")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("MODEL_CONTROL_PATH", "unused.cbm")
+os.environ.setdefault("MODEL_TEST_PATH", "unused.cbm")
+os.environ["LOG_FILE"] = os.path.join(_tmpdir, "app.log")
+os.environ["LOG_LEVEL"] = "INFO"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.api import recommendations  # noqa: E402
+from app.core import logging_config  # noqa: E402
+from app.db.database import get_db  # noqa: E402
+
+MODES = ("off", "sync", "queue")
+
+
+def _stub_db():
+    db = Mock()
+    query = Mock()
+    query.filter.return_value.distinct.return_value.all.return_value = [
+        (1,), (2,)]
+    query.filter.return_value.all.return_value = [
+        {"id": i, "text": f"Post {i}", "topic": "tech"} for i in range(5)]
+    db.query.return_value = query
+    return db
+
+
+def _stub_service():
+    service = Mock()
+    service.recommend.return_value = ([0, 1, 2, 3, 4], "control", "model")
+    return service
+
+
+def configure(mode: str, devnull):
+    """Switch the process to the given logging mode"""
+    logging_config.shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.disable(logging.NOTSET)
+
+    stdout = sys.stdout
+    sys.stdout = devnull
+    try:
+        if mode == "off":
+            logging.disable(logging.CRITICAL)
+        elif mode == "sync":
+            formatter = logging.Formatter(logging_config.LOG_FORMAT)
+            for handler in (logging.StreamHandler(sys.stdout),
+                            logging.FileHandler(os.environ["LOG_FILE"])):
+                handler.setFormatter(formatter)
+                root.addHandler(handler)
+            root.setLevel(logging.INFO)
+        else:
+            logging_config.setup_logging()
+    finally:
+        sys.stdout = stdout
+
+
+def run(mode: str, n_requests: int, threads: int, devnull) -> dict:
+    configure(mode, devnull)
+    client = TestClient(app)
+    url = "/api/v1/post/recommendations/?user_id=1&time=2024-01-01T12:00:00"
+
+    def worker(count):
+        for _ in range(count):
+            client.get(url)
+
+    # Warm up
+    worker(50)
+
+    per_thread = n_requests // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, [per_thread] * threads))
+    elapsed = time.perf_counter() - start
+
+    configure("off", devnull)
+    return {
+        "mode": mode,
+        "requests": per_thread * threads,
+        "threads": threads,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(per_thread * threads / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    app.dependency_overrides[get_db] = _stub_db
+    recommendations.recommender_service = _stub_service()
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        for mode in args.modes:
+            results.append(run(mode, args.requests, args.threads, devnull))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory, build speed, query latency and false positives of the seen filter.
+
+Builds a ``SeenFilter`` for ``--users`` users with ``--views`` random views
+each, then measures:
+    bytes_per_user      - filter memory divided by users
+    add_per_sec         - bulk insert throughput of (user, post) pairs
+    query_us            - latency of masking one ``--candidates`` long ranking
+    fpr_measured        - share of never-viewed posts reported as seen
+    fpr_expected        - (1 - exp(-k n / m)) ** k for the same load
+
+Usage:
+    python -m benchmarks.bench_seen_filter --users 10000000 --views 50
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("MODEL_CONTROL_PATH", "unused.cbm")
+os.environ.setdefault("MODEL_TEST_PATH", "unused.cbm")
+
+from app.core.seen_filter import SeenFilter, false_positive_rate  # noqa: E402
+
+
+def run(users: int, views: int, bits: int, hashes: int, catalog: int,
+        candidates: int, queries: int, chunk: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    seen = SeenFilter(np.arange(users), bits, hashes)
+
+    # Views only use even post ids so odd ids are known to be unseen
+    start = time.perf_counter()
+    users_per_chunk = max(1, chunk // views)
+    for first in range(0, users, users_per_chunk):
+        user_ids = np.repeat(np.arange(first, min(users, first + users_per_chunk)), views)
+        post_ids = rng.integers(0, catalog // 2, len(user_ids)) * 2
+        seen.add_many(user_ids, post_ids)
+    build_seconds = time.perf_counter() - start
+
+    probe_users = rng.integers(0, users, queries)
+    ranking = rng.permutation(catalog)[:candidates]
+    start = time.perf_counter()
+    false_positives = 0
+    probed = 0
+    for user_id in probe_users:
+        mask = seen.contains(int(user_id), ranking)
+        unseen = ranking % 2 == 1
+        false_positives += int(mask[unseen].sum())
+        probed += int(unseen.sum())
+    query_seconds = (time.perf_counter() - start) / queries
+
+    return {
+        "users": users,
+        "views_per_user": views,
+        "bits": bits,
+        "hashes": hashes,
+        "bytes_per_user": round(seen.bytes_per_user, 1),
+        "total_mb": round(seen.nbytes / 1e6, 1),
+        "build_seconds": round(build_seconds, 2),
+        "add_per_sec": round(users * views / build_seconds),
+        "query_us": round(query_seconds * 1e6, 1),
+        "candidates": candidates,
+        "fpr_measured": round(false_positives / probed, 5),
+        "fpr_expected": round(false_positive_rate(bits, hashes, views), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000_000)
+    parser.add_argument("--views", type=int, nargs="+", default=[50])
+    parser.add_argument("--bits", type=int, nargs="+", default=[512])
+    parser.add_argument("--hashes", type=int, default=4)
+    parser.add_argument("--catalog", type=int, default=7000)
+    parser.add_argument("--candidates", type=int, default=7000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--chunk", type=int, default=5_000_000, help="Pairs per add_many call")
+    args = parser.parse_args()
+
+    results = [
+        run(args.users, views, bits, args.hashes, args.catalog,
+            args.candidates, args.queries, args.chunk)
+        for bits in args.bits for views in args.views
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Latency of the serving path on seeded synthetic data.
+
+For every combination of ``--posts`` (catalog size) and ``--users``
+(user feature table size) it times:
+    build_features  - ``build_features`` for one user over the catalog
+    predict         - ``model.predict`` on that feature block
+    topk            - the service's sort stage (sort by score, keep the head)
+    recommend       - ``RecommenderService.recommend`` end to end
+    http            - GET /api/v1/post/recommendations/ through TestClient,
+                      with likes and posts served from an in-memory SQLite DB
+Each case reports median, p95 and p99 milliseconds over ``--repeats``
+calls for random users. Results go to stdout or ``--output`` as JSON with
+the commit and library versions, and ``--compare old.json`` prints the
+median change per case against an earlier run.
+
+Usage:
+    python -m benchmarks.bench_serving --posts 1000 7000 --users 10000 100000 \\
+        --output bench.json
+    python -m benchmarks.bench_serving --compare bench_main.json --output bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    make_likes, make_posts, make_users, train_ranker, write_database
+)
+
+import catboost  # noqa: E402
+import pandas as pd  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.api import recommendations  # noqa: E402
+from app.core.features import build_features  # noqa: E402
+from app.core.recommender import RecommenderService  # noqa: E402
+from app.db.database import get_db  # noqa: E402
+from app.main import app  # noqa: E402
+
+CASES = ("build_features", "predict", "topk", "recommend", "http")
+REQUEST_TIME = datetime(2024, 2, 1, 12, 0, 0)
+
+
+def measure(func, args_list, warmup: int = 3) -> dict:
+    """Call ``func(*args)`` for every entry of ``args_list``; latency stats in ms"""
+    for args in args_list[:warmup]:
+        func(*args)
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        "calls": len(timings),
+        "median_ms": round(float(np.median(timings)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+    }
+
+
+def database(users: pd.DataFrame, posts: pd.DataFrame, likes: pd.DataFrame):
+    """In-memory SQLite filled by ``write_database``; returns a session factory"""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    write_database(engine, users, posts, likes)
+    return sessionmaker(bind=engine)
+
+
+def run(n_posts: int, n_users: int, model, cases, repeats: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    users = make_users(n_users, seed)
+    posts = make_posts(n_posts, seed)
+    likes = make_likes(users, posts, seed=seed)
+    liked = likes.groupby('user_id')['post_id'].agg(list)
+    service = RecommenderService(model_control=model, model_test=model,
+                                 user_features=users, post_features=posts)
+
+    sample = rng.choice(users['user_id'].to_numpy(), repeats)
+    cols = list(model.feature_names_)
+    results = []
+
+    def record(case, stats):
+        results.append({"case": case, "posts": n_posts, "users": n_users, **stats})
+
+    if "build_features" in cases:
+        record("build_features", measure(
+            lambda u: build_features(u, posts, users[users['user_id'] == u], REQUEST_TIME),
+            [(u,) for u in sample]))
+
+    frames = [build_features(u, posts, users[users['user_id'] == u], REQUEST_TIME)
+              for u in sample[:min(repeats, 20)]]
+    if "predict" in cases:
+        record("predict", measure(lambda df: model.predict(df[cols]),
+                                  [(frames[i % len(frames)],) for i in range(repeats)]))
+
+    if "topk" in cases:
+        scored = []
+        for df in frames:
+            df = df.copy()
+            df['score'] = model.predict(df[cols])
+            scored.append(df)
+        depth = max(5, service.segment_cache.depth)
+        record("topk", measure(
+            lambda df: df.sort_values('score', ascending=False)['post_id'].head(depth).to_numpy(),
+            [(scored[i % len(scored)],) for i in range(repeats)]))
+
+    if "recommend" in cases:
+        record("recommend", measure(
+            lambda u: service.recommend(u, REQUEST_TIME, liked.get(u, []), 5),
+            [(int(u),) for u in sample]))
+
+    if "http" in cases:
+        session_factory = database(users, posts, likes)
+
+        def override_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_db
+        recommendations.recommender_service = service
+        client = TestClient(app)
+
+        def request(u):
+            response = client.get("/api/v1/post/recommendations/",
+                                  params={"user_id": u, "time": REQUEST_TIME.isoformat()})
+            # An error response would time the failure path instead
+            response.raise_for_status()
+
+        try:
+            record("http", measure(request, [(int(u),) for u in sample]))
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            recommendations.recommender_service = None
+    return results
+
+
+def environment(seed: int) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "catboost": catboost.__version__,
+        "machine": platform.machine(),
+        "seed": seed,
+    }
+
+
+def compare(old: dict, new: dict) -> list:
+    """Median change per (case, posts, users) present in both runs"""
+    def index(report):
+        return {(r["case"], r["posts"], r["users"]): r for r in report["results"]}
+    before, after = index(old), index(new)
+    rows = []
+    for key in sorted(before.keys() & after.keys()):
+        rows.append({
+            "case": key[0], "posts": key[1], "users": key[2],
+            "old_ms": before[key]["median_ms"], "new_ms": after[key]["median_ms"],
+            "change": round(after[key]["median_ms"] / before[key]["median_ms"] - 1, 3),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, nargs="+", default=[1000, 7000])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    # Request logging would dominate the smaller cases
+    logging.disable(logging.INFO)
+    model = train_ranker(make_users(2000, args.seed), make_posts(1000, args.seed), seed=args.seed)
+    results = []
+    for n_posts in args.posts:
+        for n_users in args.users:
+            results.extend(run(n_posts, n_users, model, args.cases, args.repeats, args.seed))
+    report = {"environment": environment(args.seed), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print(json.dumps(compare(json.load(f), report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Speed of the vectorized per-user train/test split against the notebook loop.
+
+Generates ``--rows`` synthetic interactions (``--users`` users, a per-user
+like rate, coarse timestamps so ties occur), then reports:
+    vectorized_seconds  - ``app.core.split.make_split`` on all rows
+    loop_seconds        - the notebook's groupby loop on the first
+                          ``--loop-rows`` rows (it is far too slow for all)
+    identical           - both versions give equal frames on those rows
+
+Usage:
+    python -m benchmarks.bench_split --rows 50000000 --users 200000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.split import make_split
+
+
+def make_split_loop(all_data):
+    """``make_split`` as written in notebooks/ranking.ipynb.
+
+    The reference for this benchmark and for ``tests/test_split.py``.
+    """
+    train_parts = []
+    test_parts = []
+    for user_id, group in all_data.groupby("user_id"):
+        if (group["target"].sum() < 28) or ((group["target"] == 0).sum() < 28):
+            continue
+        class_1 = group[group["target"] == 1]
+        class_0 = group[group["target"] == 0]
+        half_1 = len(class_1) // 2
+        half_0 = len(class_0) // 2
+        train_parts.append(pd.concat([class_1.iloc[:half_1], class_0.iloc[:half_0]]))
+        test_parts.append(pd.concat([class_1.iloc[half_1:], class_0.iloc[half_0:]]))
+    train = pd.concat(train_parts).sort_values("timestamp").reset_index(drop=True)
+    test = pd.concat(test_parts).sort_values("timestamp").reset_index(drop=True)
+    return train, test
+
+
+def synthetic_interactions(rows: int, users: int, posts: int = 7000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(0, users, rows, dtype=np.int32)
+    like_rate = rng.uniform(0.05, 0.4, users).astype(np.float32)
+    return pd.DataFrame({
+        "user_id": user_ids,
+        "post_id": rng.integers(0, posts, rows, dtype=np.int32),
+        "timestamp": (np.datetime64("2024-01-01", "s")
+                      + rng.integers(0, 60 * 24 * 60, rows).astype("timedelta64[m]")),
+        "target": (rng.random(rows, dtype=np.float32) < like_rate[user_ids]).astype(np.int8),
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--loop-rows", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_interactions(args.rows, args.users, seed=args.seed)
+    (train, test), vectorized_seconds = timed(make_split, data)
+    result = {
+        "rows": args.rows,
+        "users": args.users,
+        "train_rows": len(train),
+        "test_rows": len(test),
+        "vectorized_seconds": round(vectorized_seconds, 2),
+    }
+    del train, test
+
+    # The reference loop runs on a prefix; scale users so each still has enough rows
+    sample = synthetic_interactions(args.loop_rows, max(1, args.users * args.loop_rows // args.rows),
+                                    seed=args.seed)
+    (expected_train, expected_test), loop_seconds = timed(make_split_loop, sample)
+    (train, test), sample_seconds = timed(make_split, sample)
+    result.update({
+        "loop_rows": args.loop_rows,
+        "loop_seconds": round(loop_seconds, 2),
+        "vectorized_seconds_on_loop_rows": round(sample_seconds, 2),
+        "identical": bool(train.equals(expected_train) and test.equals(expected_test)),
+    })
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Import time and readiness of a fresh worker process.
+
+Two measurements, each in ``--runs`` new interpreters:
+    imports    - ``python -X importtime -c "import app.main"``: total import
+                 time, self time per top-level package (what each library
+                 costs, however deep it is imported) and the modules with the
+                 largest cumulative time
+    readiness  - import of ``app.main`` plus the startup handler (database
+                 check, feature queries, model loading) against a seeded
+                 SQLite fixture (``benchmarks.synthetic.build_local_database``),
+                 and the wall time of the whole process
+Importing ``app.main`` needs no environment: settings are checked and the
+engine and catboost are created on startup, not at import.
+
+Medians go to stdout or ``--output`` as JSON; ``--compare old.json`` prints
+the change of each median against an earlier run.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+    python -m benchmarks.bench_startup --compare startup_main.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.synthetic import build_local_database
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+READY = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        print(json.dumps({"import_ms": imported - start, "startup_ms": ready - imported}))
+
+asyncio.run(main())
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self_us, cumulative_us, depth) per line of ``-X importtime`` output"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Nested imports are indented two spaces per level below the first
+            modules.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return modules
+
+
+def summarize_imports(modules: list, top: int = 15) -> dict:
+    """Total, self time per top-level package and the slowest modules"""
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    slowest = sorted(modules, key=lambda m: m[2], reverse=True)[:top]
+    return {
+        "total_ms": sum(cumulative for _, _, cumulative, depth in modules if depth == 0) // 1000,
+        "modules": len(modules),
+        "packages_ms": {name: us // 1000 for name, us in ranked},
+        "slowest_ms": {name: cumulative // 1000 for name, _, cumulative, _ in slowest},
+    }
+
+
+def clean_env(extra: dict = None) -> dict:
+    """This environment without the service settings, plus ``extra``"""
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("DATABASE_URL", "LOCAL_DB_PATH", "MODEL_CONTROL_PATH",
+                          "MODEL_TEST_PATH")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    env.update(extra or {})
+    return env
+
+
+def import_profile(module: str = "app.main", env: dict = None) -> list:
+    """``-X importtime`` of ``import module`` in a fresh interpreter"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env or clean_env(), check=True)
+    return parse_importtime(result.stderr)
+
+
+def readiness(env: dict) -> dict:
+    """Import, startup handler and process wall time of one fresh worker"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", READY], capture_output=True, text=True,
+                            env=env, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = time.perf_counter() - start
+    timings["ready_ms"] = timings["import_ms"] + timings["startup_ms"]
+    return {key: round(value * 1000, 1) for key, value in timings.items()}
+
+
+def medians(runs: list) -> dict:
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+
+
+def run(runs: int, users: int, posts: int, seed: int, top: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = clean_env({
+            **build_local_database(directory, users, posts, seed=seed),
+            "EXPOSURE_SINK": "none",
+            "LOG_LEVEL": "WARNING",
+            "LOG_FILE": os.path.join(directory, "app.log"),
+        })
+        profiles = [summarize_imports(import_profile(env=env), top) for _ in range(runs)]
+        ready = [readiness(env) for _ in range(runs)]
+
+    # Package and module lists come from the run with the median total
+    profile = sorted(profiles, key=lambda p: p["total_ms"])[len(profiles) // 2]
+    return {
+        "runs": runs,
+        "fixture": {"users": users, "posts": posts},
+        "imports": profile,
+        "readiness_ms": medians(ready),
+    }
+
+
+def compare(old: dict, new: dict) -> dict:
+    """Change of the import total and each readiness median"""
+    rows = {"import_total_ms": (old["imports"]["total_ms"], new["imports"]["total_ms"])}
+    for key in old["readiness_ms"].keys() & new["readiness_ms"].keys():
+        rows[key] = (old["readiness_ms"][key], new["readiness_ms"][key])
+    return {key: {"old": before, "new": after, "change": round(after / before - 1, 3)}
+            for key, (before, after) in sorted(rows.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--users", type=int, default=10_000, help="Fixture users")
+    parser.add_argument("--posts", type=int, default=1000, help="Fixture posts")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules to list")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    report = run(args.runs, args.users, args.posts, args.seed, args.top)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print(json.dumps(compare(json.load(f), report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Replay recorded or synthetic recommendation requests against the service.
+
+Requests come from ``--log``, either JSON lines or a CSV such as the
+exposure log files. Each entry has ``user_id``, ``time`` (or ``timestamp``)
+and an optional ``limit``, and entries without them are skipped. Without
+``--log``, ``--synthetic N`` draws N requests for random users.
+
+Two load models:
+    closed  - ``--concurrency`` clients, each sends its next request when
+              the previous one has returned
+    open    - requests arrive at ``--rate`` per second (Poisson arrivals)
+              however slow the responses are. Latency counts from the
+              scheduled arrival, so a slow server also shows up as client
+              queueing. Arrivals beyond ``--max-in-flight`` outstanding
+              requests are not sent and count as ``client_overflow``.
+
+``--local`` starts the app itself (uvicorn) on a seeded SQLite fixture
+(``benchmarks.synthetic.build_local_database``), so a run needs no
+database or model files. The report has throughput, p50/p95/p99/max latency, errors
+by status code or exception name, and the same per arm (``exp_group``)
+with its tiers.
+
+Usage:
+    python -m benchmarks.load_replay --local --synthetic 5000 --rate 50
+    python -m benchmarks.load_replay --url http://localhost:8000 \\
+        --log requests.jsonl --concurrency 16 --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import build_local_database
+
+ENDPOINT = "/api/v1/post/recommendations/"
+OVERFLOW = "client_overflow"
+
+
+class Outcome(NamedTuple):
+    latency: float
+    status: str
+    exp_group: Optional[str] = None
+    tier: Optional[str] = None
+
+
+def read_log(path: str) -> list:
+    """Requests (``user_id``, ``time``, ``limit``) from a JSON lines or CSV file"""
+    if path.endswith(".csv"):
+        records = pd.read_csv(path).to_dict(orient="records")
+    else:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    requests = []
+    for record in records:
+        request_time = record.get("time", record.get("timestamp"))
+        if record.get("user_id") is None or request_time is None:
+            continue
+        requests.append({
+            "user_id": int(record["user_id"]),
+            "time": str(request_time).replace(" ", "T"),
+            "limit": int(record.get("limit", 5)),
+        })
+    return requests
+
+
+def synthetic_log(n: int, users: int, seed: int = 0, limit: int = 5) -> list:
+    """Requests for random users ``1..users`` spread over one week"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 2, 1)
+    return [
+        {"user_id": int(user_id),
+         "time": (start + timedelta(seconds=int(offset))).isoformat(),
+         "limit": limit}
+        for user_id, offset in zip(rng.integers(1, users + 1, n),
+                                   rng.integers(0, 7 * 86400, n))
+    ]
+
+
+async def send(client: httpx.AsyncClient, request: dict) -> tuple:
+    """Status, arm and tier of one request"""
+    try:
+        response = await client.get(ENDPOINT, params=request)
+    except httpx.HTTPError as e:
+        return type(e).__name__, None, None
+    if response.status_code != 200:
+        return str(response.status_code), None, None
+    body = response.json()
+    return "200", body.get("exp_group"), body.get("tier")
+
+
+async def closed_loop(client: httpx.AsyncClient, requests: list, concurrency: int) -> list:
+    outcomes = []
+    pending = iter(requests)
+
+    async def worker():
+        for request in pending:
+            start = time.perf_counter()
+            result = await send(client, request)
+            outcomes.append(Outcome(time.perf_counter() - start, *result))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+
+async def open_loop(client: httpx.AsyncClient, requests: list, rate: float,
+                    max_in_flight: int, seed: int = 0) -> list:
+    loop = asyncio.get_running_loop()
+    arrivals = np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate, len(requests)))
+    outcomes = []
+    tasks = []
+    in_flight = 0
+
+    async def fire(request, scheduled):
+        nonlocal in_flight
+        try:
+            result = await send(client, request)
+        finally:
+            in_flight -= 1
+        outcomes.append(Outcome(loop.time() - scheduled, *result))
+
+    start = loop.time()
+    for request, offset in zip(requests, arrivals):
+        scheduled = start + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            outcomes.append(Outcome(0.0, OVERFLOW))
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(fire(request, scheduled)))
+    await asyncio.gather(*tasks)
+    return outcomes
+
+
+def latency_stats(latencies) -> dict:
+    ms = np.asarray(latencies, dtype=float) * 1000
+    if not len(ms):
+        return {}
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def summarize(outcomes: list, elapsed: float) -> dict:
+    """Throughput, latency, errors and per-arm stats of a run"""
+    sent = [o for o in outcomes if o.status != OVERFLOW]
+    served = [o for o in sent if o.status == "200"]
+    arms = {}
+    for arm in sorted({o.exp_group for o in served}, key=str):
+        arm_outcomes = [o for o in served if o.exp_group == arm]
+        arms[arm] = {
+            "requests": len(arm_outcomes),
+            "share": round(len(arm_outcomes) / len(served), 4),
+            **latency_stats([o.latency for o in arm_outcomes]),
+            "tiers": dict(Counter(o.tier for o in arm_outcomes)),
+        }
+    return {
+        "requests": len(outcomes),
+        "succeeded": len(served),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(sent) / elapsed, 2) if elapsed else None,
+        "goodput_rps": round(len(served) / elapsed, 2) if elapsed else None,
+        "latency": latency_stats([o.latency for o in sent]),
+        "errors": dict(Counter(o.status for o in outcomes if o.status != "200")),
+        "arms": arms,
+    }
+
+
+def replay(url: str, requests: list, concurrency: int = 8, rate: float = None,
+           max_in_flight: int = 256, timeout: float = 10.0, seed: int = 0,
+           transport=None) -> dict:
+    """Send ``requests`` closed-loop, or open-loop when ``rate`` is given"""
+    async def run():
+        connections = max_in_flight if rate else concurrency
+        limits = httpx.Limits(max_connections=connections,
+                              max_keepalive_connections=connections)
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits,
+                                     transport=transport) as client:
+            start = time.perf_counter()
+            if rate:
+                outcomes = await open_loop(client, requests, rate, max_in_flight, seed)
+            else:
+                outcomes = await closed_loop(client, requests, concurrency)
+            return outcomes, time.perf_counter() - start
+
+    outcomes, elapsed = asyncio.run(run())
+    report = summarize(outcomes, elapsed)
+    report["mode"] = "open" if rate else "closed"
+    if rate:
+        report["offered_rps"] = rate
+    else:
+        report["concurrency"] = concurrency
+    return report
+
+
+@contextmanager
+def local_service(users: int = 10_000, posts: int = 1000, seed: int = 0, port: int = 8765,
+                  env: dict = None, startup_timeout: float = 120.0):
+    """Run the app with uvicorn on a fixture database; yields its base URL"""
+    with tempfile.TemporaryDirectory() as directory:
+        service_env = {
+            **os.environ,
+            **build_local_database(directory, users, posts, seed=seed),
+            "EXPOSURE_SINK": "none",
+            "LOG_FILE": os.path.join(directory, "app.log"),
+            **(env or {}),
+        }
+        url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            env=service_env)
+        try:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Service exited during startup ({process.returncode})")
+                try:
+                    if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Service not healthy after {startup_timeout:.0f}s")
+                time.sleep(0.5)
+            yield url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--log", help="JSON lines or CSV with user_id, time and limit")
+    source.add_argument("--synthetic", type=int, help="Number of synthetic requests")
+    parser.add_argument("--requests", type=int,
+                        help="Requests to send, cycling through the log (default: all once)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--local", action="store_true",
+                        help="Start the app on a seeded SQLite fixture instead of using --url")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the --local service")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the --local service")
+    parser.add_argument("--users", type=int, default=10_000,
+                        help="Fixture users, and the user id range of --synthetic")
+    parser.add_argument("--posts", type=int, default=1000, help="Fixture posts")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, help="Open-loop arrivals per second")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.log:
+        requests = read_log(args.log)
+        if not requests:
+            parser.error(f"No requests with user_id and time in {args.log}")
+    else:
+        requests = synthetic_log(args.synthetic, args.users, args.seed)
+    if args.requests:
+        requests = list(itertools.islice(itertools.cycle(requests), args.requests))
+
+    def run(url):
+        return replay(url, requests, args.concurrency, args.rate, args.max_in_flight,
+                      args.timeout, args.seed)
+
+    if args.local:
+        env = dict(item.split("=", 1) for item in args.env)
+        with local_service(args.users, args.posts, args.seed, args.port, env) as url:
+            report = run(url)
+    else:
+        report = run(args.url)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Seeded synthetic users, posts, likes and ranker for benchmarks.
+
+The frames follow the production schema: ``user_data`` columns for users,
+``post_text_df``-style columns for posts, ``feed_action`` rows for likes.
+The ranker is a small CatBoostRanker trained on the features of
+``scripts/train_model.py``, so predict cost has the real shape (numeric
+plus categorical features) at a fraction of the training time.
+
+``write_database`` stores the frames in the tables the service reads at
+startup and per request, and ``build_local_database`` adds the models, so
+the whole app can run against a local SQLite file (``LOCAL_DB_PATH``).
+The same ``seed`` always gives the same data and model.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("MODEL_CONTROL_PATH", "unused.cbm")
+os.environ.setdefault("MODEL_TEST_PATH", "unused.cbm")
+
+from catboost import CatBoostRanker, Pool  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.models.models import Base  # noqa: E402
+
+# Same features as scripts/train_model.py
+FEATURES = ['gender', 'age', 'topic', 'country', 'city', 'os', 'rating']
+CAT_FEATURES = ['topic', 'city', 'os', 'country']
+
+TOPICS = ['business', 'covid', 'entertainment', 'sport', 'politics', 'tech', 'movie']
+COUNTRIES = ['Russia', 'Ukraine', 'Belarus', 'Azerbaijan', 'Kazakhstan', 'Finland', 'Turkey']
+CITIES = [f'city_{i}' for i in range(200)]
+OS = ['Android', 'iOS']
+SOURCES = ['ads', 'organic']
+
+
+def make_users(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': np.arange(1, n + 1),
+        'gender': rng.integers(0, 2, n),
+        'age': rng.integers(14, 80, n),
+        'country': rng.choice(COUNTRIES, n, p=[0.6, 0.15, 0.1, 0.05, 0.05, 0.03, 0.02]),
+        'city': rng.choice(CITIES, n),
+        'exp_group': rng.integers(0, 5, n),
+        'os': rng.choice(OS, n, p=[0.65, 0.35]),
+        'source': rng.choice(SOURCES, n),
+    })
+
+
+def make_posts(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({
+        'post_id': np.arange(1, n + 1),
+        'text': [f'post {i} ' + 'lorem ' * int(k) for i, k in
+                 enumerate(rng.integers(10, 200, n), start=1)],
+        'topic': rng.choice(TOPICS, n),
+        'rating': rng.beta(2, 5, n),
+    })
+
+
+def make_likes(users: pd.DataFrame, posts: pd.DataFrame, per_user: float = 20,
+               seed: int = 0) -> pd.DataFrame:
+    """Like rows with popular (high rating) posts liked more often"""
+    rng = np.random.default_rng(seed + 2)
+    counts = rng.poisson(per_user, len(users))
+    weights = posts['rating'].to_numpy() / posts['rating'].sum()
+    frame = pd.DataFrame({
+        'user_id': np.repeat(users['user_id'].to_numpy(), counts),
+        'post_id': rng.choice(posts['post_id'].to_numpy(), counts.sum(), p=weights),
+        'action': 'like',
+        'time': [datetime(2024, 1, 1) + timedelta(seconds=int(s))
+                 for s in rng.integers(0, 30 * 86400, counts.sum())],
+    })
+    return frame.drop_duplicates(['user_id', 'post_id']).reset_index(drop=True)
+
+
+def train_ranker(users: pd.DataFrame, posts: pd.DataFrame, rows: int = 20_000,
+                 iterations: int = 200, seed: int = 0) -> CatBoostRanker:
+    """Small YetiRank model; targets depend on rating, topic and age"""
+    rng = np.random.default_rng(seed + 3)
+    data = pd.DataFrame({
+        'user_id': np.sort(rng.choice(users['user_id'].to_numpy(), rows)),
+        'post_id': rng.choice(posts['post_id'].to_numpy(), rows),
+    })
+    data = data.merge(users, on='user_id').merge(posts, on='post_id')
+    data = data.sort_values('user_id', kind='stable').reset_index(drop=True)
+    affinity = (data['rating'] + 0.2 * (data['topic'] == 'sport') * (data['age'] < 30)
+                + rng.normal(0, 0.15, len(data)))
+    data['target'] = (affinity > 0.45).astype(int)
+
+    model = CatBoostRanker(iterations=iterations, loss_function='YetiRank', depth=6,
+                           random_seed=seed, verbose=False, thread_count=1,
+                           allow_writing_files=False)
+    model.fit(Pool(data[FEATURES], data['target'], group_id=data['user_id'],
+                   cat_features=CAT_FEATURES))
+    return model
+
+
+def write_database(engine, users: pd.DataFrame, posts: pd.DataFrame, likes: pd.DataFrame):
+    """Feature tables (``user_data``, ``post_text_df``) plus ``post`` and ``feed_action``.
+
+    ``post`` and ``feed_action`` are created from ``app/models/models.py``
+    with their indexes; the feature tables get a unique index on their id.
+    """
+    Base.metadata.create_all(engine)
+    users.to_sql('user_data', engine, if_exists='replace', index=False)
+    posts.to_sql('post_text_df', engine, if_exists='replace', index=False)
+    posts[['post_id', 'text', 'topic']].rename(columns={'post_id': 'id'}).to_sql(
+        'post', engine, if_exists='append', index=False)
+    likes.to_sql('feed_action', engine, if_exists='append', index=False)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE UNIQUE INDEX idx_user_data_user_id ON user_data (user_id)"))
+        conn.execute(text("CREATE UNIQUE INDEX idx_post_text_df_post_id ON post_text_df (post_id)"))
+
+
+def build_local_database(directory: str, users: int = 10_000, posts: int = 1000,
+                         likes_per_user: float = 20, seed: int = 0) -> dict:
+    """SQLite database and control/test models in ``directory``.
+
+    Returns the environment that runs the service on them.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'recsys.db')
+    if os.path.exists(path):
+        os.remove(path)
+    user_frame, post_frame = make_users(users, seed), make_posts(posts, seed)
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        write_database(engine, user_frame, post_frame,
+                       make_likes(user_frame, post_frame, likes_per_user, seed))
+    finally:
+        engine.dispose()
+
+    model = train_ranker(user_frame, post_frame, seed=seed)
+    env = {'LOCAL_DB_PATH': path, 'AB_TEST_ENABLED': 'true'}
+    for arm in ('control', 'test'):
+        env[f'MODEL_{arm.upper()}_PATH'] = os.path.join(directory, f'{arm}.cbm')
+        model.save_model(env[f'MODEL_{arm.upper()}_PATH'])
+    return env
@@ -0,0 +1,20 @@
+import argparse
+import os
+from benchmarks.synthetic import build_local_database
+
+
+parser = argparse.ArgumentParser(
+    description="Build a seeded SQLite database and models to run the service without Postgres")
+parser.add_argument('--dir', default='local', help="Output directory for recsys.db and the models")
+parser.add_argument('--users', type=int, default=10_000)
+parser.add_argument('--posts', type=int, default=1000)
+parser.add_argument('--likes-per-user', type=float, default=20)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+env = build_local_database(os.path.abspath(args.dir), args.users, args.posts,
+                           args.likes_per_user, args.seed)
+
+# Printed as KEY=VALUE lines, ready for `env $(cat local.env) uvicorn app.main:app`
+for key, value in env.items():
+    print(f"{key}={value}")
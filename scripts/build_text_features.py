@@ -0,0 +1,39 @@
+import argparse
+from dotenv import load_dotenv
+
+# Settings are read when app.config is imported, so .env is loaded first
+load_dotenv()
+
+from app.core.text_features import TransformerEmbedder, update_post_features  # noqa: E402
+from app.db import database  # noqa: E402
+from app.config import (  # noqa: E402
+    POST_FEATURES_QUERY,
+    TEXT_FEATURES_TABLE,
+    TEXT_EMBEDDING_MODEL,
+    TEXT_EMBEDDING_CACHE,
+    TEXT_CLUSTER_MODEL
+)
+
+
+parser = argparse.ArgumentParser(
+    description="Embed new or changed post texts and refresh TextCluster/DistanceToCluster_* columns")
+parser.add_argument('--refit', action='store_true',
+                    help="Fit a new PCA/KMeans instead of reusing TEXT_CLUSTER_MODEL")
+parser.add_argument('--components', type=int, default=50)
+parser.add_argument('--clusters', type=int, default=15)
+parser.add_argument('--batch-size', type=int, default=32)
+parser.add_argument('--threads', type=int, default=None, help="torch CPU threads")
+args = parser.parse_args()
+
+report = update_post_features(
+    database.engine,
+    table=TEXT_FEATURES_TABLE,
+    source_query=POST_FEATURES_QUERY,
+    cache_path=TEXT_EMBEDDING_CACHE,
+    cluster_path=TEXT_CLUSTER_MODEL,
+    embedder=TransformerEmbedder(TEXT_EMBEDDING_MODEL, args.batch_size, threads=args.threads),
+    refit=args.refit,
+    n_components=args.components,
+    n_clusters=args.clusters
+)
+print(report)
@@ -1,41 +1,82 @@
-import pandas as pd
-import numpy as np
-from catboost import Pool
-from catboost import CatBoostRanker
-
-
-post_data = pd.read_csv('post_data.csv')
-user_data = pd.read_csv('user_data.csv')
-
-# Load Data (with correct features)
-train = pd.read_csv('train_balanced.csv')
-test=pd.read_csv('test_balanced.csv')
-
-train = train.merge(post_data,on='post_id',how='left')
-train = train.merge(user_data,on='user_id',how='left')
-
-test = test.merge(post_data,on='post_id',how='left')
-test = test.merge(user_data,on='user_id',how='left')
+import argparse
+import os
+from dotenv import load_dotenv
+
+# Settings are read when app.config is imported, so .env is loaded first
+load_dotenv()
+
+from catboost import CatBoostRanker  # noqa: E402
+from app.core.prerank import (  # noqa: E402
+    BilinearPreRanker,
+    USER_NUMERIC,
+    USER_CATEGORICAL,
+    POST_NUMERIC,
+    POST_CATEGORICAL
+)
+from app.core.training_data import build_from_csv, build_from_sql  # noqa: E402
+from app.core.split import make_split  # noqa: E402
+from app.config import (  # noqa: E402
+    TRAINING_DATA_DIR,
+    PRERANK_TRAIN_ROWS,
+    TRAINING_ACTIONS_QUERY,
+    USER_FEATURES_QUERY,
+    POST_FEATURES_QUERY
+)
 
 
-# select features 
+parser = argparse.ArgumentParser(description="Train the CatBoost ranker and the pre-ranker")
+parser.add_argument('--data-dir', default='.',
+                    help="Directory with train_balanced.csv, test_balanced.csv, user_data.csv, post_data.csv")
+parser.add_argument('--all-data', default=None,
+                    help="Interactions CSV (all_users.csv) to split per user instead of the *_balanced.csv pair")
+parser.add_argument('--from-db', action='store_true',
+                    help="Stream feed_action from DATABASE_URL instead of reading CSVs")
+parser.add_argument('--test-since', default=None,
+                    help="With --from-db: actions at or after this time form the eval set")
+parser.add_argument('--cache-dir', default=TRAINING_DATA_DIR)
+args = parser.parse_args()
+
+# Load Data: streamed once into compact columnar files, then memory-mapped
+if args.from_db:
+    from app.db import database
+    from app.core.features import load_features
+    data = build_from_sql(
+        database.engine,
+        TRAINING_ACTIONS_QUERY,
+        user_features=load_features(USER_FEATURES_QUERY),
+        post_features=load_features(POST_FEATURES_QUERY),
+        cache_dir=args.cache_dir,
+        test_since=args.test_since
+    )
+elif args.all_data:
+    data = build_from_csv(
+        {'all': args.all_data},
+        user_path=os.path.join(args.data_dir, 'user_data.csv'),
+        post_path=os.path.join(args.data_dir, 'post_data.csv'),
+        cache_dir=args.cache_dir,
+        split=make_split
+    )
+else:
+    data = build_from_csv(
+        {
+            'train': os.path.join(args.data_dir, 'train_balanced.csv'),
+            'test': os.path.join(args.data_dir, 'test_balanced.csv'),
+        },
+        user_path=os.path.join(args.data_dir, 'user_data.csv'),
+        post_path=os.path.join(args.data_dir, 'post_data.csv'),
+        cache_dir=args.cache_dir
+    )
+
+
+# select features
 features = ['gender','age','topic','country','city','os','rating']
 cat_features = ['topic','city','os','country']
 
 # creat data pool for catboost
-train_pool = Pool(
-    data=train[features],
-    label=train['target'],
-    group_id=train['user_id'],
-    cat_features=cat_features
-)
-
-test_pool = Pool(
-    data=test[features],
-    label=test['target'],
-    group_id=test['user_id'],
-    cat_features=cat_features
-)
+has_eval = 'test' in data.parts
+train_pool = data.pool(features, cat_features=cat_features,
+                       part='train' if has_eval else None)
+test_pool = data.pool(features, cat_features=cat_features, part='test') if has_eval else None
 
 
 # train
@@ -52,26 +93,22 @@ rank_model = CatBoostRanker(
     thread_count=10
 )
 
-rank_model.fit(train_pool, eval_set=test_pool, use_best_model=True)
+rank_model.fit(train_pool, eval_set=test_pool, use_best_model=has_eval)
 
-# final train 
+# final train on every row; the columns are already grouped by user
 best_params = rank_model.get_params()
+del train_pool, test_pool
 
-
-full_data = pd.concat([train, test], axis=0)
-
-X_full = full_data[features]
-y_full = full_data['target']
-group_full = full_data['user_id']  
-
-full_pool = Pool(
-    data=X_full,
-    label=y_full,
-    group_id=group_full,
-    cat_features=cat_features
-)
+full_pool = data.pool(features, cat_features=cat_features)
 
 final_model = CatBoostRanker(**best_params)
 final_model.fit(full_pool)
 
-final_model.save_model('final_model',format='cbm')
\ No newline at end of file
+final_model.save_model('final_model',format='cbm')
+del full_pool
+
+# cheap pre-ranker for cascade ranking (PRERANK_PATH), fitted on a bounded
+# sample of the rows and only the columns it encodes
+prerank_columns = USER_NUMERIC + USER_CATEGORICAL + POST_NUMERIC + POST_CATEGORICAL + ['target']
+preranker = BilinearPreRanker.fit(data.sample(PRERANK_TRAIN_ROWS, prerank_columns), target='target')
+preranker.save('final_model.prerank.npz')
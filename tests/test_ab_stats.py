@@ -0,0 +1,99 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from app.analytics.ab_stats import (
+    assign_arms,
+    assign_buckets,
+    bootstrap_difference,
+    bucket_metrics,
+    compare_arms
+)
+from app.config import SALT, GROUP_A_PERCENTAGE
+from app.core.ab_testing import get_exp_group
+
+
+class TestBucketAssignment:
+    """Vectorized MD5 bucketing must match the per-user hashlib version"""
+
+    def test_buckets_match_notebook_hashing(self):
+        # Arrange
+        user_ids = np.concatenate([
+            [0, 1, 9, 10, 99, 100, 123456789, 2 ** 40, -3],
+            np.random.default_rng(0).integers(0, 10 ** 7, 2000),
+        ])
+        expected = [
+            int(hashlib.md5((str(u) + 'bbb').encode()).hexdigest(), 16) % 100
+            for u in user_ids
+        ]
+
+        # Act
+        buckets = assign_buckets(user_ids)
+
+        # Assert
+        assert buckets.tolist() == expected
+
+    def test_arms_match_get_exp_group(self):
+        # Arrange
+        user_ids = np.arange(1, 500)
+
+        # Act
+        arms = assign_arms(user_ids, SALT, GROUP_A_PERCENTAGE)
+
+        # Assert
+        assert arms.tolist() == [get_exp_group(int(u)) for u in user_ids]
+
+
+class TestBucketStats:
+    """Bucket-level metrics and the bootstrap comparison"""
+
+    def test_bucket_metrics_are_per_bucket_ratios(self):
+        # Arrange
+        views = pd.DataFrame({
+            'user_id': np.arange(1000) % 300,
+            'exp_group': np.where(np.arange(1000) % 300 < 150, 'control', 'test'),
+            'hitrate': (np.arange(1000) % 3 == 0).astype(float),
+        })
+        views['bucket'] = assign_buckets(views['user_id'])
+        expected = views.groupby(['exp_group', 'bucket']).hitrate.mean()
+
+        # Act
+        buckets = bucket_metrics(views['user_id'], views['exp_group'], views['hitrate'])
+
+        # Assert
+        actual = buckets.set_index(['exp_group', 'bucket'])['metric']
+        assert buckets['views'].sum() == 1000
+        pd.testing.assert_series_equal(
+            actual.sort_index(), expected.sort_index(), check_names=False)
+
+    def test_parallel_bootstrap_matches_serial(self):
+        # Arrange
+        rng = np.random.default_rng(1)
+        control, treatment = rng.normal(0.5, 0.05, 100), rng.normal(0.52, 0.05, 100)
+
+        # Act
+        serial = bootstrap_difference(control, treatment, 3000, n_jobs=1, seed=7)
+        parallel = bootstrap_difference(control, treatment, 3000, n_jobs=2, seed=7)
+
+        # Assert
+        assert len(serial) == 3000
+        np.testing.assert_allclose(serial, parallel)
+
+    def test_compare_arms_detects_difference(self):
+        # Arrange
+        rng = np.random.default_rng(2)
+        buckets = pd.DataFrame({
+            'exp_group': ['control'] * 100 + ['test'] * 100,
+            'metric': np.concatenate([rng.normal(0.50, 0.01, 100),
+                                      rng.normal(0.55, 0.01, 100)]),
+        })
+
+        # Act
+        result = compare_arms(buckets, n_resamples=2000)
+
+        # Assert
+        assert result['ci_low'] > 0
+        assert result['ci_low'] < result['difference'] < result['ci_high']
+        assert result['p_ttest'] < 0.001
+        assert result['buckets'] == [100, 100]
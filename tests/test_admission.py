@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+
+from app.api.recommendations import admit_request
+from app.core.admission import AdmissionController, OverloadedError, remaining_time
+
+
+class TestAdmissionController:
+    """Test cases for the admission controller"""
+
+    def test_admits_up_to_limit_then_queues(self):
+        """Test that waiters are admitted in order as slots are released"""
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=2, queue_timeout=1.0)
+            await controller.acquire()
+            waiter = asyncio.ensure_future(controller.acquire())
+            await asyncio.sleep(0)
+            assert controller.in_flight == 1
+            assert controller.queued == 1
+
+            controller.release()
+            await waiter
+            assert controller.in_flight == 1
+            assert controller.queued == 0
+
+            controller.release()
+            assert controller.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_rejects_when_queue_full(self):
+        """Test that requests beyond the queue bound are rejected immediately"""
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=0, queue_timeout=1.0)
+            await controller.acquire()
+            with pytest.raises(OverloadedError) as exc_info:
+                await controller.acquire()
+            assert exc_info.value.reason == "queue_full"
+
+        asyncio.run(scenario())
+
+    def test_rejects_after_queue_timeout(self):
+        """Test that a queued request gives up after its wait budget"""
+        async def scenario():
+            controller = AdmissionController(
+                max_concurrency=1, max_queue=5, queue_timeout=0.01)
+            await controller.acquire()
+            with pytest.raises(OverloadedError) as exc_info:
+                await controller.acquire()
+            assert exc_info.value.reason == "queue_timeout"
+            assert controller.queued == 0
+            assert controller.in_flight == 1
+
+        asyncio.run(scenario())
+
+
+class TestAdmissionEndpoint:
+    """Test cases for admission control on the recommendations endpoint"""
+
+    def _mock_db(self, mock_db):
+        mock_query = Mock()
+        mock_query.filter.return_value.distinct.return_value.all.return_value = []
+        mock_query.filter.return_value.all.return_value = []
+        mock_db.query.return_value = mock_query
+
+    def test_overloaded_returns_503(self, client, override_get_db):
+        """Test that a saturated endpoint answers 503 with Retry-After"""
+        self._mock_db(override_get_db)
+        saturated = AdmissionController(
+            max_concurrency=0, max_queue=0, queue_timeout=0.01)
+
+        with patch('app.api.recommendations.admission_controller', saturated):
+            response = client.get(
+                "/api/v1/post/recommendations/",
+                params={"user_id": 1, "time": "2024-01-01T12:00:00"})
+
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert saturated.in_flight == 0
+
+    def test_remaining_deadline_is_ranking_budget(self, client, override_get_db):
+        """Test that the handler passes what is left of the deadline as budget"""
+        self._mock_db(override_get_db)
+
+        with patch('app.api.recommendations.REQUEST_DEADLINE_MS', 0), \
+                patch('app.api.recommendations.recommender_service') as mock_service:
+            mock_service.recommend.return_value = ([], "control", "popular")
+            response = client.get(
+                "/api/v1/post/recommendations/",
+                params={"user_id": 1, "time": "2024-01-01T12:00:00"})
+
+        assert response.status_code == 200
+        assert response.json()["tier"] == "popular"
+        assert mock_service.recommend.call_args.kwargs["time_budget"] <= 0
+
+    def test_slot_released_after_request(self, client, override_get_db):
+        """Test that a served request frees its admission slot"""
+        self._mock_db(override_get_db)
+        controller = AdmissionController(
+            max_concurrency=1, max_queue=0, queue_timeout=0.01)
+
+        with patch('app.api.recommendations.admission_controller', controller), \
+                patch('app.api.recommendations.recommender_service') as mock_service:
+            mock_service.recommend.return_value = ([], "control", "model")
+            for _ in range(3):
+                response = client.get(
+                    "/api/v1/post/recommendations/",
+                    params={"user_id": 1, "time": "2024-01-01T12:00:00"})
+                assert response.status_code == 200
+
+        assert controller.in_flight == 0
+
+    def test_deadline_is_reset_after_request(self):
+        """Test that the request deadline is cleared when the dependency exits"""
+        async def scenario():
+            dependency = admit_request()
+            await dependency.__anext__()
+            during = remaining_time()
+            with pytest.raises(StopAsyncIteration):
+                await dependency.__anext__()
+            return during, remaining_time()
+
+        with patch('app.api.recommendations.ADMISSION_ENABLED', False):
+            during, after = asyncio.run(scenario())
+
+        assert during is not None and during > 0
+        assert after is None
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from catboost import CatBoostRanker, Pool
+
+from app.analytics.compress_model import (
+    evaluate_tree_counts,
+    ranking_metrics,
+    smallest_within,
+    tree_grid
+)
+
+
+@pytest.fixture(scope='module')
+def trained():
+    """Small YetiRank model on a synthetic interaction set"""
+    rng = np.random.default_rng(0)
+    n = 3000
+    data = pd.DataFrame({
+        'user_id': np.sort(rng.integers(0, 150, n)),
+        'age': rng.integers(18, 60, n),
+        'rating': rng.random(n),
+    })
+    data['target'] = (data['rating'] + rng.normal(0, 0.2, n) > 0.7).astype(int)
+    model = CatBoostRanker(iterations=60, loss_function='YetiRank', verbose=False,
+                           random_seed=0, thread_count=1)
+    model.fit(Pool(data[['age', 'rating']], data['target'], group_id=data['user_id']))
+    return model, data
+
+
+class TestCompressModel:
+    """Test cases for the tree count/latency tradeoff tool"""
+
+    def test_ranking_metrics(self):
+        # Arrange: group 1 ranked perfectly, group 2 has its only hit last
+        groups = [1, 1, 1, 2, 2, 2]
+        scores = [0.9, 0.5, 0.1, 0.9, 0.5, 0.1]
+        targets = [1, 0, 0, 0, 0, 1]
+
+        # Act
+        metrics = ranking_metrics(groups, scores, targets, k_ndcg=10, k_hit=2)
+
+        # Assert
+        assert metrics['ndcg@10'] == pytest.approx((1.0 + 1 / np.log2(4)) / 2)
+        assert metrics['hitrate@2'] == pytest.approx(0.5)
+
+    def test_tree_grid_ends_at_full_model(self):
+        grid = tree_grid(500)
+        assert grid[-1] == 500
+        assert grid == sorted(grid)
+
+    def test_evaluate_tree_counts(self, trained):
+        # Arrange
+        model, data = trained
+
+        # Act
+        report = evaluate_tree_counts(model, data, [5, 20, 60], catalog_size=500, repeats=2)
+
+        # Assert
+        assert report['trees'].tolist() == [5, 20, 60]
+        assert report['ndcg_ratio'].iloc[-1] == pytest.approx(1.0)
+        assert (report['predict_ms'] > 0).all()
+        assert report['ndcg@10'].between(0, 1).all()
+
+    def test_smallest_within_threshold(self):
+        # Arrange
+        report = pd.DataFrame({'trees': [10, 50, 100], 'ndcg_ratio': [0.9, 0.995, 1.0]})
+
+        # Act & Assert
+        assert smallest_within(report, 0.99) == 50
+        assert smallest_within(report, 0.5) == 10
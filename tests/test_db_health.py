@@ -0,0 +1,333 @@
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from app.api.recommendations import guarded_query, recommended_posts
+from app.core.admission import reset_deadline, set_deadline
+from app.db.database import (
+    InstrumentedQueuePool, POOL_CHECKOUT_WAIT, backoff_delay, pool_saturation,
+    retry_on_failure
+)
+from app.db.health import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, DatabaseProber
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def down(*args):
+    raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+class TestCircuitBreaker:
+    """Test cases for the database circuit breaker"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Calls are skipped once the threshold is reached"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=FakeClock())
+
+        # Act
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                breaker.call(down)
+
+        # Assert
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "never called")
+
+    def test_success_resets_the_failure_count(self):
+        """Only failures in a row open the circuit"""
+        breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CLOSED
+
+    def test_half_open_lets_one_trial_through(self):
+        """After the reset timeout one call probes the database"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+
+        # Act
+        first, second = breaker.allow(), breaker.allow()
+
+        # Assert
+        assert breaker.state == HALF_OPEN
+        assert (first, second) == (True, False)
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_failed_trial_and_failing_probes_keep_it_open(self):
+        """Each failure while open restarts the reset timeout"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+
+        # Act
+        breaker.record_failure()
+        clock.now = 15
+        breaker.record_failure()
+        clock.now = 24
+
+        # Assert
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+
+class TestDatabaseProber:
+    """Test cases for the background database prober"""
+
+    def test_status_is_cached_and_feeds_the_breaker(self):
+        """A failed probe is reported without probing again and counts as a failure"""
+        # Arrange
+        probe = Mock(side_effect=down)
+        breaker = CircuitBreaker(failure_threshold=1, clock=FakeClock())
+        prober = DatabaseProber(probe, breaker, interval=5, clock=FakeClock())
+
+        # Act
+        healthy = prober.check()
+        status = prober.status()
+        prober.status()
+
+        # Assert
+        assert not healthy
+        assert probe.call_count == 1
+        assert status["healthy"] is False
+        assert "OperationalError" in status["error"]
+        assert status["circuit"] == OPEN
+
+    def test_stale_status_is_unhealthy(self):
+        """A probe stuck on the database does not keep reporting the old result"""
+        # Arrange
+        clock = FakeClock()
+        prober = DatabaseProber(lambda: None, interval=5, clock=clock)
+        prober.check()
+
+        # Act
+        fresh = prober.status()
+        clock.now = 16
+        stale = prober.status()
+
+        # Assert
+        assert fresh["healthy"] is True
+        assert stale["healthy"] is False
+        assert "stalled" in stale["error"]
+
+    def test_background_thread_probes_until_stopped(self):
+        """The prober runs its first check on start"""
+        # Arrange
+        probe = Mock()
+        prober = DatabaseProber(probe, interval=60)
+
+        # Act
+        prober.start()
+        prober.stop()
+        prober._thread.join(timeout=5)
+
+        # Assert
+        assert probe.call_count == 1
+        assert prober.status()["healthy"] is True
+
+
+class TestRetry:
+    """Test cases for retries with jittered backoff"""
+
+    def test_backoff_is_jittered_within_the_exponential_bound(self):
+        """Full jitter: anywhere between zero and delay * 2**attempt"""
+        delays = [backoff_delay(0.5, 3) for _ in range(200)]
+
+        assert all(0 <= d <= 4.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_coroutines_retry_without_blocking_sleep(self):
+        """Async functions are retried with asyncio.sleep, never time.sleep"""
+        # Arrange
+        attempts = []
+
+        @retry_on_failure(max_retries=3, delay=0.001)
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError("SELECT 1", {}, Exception("down"))
+            return "ok"
+
+        # Act
+        with patch('app.db.database.time.sleep') as blocking_sleep:
+            result = asyncio.run(flaky())
+
+        # Assert
+        assert result == "ok"
+        assert len(attempts) == 3
+        blocking_sleep.assert_not_called()
+
+    def test_last_error_is_raised(self):
+        """The sync wrapper gives up after max_retries"""
+        calls = Mock(side_effect=down)
+
+        with patch('app.db.database.time.sleep'):
+            with pytest.raises(OperationalError):
+                retry_on_failure(max_retries=2)(calls)()
+
+        assert calls.call_count == 2
+
+
+class TestPoolInstrumentation:
+    """Test cases for pool checkout metrics"""
+
+    def test_checkouts_are_timed_and_saturation_reported(self, tmp_path):
+        """Every checkout is observed; saturation counts checked-out connections"""
+        # Arrange
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                               poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=2)
+        before = POOL_CHECKOUT_WAIT.count()
+
+        # Act
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            saturation = pool_saturation(engine.pool)
+
+        # Assert
+        assert POOL_CHECKOUT_WAIT.count() == before + 2
+        assert saturation == 0.5
+        assert pool_saturation(engine.pool) == 0.0
+
+    def test_checkout_wait_is_bounded_by_the_request_deadline(self, tmp_path):
+        """A request does not wait the full pool timeout for a connection"""
+        # Arrange: the only connection is taken
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                               poolclass=InstrumentedQueuePool, pool_size=1,
+                               max_overflow=0, pool_timeout=30)
+        held = engine.connect()
+        token = set_deadline(0.05)
+
+        # Act
+        start = time.perf_counter()
+        try:
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        finally:
+            reset_deadline(token)
+            held.close()
+        waited = time.perf_counter() - start
+
+        # Assert
+        assert waited < 5
+        assert engine.pool._timeout == 30
+
+
+class TestDegradedServing:
+    """Recommendations while the database circuit is open"""
+
+    def test_served_from_memory_without_touching_the_database(self):
+        """Likes come from the pending buffer and posts from the post features"""
+        # Arrange
+        db = Mock(spec=Session)
+        service = Mock()
+        service.recommend.return_value = ([5, 4], "control", "model")
+        posts = pd.DataFrame({'post_id': [4, 5, 6], 'text': ["four", "five", "six"],
+                              'topic': ["a", "b", "c"], 'rating': [0.1, 0.2, 0.3]})
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure()
+
+        # Act
+        with patch('app.api.recommendations.db_breaker', breaker), \
+                patch('app.api.recommendations.recommender_service', service), \
+                patch('app.api.recommendations.post_features', posts), \
+                patch('app.api.recommendations.exposure_logger', None):
+            response = recommended_posts(1, datetime(2024, 1, 1), 2, db)
+
+        # Assert
+        db.query.assert_not_called()
+        assert [post.id for post in response.recommendations] == [5, 4]
+        assert response.recommendations[0].text == "five"
+        assert service.recommend.call_args[0][2] == []
+
+    def test_failed_query_degrades_and_rolls_back(self):
+        """A database error serves the stage from memory and counts toward opening"""
+        # Arrange
+        db = Mock(spec=Session)
+        db.query.side_effect = down
+        service = Mock()
+        service.recommend.return_value = ([6], "control", "model")
+        posts = pd.DataFrame({'post_id': [6], 'text': ["six"], 'topic': ["c"]})
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        # Act
+        with patch('app.api.recommendations.db_breaker', breaker), \
+                patch('app.api.recommendations.recommender_service', service), \
+                patch('app.api.recommendations.post_features', posts), \
+                patch('app.api.recommendations.exposure_logger', None):
+            response = recommended_posts(1, datetime(2024, 1, 1), 1, db)
+
+        # Assert
+        assert [post.id for post in response.recommendations] == [6]
+        assert db.rollback.call_count == 2
+        assert breaker.state == OPEN
+
+
+    def test_pool_timeout_degrades_without_opening_the_circuit(self):
+        """Running out of connections or deadline is not a database failure"""
+        # Arrange
+        db = Mock(spec=Session)
+        breaker = CircuitBreaker(failure_threshold=1)
+
+        def no_connection():
+            raise PoolTimeoutError("QueuePool limit reached")
+
+        # Act
+        with patch('app.api.recommendations.db_breaker', breaker):
+            result = guarded_query(db, "likes", no_connection)
+
+        # Assert
+        assert result is None
+        assert breaker.state == CLOSED
+
+
+class TestHealthEndpoint:
+    """Test cases for /health"""
+
+    def test_reports_degraded_from_cached_status(self, client):
+        """A down database is reported without querying it"""
+        prober = DatabaseProber(down, interval=5)
+        prober.check()
+
+        with patch('app.main.db_prober', prober), \
+                patch('app.main.services_ready', return_value=True), \
+                patch('app.db.database.ping') as ping:
+            response = client.get("/health")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "degraded"
+        assert response.json()["database"]["healthy"] is False
+        ping.assert_not_called()
+
+    def test_unavailable_before_services_start(self, client):
+        """Test that an uninitialized worker is not reported healthy"""
+        with patch('app.main.services_ready', return_value=False):
+            response = client.get("/health")
+
+        assert response.status_code == 503
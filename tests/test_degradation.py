@@ -0,0 +1,206 @@
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from app.core.experiments import ExperimentRegistry
+from app.core.recommender import RecommenderService
+from app.core.features import build_features
+from app.core.degradation import (
+    SegmentRankingCache,
+    StageCostEstimator,
+    popularity_ranking,
+    top_unliked
+)
+
+
+def _slow(seconds, func):
+    def wrapper(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+class TestDegradedRecommendations:
+    """Test cases for latency-budgeted ranking tiers"""
+
+    @pytest.fixture
+    def user_features(self):
+        return pd.DataFrame({
+            'user_id': [1, 2, 3],
+            'gender': [0, 0, 1],
+            'country': ['RU', 'RU', 'RU'],
+            'os': ['iOS', 'iOS', 'Android'],
+            'age': [20, 30, 40]
+        })
+
+    @pytest.fixture
+    def post_features(self):
+        return pd.DataFrame({
+            'post_id': [10, 11, 12, 13, 14],
+            'topic': ['a', 'b', 'c', 'd', 'e'],
+            'rating': [0.1, 0.9, 0.5, 0.7, 0.3]
+        })
+
+    @pytest.fixture
+    def model(self):
+        model = Mock()
+        model.feature_names_ = ['age', 'rating']
+        # Reverse catalog order: post 14 scores highest
+        model.predict.side_effect = lambda X: np.arange(len(X), dtype=float)
+        return model
+
+    @pytest.fixture
+    def service(self, model, user_features, post_features):
+        return RecommenderService(
+            model_control=model,
+            model_test=model,
+            user_features=user_features,
+            post_features=post_features
+        )
+
+    def test_model_tier_without_budget(self, service):
+        """Test that without a budget the model ranks the catalog"""
+        result = service.recommend(1, datetime(2024, 1, 1, 12), [14], limit=2)
+
+        assert result.tier == "model"
+        assert result.post_ids == [13, 12]
+
+    def test_slow_features_fall_back_to_popular(self, service):
+        """Test that a slow feature build pushes later requests to popular posts"""
+        # Arrange: the first request teaches the service how slow features are
+        slow_build = _slow(0.05, build_features)
+        with patch('app.core.recommender.build_features', slow_build):
+            service.recommend(3, datetime(2024, 1, 1, 12), [], limit=2)
+            service.segment_cache.invalidate()
+
+            # Act
+            result = service.recommend(
+                1, datetime(2024, 1, 1, 12), [11], limit=2, time_budget=0.01)
+
+        # Assert: popularity order by rating without the liked post 11
+        assert result.tier == "popular"
+        assert result.post_ids == [13, 12]
+
+    def test_slow_predict_serves_segment_ranking(self, service, model):
+        """Test that a slow model serves the segment ranking of a similar user"""
+        # Arrange: user 2 shares gender/country/os with user 1
+        model.predict.side_effect = _slow(
+            0.05, lambda X: np.arange(len(X), dtype=float))
+        service.recommend(2, datetime(2024, 1, 1, 12), [], limit=2)
+
+        # Act
+        result = service.recommend(
+            1, datetime(2024, 1, 1, 12), [14], limit=2, time_budget=0.01)
+
+        # Assert
+        assert result.tier == "segment"
+        assert result.post_ids == [13, 12]
+        assert model.predict.call_count == 1
+
+    def test_exhausted_budget_skips_model(self, service, model):
+        """Test that a non-positive budget never calls the model"""
+        result = service.recommend(
+            1, datetime(2024, 1, 1, 12), [], limit=3, time_budget=0)
+
+        assert result.tier == "popular"
+        assert result.post_ids == [11, 13, 12]
+        model.predict.assert_not_called()
+
+    def test_model_tier_returns_after_transient_slow_predict(
+            self, model, user_features, post_features):
+        """Test that probes re-measure a skipped predict so the model tier comes back"""
+        # Arrange: one slow call raises the predict estimate above the budget
+        service = RecommenderService(
+            model_control=model, model_test=model, user_features=user_features,
+            post_features=post_features, stage_probe_every=5)
+        fast = model.predict.side_effect
+        model.predict.side_effect = _slow(0.3, fast)
+        service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2, time_budget=1.0)
+        model.predict.side_effect = fast
+
+        # Act
+        tiers = [service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2,
+                                   time_budget=0.2).tier
+                 for _ in range(50)]
+
+        # Assert
+        assert tiers[0] == "segment"
+        assert tiers[-10:] == ["model"] * 10
+
+    def test_stage_costs_are_per_arm(self, model, user_features, post_features):
+        """Test that a slow arm does not push another arm off the model"""
+        # Arrange: user 1 is in control and user 3 in test
+        experiments = ExperimentRegistry.from_models(
+            {'control': model, 'test': model}, {'control': 50, 'test': 50}, enabled=True)
+        service = RecommenderService(
+            user_features=user_features, post_features=post_features, experiments=experiments)
+        service._stage_costs('control').update("predict", 10.0)
+
+        # Act
+        slow = service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2, time_budget=0.5)
+        other = service.recommend(3, datetime(2024, 1, 1, 12), [], limit=2, time_budget=0.5)
+
+        # Assert
+        assert slow.tier == "popular"
+        assert other.tier == "model"
+
+    def test_catalog_change_resets_stage_costs(self, service):
+        """Test that costs measured on the old catalog are dropped"""
+        service._stage_costs("control").update("predict", 10.0)
+
+        service.update_catalog(service.post_features)
+
+        assert service._stage_costs("control").estimate("predict") == 0.0
+
+    def test_unknown_user_raises_key_error(self, service):
+        """Test that unknown users still raise KeyError"""
+        with pytest.raises(KeyError):
+            service.recommend(999, datetime(2024, 1, 1, 12), [], limit=2)
+
+
+class TestDegradationHelpers:
+    """Test cases for ranking tier helpers"""
+
+    def test_segment_cache_is_bounded_lru(self):
+        """Test that the least recently used segment is evicted"""
+        cache = SegmentRankingCache(['os'], max_segments=2, depth=3)
+
+        cache.put(('control', 'a'), np.array([1, 2, 3, 4]))
+        cache.put(('control', 'b'), np.array([5]))
+        cache.get(('control', 'a'))
+        cache.put(('control', 'c'), np.array([6]))
+
+        assert len(cache) == 2
+        assert cache.get(('control', 'b')) is None
+        assert cache.get(('control', 'a')).tolist() == [1, 2, 3]
+
+    def test_cost_estimator_moving_average(self):
+        """Test the exponentially weighted stage cost estimate"""
+        estimator = StageCostEstimator(alpha=0.5)
+
+        estimator.update('predict', 1.0)
+        estimator.update('predict', 0.0)
+
+        assert estimator.estimate('predict') == pytest.approx(0.5)
+        assert estimator.estimate('predict', 'unknown') == pytest.approx(0.5)
+
+    def test_cost_estimator_probes_every_nth_skip(self):
+        """Test that one in ``probe_every`` skipped requests is let through"""
+        estimator = StageCostEstimator(probe_every=3)
+
+        probes = [estimator.probe() for _ in range(6)]
+
+        assert probes == [False, False, True, False, False, True]
+        assert not StageCostEstimator(probe_every=0).probe()
+
+    def test_popularity_and_liked_filter(self):
+        """Test popularity ordering and liked post filtering"""
+        posts = pd.DataFrame({'post_id': [1, 2, 3], 'rating': [0.2, 0.8, 0.5]})
+
+        ranking = popularity_ranking(posts)
+
+        assert ranking.tolist() == [2, 3, 1]
+        assert top_unliked(ranking, [3], 2) == [2, 1]
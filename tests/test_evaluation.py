@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics.evaluation import (
+    LikeIndex,
+    evaluate,
+    evaluate_frames,
+    parse_recommendations,
+    view_metrics
+)
+
+
+def notebook_hitrate(df_views, df_likes):
+    """HitRate as computed in notebooks/AB_test_hitrate.ipynb"""
+    pivot = pd.merge(df_views, df_likes, on='user_id', how='outer')
+    pivot.post_id = pivot.post_id.fillna(-1).astype(int)
+    pivot['recommendations'] = pivot.recommendations.apply(
+        lambda x: list(map(int, filter(bool, x[1:-1].split(' '))))
+    )
+    pivot.post_id = pivot.apply(
+        lambda row:
+        -1
+        if
+            (row.post_id == -1) |
+            ((row.timestamp_x > row.timestamp_y) |
+             (row.timestamp_x + 60 * 60 < row.timestamp_y)) |
+            (row.post_id not in row.recommendations)
+        else
+        row.post_id, axis=1)
+
+    def my_agg(values):
+        values = set(values)
+        if -1 in values and len(values) >= 2:
+            return 1
+        elif -1 not in values:
+            return 1
+        return 0
+
+    agg = pivot.groupby(['user_id', 'exp_group', 'timestamp_x']).post_id.agg(my_agg)
+    return agg.reset_index().groupby('exp_group').post_id.mean()
+
+
+@pytest.fixture
+def logs():
+    rng = np.random.default_rng(0)
+    n_views, n_users, n_posts = 400, 40, 30
+    user_ids = rng.integers(0, n_users, n_views)
+    timestamps = 1_700_000_000 + rng.integers(0, 20_000, n_views)
+    views = pd.DataFrame({
+        'user_id': user_ids,
+        'exp_group': np.where(user_ids % 2 == 0, 'control', 'test'),
+        'recommendations': [
+            "[" + " ".join(map(str, rng.choice(n_posts, 5, replace=False))) + "]"
+            for _ in range(n_views)
+        ],
+        'timestamp': timestamps,
+    }).drop_duplicates(['user_id', 'exp_group', 'timestamp'])
+    likes = pd.DataFrame({
+        'user_id': rng.integers(0, n_users, 600),
+        'post_id': rng.integers(0, n_posts, 600),
+        'timestamp': 1_700_000_000 + rng.integers(0, 24_000, 600),
+    }).drop_duplicates(['user_id', 'post_id'])
+    return views, likes
+
+
+class TestHitRateEngine:
+    """Test cases for the vectorized evaluation engine"""
+
+    def test_hitrate_matches_notebook(self, logs):
+        """Test that HitRate equals the notebook's row-wise computation"""
+        views, likes = logs
+
+        expected = notebook_hitrate(views, likes)
+        result = evaluate_frames(views, likes, k=5).set_index('exp_group')
+
+        for arm in ('control', 'test'):
+            assert result.loc[arm, 'hitrate'] == pytest.approx(expected[arm])
+
+    def test_window_boundaries(self):
+        """Test inclusive window bounds and likes before the view"""
+        likes = LikeIndex([1, 1, 1], [10, 11, 12], [100, 3700, 99])
+
+        hits = likes.liked_in_window([1], [[10, 11, 12, 13]], [100])
+
+        assert hits.tolist() == [[True, True, False, False]]
+        assert likes.likes_in_window([1, 2], [100, 100]).tolist() == [2, 0]
+
+    def test_precision_recall_ndcg(self):
+        """Test metric values on a hand-computed example"""
+        views = pd.DataFrame({
+            'user_id': [1], 'exp_group': ['control'],
+            'recommendations': ['[5 6 7]'], 'timestamp': [0]
+        })
+        likes = LikeIndex([1, 1], [6, 9], [10, 20])
+
+        row = view_metrics(views, likes, k=3).iloc[0]
+
+        assert row.hitrate == 1.0
+        assert row.precision == pytest.approx(1 / 3)
+        assert row.recall == pytest.approx(1 / 2)
+        ideal = 1 + 1 / np.log2(3)
+        assert row.ndcg == pytest.approx((1 / np.log2(3)) / ideal)
+
+    def test_streaming_csv_matches_in_memory(self, logs, tmp_path):
+        """Test that chunked CSV evaluation equals the in-memory result"""
+        views, likes = logs
+        views.to_csv(tmp_path / 'views.csv', index=False)
+        likes.to_csv(tmp_path / 'likes.csv', index=False)
+
+        streamed = evaluate(str(tmp_path / 'views.csv'),
+                            str(tmp_path / 'likes.csv'), k=5, chunksize=37)
+        in_memory = evaluate_frames(views, likes, k=5)
+
+        pd.testing.assert_frame_equal(streamed, in_memory)
+
+    def test_parse_recommendations_pads(self):
+        """Test parsing of list strings with padding and truncation"""
+        parsed = parse_recommendations(['[1 2 3]', '[4]', '[]'], k=2)
+
+        assert parsed.tolist() == [[1, 2], [4, -1], [-1, -1]]
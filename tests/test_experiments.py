@@ -0,0 +1,128 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from app.core.ab_testing import get_bucket, get_exp_group
+from app.core.experiments import Arm, ExperimentRegistry, build_bucket_table, parse_arms
+from app.core.model_loader import ModelStore
+from app.config import SALT, GROUP_A_PERCENTAGE
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    """Two model files plus a symlink to the first"""
+    a = tmp_path / "a.cbm"
+    b = tmp_path / "b.cbm"
+    a.write_bytes(b"model-a")
+    b.write_bytes(b"model-b")
+    link = tmp_path / "a_link.cbm"
+    os.symlink(a, link)
+    return str(a), str(b), str(link)
+
+
+class TestExperimentRegistry:
+    """Test cases for arm assignment and lazy model loading"""
+
+    def test_parse_arms(self):
+        # Act
+        arms = parse_arms("control:models/a.cbm:50, test:C:/models/b.cbm:50")
+
+        # Assert
+        assert arms == [Arm("control", "models/a.cbm", 50.0),
+                        Arm("test", "C:/models/b.cbm", 50.0)]
+
+    def test_parse_arms_rejects_malformed(self):
+        with pytest.raises(ValueError):
+            parse_arms("control-only")
+
+    def test_bucket_table_follows_weights(self):
+        # Act
+        table = build_bucket_table(
+            [Arm("a", None, 2), Arm("b", None, 1), Arm("c", None, 1)])
+
+        # Assert
+        assert len(table) == 100
+        assert table.count("a") == 50
+        assert table.count("b") == 25
+        assert table[:50] == ("a",) * 50
+
+    def test_two_arm_assignment_matches_get_exp_group(self):
+        # Arrange
+        registry = ExperimentRegistry(
+            [Arm("control", None, GROUP_A_PERCENTAGE),
+             Arm("test", None, 100 - GROUP_A_PERCENTAGE)],
+            salt=SALT, enabled=True)
+
+        # Act & Assert
+        for user_id in range(1, 300):
+            assert registry.assign(user_id) == get_exp_group(user_id)
+
+    def test_disabled_experiment_serves_default_arm(self):
+        # Arrange
+        registry = ExperimentRegistry(
+            [Arm("control", None, 50), Arm("test", None, 50)],
+            enabled=False, default_arm="control")
+
+        # Act & Assert
+        assert {registry.assign(u) for u in range(100)} == {"control"}
+        assert registry.active_arms() == ("control",)
+
+    def test_n_arm_assignment_uses_bucket_ranges(self):
+        # Arrange
+        arms = [Arm("a", None, 20), Arm("b", None, 30), Arm("c", None, 50)]
+        registry = ExperimentRegistry(arms, salt="s", enabled=True)
+
+        # Act & Assert
+        for user_id in range(200):
+            bucket = get_bucket(user_id, "s")
+            expected = "a" if bucket < 20 else "b" if bucket < 50 else "c"
+            assert registry.assign(user_id) == expected
+
+    def test_arms_sharing_a_file_share_one_model(self, model_files):
+        # Arrange
+        a, b, link = model_files
+        loader = Mock(side_effect=lambda path: object())
+        registry = ExperimentRegistry(
+            [Arm("control", a, 40), Arm("alias", link, 40), Arm("test", b, 20)],
+            enabled=True, store=ModelStore(loader))
+
+        # Act
+        registry.preload()
+
+        # Assert
+        assert loader.call_count == 2
+        assert registry.model("control") is registry.model("alias")
+        assert registry.model("control") is not registry.model("test")
+
+    def test_inactive_arms_load_lazily(self, model_files):
+        # Arrange
+        a, b, _ = model_files
+        loader = Mock(side_effect=lambda path: object())
+        store = ModelStore(loader)
+        registry = ExperimentRegistry(
+            [Arm("control", a, 50), Arm("test", b, 50)],
+            enabled=False, store=store)
+
+        # Act
+        registry.preload()
+
+        # Assert
+        assert store.is_loaded(a)
+        assert not store.is_loaded(b)
+        registry.model("test")
+        assert store.is_loaded(b)
+
+    def test_versions_cover_active_arms(self, model_files):
+        # Arrange
+        a, b, _ = model_files
+        registry = ExperimentRegistry(
+            [Arm("control", a, 50), Arm("test", b, 50)], enabled=True,
+            store=ModelStore(lambda path: object()))
+
+        # Act
+        versions = registry.versions()
+
+        # Assert
+        assert versions["control"].startswith("a.cbm@")
+        assert versions["test"].startswith("b.cbm@")
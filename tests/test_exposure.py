@@ -0,0 +1,148 @@
+import csv
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, select
+
+from app.core.exposure import (
+    Exposure,
+    ExposureLogger,
+    DatabaseExposureSink,
+    FileExposureSink,
+    EXPOSURES_DROPPED,
+    format_recommendations
+)
+from app.models.models import ExposureLog
+
+
+class ListSink:
+    """Sink collecting batches in memory"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.closed = False
+
+    def write(self, batch):
+        if self.fail:
+            raise RuntimeError("sink down")
+        self.batches.append(list(batch))
+
+    def close(self):
+        self.closed = True
+
+
+class TestExposureLogger:
+    """Test cases for the buffered exposure logger"""
+
+    def test_flush_writes_in_batches(self):
+        """Test that buffered exposures are written in bounded batches"""
+        sink = ListSink()
+        exposure_logger = ExposureLogger(sink, max_buffer=10, batch_size=2)
+
+        for user_id in range(5):
+            exposure_logger.log(user_id, "control", "v1", "model",
+                                [1, 2], datetime(2024, 1, 1))
+        exposure_logger.flush()
+
+        assert [len(batch) for batch in sink.batches] == [2, 2, 1]
+        assert len(exposure_logger) == 0
+
+    def test_full_buffer_drops_without_blocking(self):
+        """Test that exposures beyond the buffer bound are dropped and counted"""
+        sink = ListSink()
+        exposure_logger = ExposureLogger(sink, max_buffer=2, batch_size=10)
+        before = EXPOSURES_DROPPED.value("buffer_full")
+
+        results = [
+            exposure_logger.log(1, "test", "v1", "model", [1], datetime(2024, 1, 1))
+            for _ in range(3)
+        ]
+
+        assert results == [True, True, False]
+        assert EXPOSURES_DROPPED.value("buffer_full") == before + 1
+
+    def test_sink_errors_are_counted(self):
+        """Test that a failing sink drops the batch instead of raising"""
+        exposure_logger = ExposureLogger(ListSink(fail=True), batch_size=10)
+        before = EXPOSURES_DROPPED.value("sink_error")
+
+        exposure_logger.log(1, "test", "v1", "model", [1], datetime(2024, 1, 1))
+        exposure_logger.flush()
+
+        assert EXPOSURES_DROPPED.value("sink_error") == before + 1
+
+    def test_background_writer_and_stop(self):
+        """Test that the writer thread flushes and stop drains the buffer"""
+        sink = ListSink()
+        exposure_logger = ExposureLogger(
+            sink, batch_size=1, flush_interval=0.01)
+
+        exposure_logger.start()
+        exposure_logger.log(1, "control", "v1", "model", [3], datetime(2024, 1, 1))
+        time.sleep(0.05)
+        exposure_logger.log(2, "control", "v1", "model", [4], datetime(2024, 1, 1))
+        exposure_logger.stop()
+
+        assert sum(len(batch) for batch in sink.batches) == 2
+        assert sink.closed
+
+
+class TestExposureSinks:
+    """Test cases for exposure sinks"""
+
+    def test_database_sink_multi_row_insert(self):
+        """Test that a batch lands in the exposure_log table"""
+        engine = create_engine("sqlite:///:memory:")
+        sink = DatabaseExposureSink(engine)
+        exposure_logger = ExposureLogger(sink)
+
+        exposure_logger.log(7, "test", "m.cbm@abc", "segment",
+                            [5, 9, 1], datetime(2024, 1, 1, 12))
+        exposure_logger.flush()
+
+        with engine.connect() as conn:
+            rows = conn.execute(select(ExposureLog.__table__)).all()
+        assert len(rows) == 1
+        assert rows[0].user_id == 7
+        assert rows[0].recommendations == "[5 9 1]"
+        assert rows[0].tier == "segment"
+
+    def test_file_sink_rotates(self, tmp_path):
+        """Test that the file sink writes views.csv rows and rotates by size"""
+        sink = FileExposureSink(str(tmp_path), max_bytes=1)
+        exposure_logger = ExposureLogger(sink, batch_size=1)
+
+        for user_id in range(2):
+            exposure_logger.log(user_id, "control", "v1", "model",
+                                [1, 2], datetime(2024, 1, 1, 12))
+            exposure_logger.flush()
+        sink.close()
+
+        files = sorted(tmp_path.iterdir())
+        assert len(files) == 2
+        with open(files[0], newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]["recommendations"] == "[1 2]"
+        assert rows[0]["exp_group"] == "control"
+        assert int(rows[0]["timestamp"]) == 1704110400  # 2024-01-01 12:00 UTC
+
+    def test_file_sink_timestamps_are_utc(self, tmp_path):
+        """Test that naive times are written as UTC and aware ones keep their instant"""
+        sink = FileExposureSink(str(tmp_path))
+        moscow = timezone(timedelta(hours=3))
+
+        sink.write([
+            Exposure(1, "control", "v1", "model", (1,), datetime(2024, 1, 1, 12)),
+            Exposure(2, "control", "v1", "model", (1,), datetime(2024, 1, 1, 15, tzinfo=moscow)),
+        ])
+        sink.close()
+
+        with open(next(tmp_path.iterdir()), newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [int(row["timestamp"]) for row in rows] == [1704110400, 1704110400]
+
+    def test_format_matches_notebook_parser(self):
+        """Test that the notebook's parser reads the recommendations column"""
+        value = format_recommendations([12, 7, 301])
+
+        assert list(map(int, filter(bool, value[1:-1].split(' ')))) == [12, 7, 301]
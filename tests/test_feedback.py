@@ -0,0 +1,282 @@
+import pandas as pd
+import pytest
+from datetime import datetime
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, select, func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.api import feedback as feedback_api
+from app.api.recommendations import recommended_posts
+from app.core.feedback import (
+    FeedbackIngestor,
+    FeedAction,
+    RecentLikes,
+    BufferFullError,
+    FEEDBACK_DROPPED
+)
+from app.core.seen_filter import SeenFilter
+from app.models.models import Base, Feed
+from app.schemas.schemas import FeedbackBatch
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def engine():
+    """In-memory database with an empty feed_action table, shared across threads"""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    Feed.__table__.create(engine)
+    return engine
+
+
+@pytest.fixture
+def fk_engine():
+    """feed_action with enforced foreign keys to one user (1) and one post (10)"""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, _):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user VALUES (1, 0, 30, 'X', 'Y', 0, 'iOS', 'ads')"))
+        conn.execute(text("INSERT INTO post VALUES (10, 'text', 'topic')"))
+    return engine
+
+
+def count_rows(engine, action=None):
+    query = select(func.count()).select_from(Feed.__table__)
+    if action is not None:
+        query = query.where(Feed.action == action)
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+
+class TestFeedbackIngestor:
+    """Test cases for buffered feedback ingestion"""
+
+    def test_flush_writes_in_batches(self, engine):
+        """Test that buffered actions end up in feed_action"""
+        # Arrange
+        ingestor = FeedbackIngestor(engine, RecentLikes(), batch_size=3)
+        actions = [FeedAction(1, post_id, "view", T0) for post_id in range(7)]
+
+        # Act
+        accepted = ingestor.submit(actions)
+        ingestor.flush()
+
+        # Assert
+        assert accepted == 7
+        assert count_rows(engine, "view") == 7
+        assert len(ingestor) == 0
+
+    def test_likes_visible_until_committed(self, engine):
+        """Test that a like is served from memory until its batch is written"""
+        # Arrange
+        recent_likes = RecentLikes()
+        ingestor = FeedbackIngestor(engine, recent_likes)
+
+        # Act
+        ingestor.submit([FeedAction(1, 10, "like", T0), FeedAction(1, 11, "view", T0)])
+        pending = recent_likes.get(1)
+        ingestor.flush()
+
+        # Assert
+        assert pending == [10]
+        assert recent_likes.get(1) == []
+        assert count_rows(engine, "like") == 1
+
+    def test_duplicate_actions_are_skipped(self, engine):
+        """Test that re-sent actions do not break the batch insert"""
+        # Arrange
+        ingestor = FeedbackIngestor(engine, RecentLikes())
+        action = FeedAction(1, 10, "like", T0)
+
+        # Act
+        ingestor.submit([action])
+        ingestor.flush()
+        ingestor.submit([action, FeedAction(1, 12, "like", T0)])
+        ingestor.flush()
+
+        # Assert
+        assert count_rows(engine) == 2
+
+    def test_full_buffer_rejects_whole_batch(self, engine):
+        """Test that a batch that does not fit is rejected without side effects"""
+        # Arrange
+        recent_likes = RecentLikes()
+        ingestor = FeedbackIngestor(engine, recent_likes, max_buffer=2)
+        before = FEEDBACK_DROPPED.value("buffer_full")
+
+        # Act & Assert
+        with pytest.raises(BufferFullError):
+            ingestor.submit([FeedAction(1, post_id, "like", T0) for post_id in range(3)])
+        assert len(ingestor) == 0
+        assert recent_likes.get(1) == []
+        assert FEEDBACK_DROPPED.value("buffer_full") == before + 3
+
+    def test_failed_write_releases_overlay(self):
+        """Test that a failing database does not pin likes in memory forever"""
+        # Arrange
+        engine = create_engine("sqlite://")  # no feed_action table
+        recent_likes = RecentLikes()
+        ingestor = FeedbackIngestor(engine, recent_likes, max_attempts=2)
+        before = FEEDBACK_DROPPED.value("db_error")
+
+        # Act
+        ingestor.submit([FeedAction(1, 10, "like", T0)])
+        ingestor.flush()
+        kept = recent_likes.get(1), len(ingestor)
+        ingestor.flush()
+
+        # Assert
+        assert kept == ([10], 1)
+        assert recent_likes.get(1) == []
+        assert len(ingestor) == 0
+        assert FEEDBACK_DROPPED.value("db_error") == before + 1
+
+    def test_failed_batch_is_retried_before_newer_actions(self):
+        """Test that a batch survives an outage and likes stay visible meanwhile"""
+        # Arrange
+        engine = create_engine("sqlite://", poolclass=StaticPool,
+                               connect_args={"check_same_thread": False})
+        recent_likes = RecentLikes()
+        ingestor = FeedbackIngestor(engine, recent_likes)
+        ingestor.submit([FeedAction(1, 10, "like", T0)])
+        ingestor.flush()  # no table yet
+        ingestor.submit([FeedAction(1, 11, "like", T0)])
+
+        # Act
+        Feed.__table__.create(engine)
+        ingestor.flush()
+
+        # Assert
+        assert count_rows(engine, "like") == 2
+        assert recent_likes.get(1) == []
+
+    def test_bad_row_does_not_drop_its_batch(self, fk_engine):
+        """Test that a foreign key violation only drops the offending row"""
+        # Arrange
+        recent_likes = RecentLikes()
+        ingestor = FeedbackIngestor(fk_engine, recent_likes)
+        before = FEEDBACK_DROPPED.value("invalid")
+
+        # Act
+        ingestor.submit([FeedAction(1, 10, "like", T0), FeedAction(1, 99, "like", T0),
+                         FeedAction(2, 10, "view", T0)])
+        ingestor.flush()
+
+        # Assert
+        assert count_rows(fk_engine) == 1
+        assert FEEDBACK_DROPPED.value("invalid") == before + 2
+        assert recent_likes.get(1) == []
+        assert len(ingestor) == 0
+
+    def test_views_update_seen_filter(self, engine):
+        """Test that accepted views are filtered out immediately"""
+        # Arrange
+        seen = SeenFilter([1])
+        ingestor = FeedbackIngestor(engine, RecentLikes(), seen=seen)
+
+        # Act
+        ingestor.submit([FeedAction(1, 10, "view", T0), FeedAction(2, 20, "view", T0)])
+
+        # Assert
+        assert seen.contains(1, [10]).all()
+        assert seen.contains(2, [20]).all()
+
+    def test_background_writer_flushes_on_stop(self, engine):
+        """Test that stop() writes whatever is still pending"""
+        # Arrange
+        ingestor = FeedbackIngestor(engine, RecentLikes(), flush_interval=60)
+        ingestor.start()
+
+        # Act
+        ingestor.submit([FeedAction(1, 10, "view", T0)])
+        ingestor.stop()
+
+        # Assert
+        assert count_rows(engine) == 1
+
+
+class TestFeedbackEndpoint:
+    """Test cases for the feedback endpoint and the recommendation overlay"""
+
+    @pytest.fixture
+    def batch(self):
+        return FeedbackBatch(actions=[
+            {"user_id": 1, "post_id": 10, "action": "like", "time": T0},
+            {"user_id": 1, "post_id": 11, "action": "view", "time": T0},
+        ])
+
+    def test_accepts_batch(self, batch):
+        # Arrange
+        ingestor = Mock()
+        ingestor.submit.side_effect = lambda actions: len(list(actions))
+
+        # Act
+        with patch.object(feedback_api, "feedback_ingestor", ingestor):
+            result = feedback_api.post_feedback(batch)
+
+        # Assert
+        assert result.accepted == 2
+
+    def test_buffer_full_returns_503(self, batch):
+        # Arrange
+        ingestor = Mock(flush_interval=0.5)
+        ingestor.submit.side_effect = BufferFullError("full")
+
+        # Act & Assert
+        with patch.object(feedback_api, "feedback_ingestor", ingestor):
+            with pytest.raises(HTTPException) as exc_info:
+                feedback_api.post_feedback(batch)
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "1"
+
+    def test_rejects_oversized_batch(self, batch):
+        with patch.object(feedback_api, "feedback_ingestor", Mock()), \
+                patch.object(feedback_api, "FEEDBACK_MAX_REQUEST_ACTIONS", 1):
+            with pytest.raises(HTTPException) as exc_info:
+                feedback_api.post_feedback(batch)
+        assert exc_info.value.status_code == 400
+
+    def test_rejects_ids_missing_from_features(self, batch):
+        """Test that unknown users or posts are refused before they reach the writer"""
+        # Arrange
+        ingestor = Mock()
+
+        # Act
+        with patch.object(feedback_api, "feedback_ingestor", ingestor), \
+                patch.object(feedback_api, "known_users", pd.Index([1])), \
+                patch.object(feedback_api, "known_posts", pd.Index([10, 12])):
+            with pytest.raises(HTTPException) as exc_info:
+                feedback_api.post_feedback(batch)
+
+        # Assert
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == {"unknown_ids": {"post_id": [11]}}
+        ingestor.submit.assert_not_called()
+
+    def test_recommendations_see_pending_likes(self):
+        """Test that a like not yet in feed_action is excluded from recommendations"""
+        # Arrange
+        recent_likes = RecentLikes()
+        recent_likes.add(123, 7)
+        db = Mock(spec=Session)
+        db.query.return_value.filter.return_value.distinct.return_value.all.return_value = [(1,)]
+        db.query.return_value.filter.return_value.all.return_value = []
+
+        # Act
+        with patch('app.api.recommendations.recommender_service') as service, \
+                patch('app.api.recommendations.recent_likes', recent_likes):
+            service.recommend.return_value = ([4], "control", "model")
+            recommended_posts(user_id=123, time=T0, limit=1, db=db)
+
+        # Assert
+        liked = service.recommend.call_args[0][2]
+        assert sorted(liked) == [1, 7]
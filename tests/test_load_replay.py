@@ -0,0 +1,132 @@
+import json
+
+import httpx
+import pytest
+
+from benchmarks.load_replay import (
+    OVERFLOW,
+    Outcome,
+    read_log,
+    replay,
+    summarize,
+    synthetic_log,
+)
+
+
+def fake_service(request: httpx.Request) -> httpx.Response:
+    """Odd users get the test arm, user 13 does not exist"""
+    user_id = int(request.url.params["user_id"])
+    if user_id == 13:
+        return httpx.Response(404, json={"detail": "User 13 not found"})
+    return httpx.Response(200, json={
+        "exp_group": "test" if user_id % 2 else "control",
+        "recommendations": [],
+        "tier": "model",
+    })
+
+
+class TestReadLog:
+    """Loading request logs"""
+
+    def test_jsonl_skips_entries_without_user_or_time(self, tmp_path):
+        """Unrelated JSON lines are ignored, limit defaults to 5"""
+        # Arrange
+        path = tmp_path / "requests.jsonl"
+        path.write_text("\n".join(json.dumps(r) for r in [
+            {"user_id": 1, "time": "2024-02-01T10:00:00", "limit": 10},
+            {"request_id": "x", "title": "not a request"},
+            {"user_id": 2},
+            {"user_id": 3, "time": "2024-02-01T11:00:00"},
+        ]) + "\n\n")
+
+        # Act
+        requests = read_log(str(path))
+
+        # Assert
+        assert requests == [
+            {"user_id": 1, "time": "2024-02-01T10:00:00", "limit": 10},
+            {"user_id": 3, "time": "2024-02-01T11:00:00", "limit": 5},
+        ]
+
+    def test_csv_reads_timestamp_column(self, tmp_path):
+        """Exposure log files name the request time ``timestamp``"""
+        # Arrange
+        path = tmp_path / "views.csv"
+        path.write_text("user_id,exp_group,recommendations,timestamp\n"
+                        "7,control,[1 2],2024-02-01 10:00:00\n")
+
+        # Act
+        requests = read_log(str(path))
+
+        # Assert
+        assert requests == [{"user_id": 7, "time": "2024-02-01T10:00:00", "limit": 5}]
+
+    def test_synthetic_log_is_seeded(self):
+        """Same seed, same requests; users stay in range"""
+        # Act
+        first, second = synthetic_log(50, 10, seed=1), synthetic_log(50, 10, seed=1)
+
+        # Assert
+        assert first == second
+        assert all(1 <= r["user_id"] <= 10 for r in first)
+
+
+class TestSummarize:
+    """Report of a run"""
+
+    def test_counts_latency_errors_and_arms(self):
+        """Overflowed requests count as errors but not in latency"""
+        # Arrange
+        outcomes = [
+            Outcome(0.010, "200", "control", "model"),
+            Outcome(0.030, "200", "test", "segment"),
+            Outcome(0.020, "200", "test", "model"),
+            Outcome(0.500, "503"),
+            Outcome(0.0, OVERFLOW),
+        ]
+
+        # Act
+        report = summarize(outcomes, elapsed=2.0)
+
+        # Assert
+        assert report["requests"] == 5
+        assert report["succeeded"] == 3
+        assert report["throughput_rps"] == 2.0
+        assert report["goodput_rps"] == 1.5
+        assert report["latency"]["max_ms"] == 500.0
+        assert report["errors"] == {"503": 1, OVERFLOW: 1}
+        assert report["arms"]["test"]["requests"] == 2
+        assert report["arms"]["test"]["tiers"] == {"segment": 1, "model": 1}
+        assert report["arms"]["control"]["p50_ms"] == 10.0
+
+
+class TestReplay:
+    """Sending requests against a mock service"""
+
+    @pytest.fixture
+    def requests(self):
+        return [{"user_id": u, "time": "2024-02-01T10:00:00", "limit": 5} for u in range(1, 21)]
+
+    def test_closed_loop_sends_every_request(self, requests):
+        """All requests are answered; errors and arms are split out"""
+        # Act
+        report = replay("http://test", requests, concurrency=4,
+                        transport=httpx.MockTransport(fake_service))
+
+        # Assert
+        assert report["mode"] == "closed"
+        assert report["requests"] == 20
+        assert report["errors"] == {"404": 1}
+        assert report["arms"]["control"]["requests"] == 10
+        assert report["arms"]["test"]["requests"] == 9
+
+    def test_open_loop_follows_the_arrival_rate(self, requests):
+        """20 arrivals at 200/s take about 0.1s"""
+        # Act
+        report = replay("http://test", requests, rate=200.0,
+                        transport=httpx.MockTransport(fake_service))
+
+        # Assert
+        assert report["mode"] == "open"
+        assert report["succeeded"] == 19
+        assert 0.02 < report["elapsed_seconds"] < 1.0
@@ -0,0 +1,59 @@
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.database import attach_public_schema
+from benchmarks.synthetic import make_likes, make_posts, make_users, write_database
+
+
+class TestLocalDatabase:
+    """Embedded SQLite database used by LOCAL_DB_PATH"""
+
+    def test_public_schema_queries_run_on_sqlite_file(self, tmp_path):
+        """Default ``public.*`` feature queries read the local tables"""
+        # Arrange
+        engine = attach_public_schema(create_engine(f"sqlite:///{tmp_path / 'recsys.db'}"))
+        users, posts = make_users(50), make_posts(20)
+        write_database(engine, users, posts, make_likes(users, posts, per_user=3))
+
+        # Act
+        loaded = pd.read_sql("SELECT * FROM public.user_data", engine)
+        with engine.connect() as conn:
+            likes = conn.execute(text(
+                "SELECT COUNT(*) FROM public.feed_action WHERE action = 'like'")).scalar()
+
+        # Assert
+        assert loaded["user_id"].tolist() == users["user_id"].tolist()
+        assert likes > 0
+
+    def test_in_memory_and_other_engines_are_unchanged(self):
+        """Nothing to attach for an in-memory database"""
+        # Arrange
+        engine = create_engine("sqlite://")
+
+        # Act
+        result = attach_public_schema(engine)
+
+        # Assert
+        assert result is engine
+        with engine.connect() as conn:
+            names = [row[1] for row in conn.execute(text("PRAGMA database_list"))]
+        assert "public" not in names
+
+    def test_tables_have_model_indexes(self, tmp_path):
+        """post/feed_action get the indexes from app/models/models.py"""
+        # Arrange
+        engine = create_engine(f"sqlite:///{tmp_path / 'recsys.db'}")
+        users, posts = make_users(10), make_posts(5)
+
+        # Act
+        write_database(engine, users, posts, make_likes(users, posts, per_user=2))
+
+        # Assert
+        inspector = inspect(engine)
+        feed_indexes = {index["name"] for index in inspector.get_indexes("feed_action")}
+        assert {"idx_feed_user_action", "idx_feed_post_action", "idx_feed_time",
+                "idx_feed_user_time"} <= feed_indexes
+        assert [index["name"] for index in inspector.get_indexes("user_data")
+                if index["unique"]] == ["idx_user_data_user_id"]
+        assert {"feed_action", "post", "post_text_df", "user_data"} <= set(
+            inspector.get_table_names())
@@ -0,0 +1,61 @@
+import logging
+import queue
+from unittest.mock import patch
+
+from app.core import logging_config
+from app.core.logging_config import DroppingQueueHandler, should_log_request
+
+
+class TestQueueLogging:
+    """Test cases for the queue-based logging pipeline"""
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that records are dropped and counted when the queue is full"""
+        # Arrange
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "msg %s", ("a",), None)
+
+        # Act
+        handler.emit(record)
+        handler.emit(record)
+
+        # Assert
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+    def test_record_formatting_is_deferred(self):
+        """Test that queued records keep their unformatted message and args"""
+        handler = DroppingQueueHandler(queue.Queue())
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1, "user %s", (42,), None)
+
+        handler.emit(record)
+        queued = handler.queue.get_nowait()
+
+        assert queued.msg == "user %s"
+        assert queued.args == (42,)
+
+    def test_listener_writes_log_file(self, tmp_path):
+        """Test that records reach the file handler through the listener"""
+        # Arrange
+        log_file = tmp_path / "app.log"
+        logging_config.shutdown_logging()
+
+        # Act
+        with patch('app.core.logging_config.LOG_FILE', str(log_file)):
+            logging_config.setup_logging()
+            logging.getLogger("app.test").warning("queued %s", "message")
+            logging_config.shutdown_logging()
+
+        # Assert
+        assert "queued message" in log_file.read_text()
+
+
+class TestRequestSampling:
+    """Test cases for per-request log sampling"""
+
+    def test_sampling_rates(self):
+        """Test that rate 1 always logs and rate 0 never logs"""
+        assert all(should_log_request(1.0) for _ in range(100))
+        assert not any(should_log_request(0.0) for _ in range(100))
@@ -0,0 +1,203 @@
+import asyncio
+import tracemalloc
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.features import build_features
+from app.core.memory import (
+    AllocationTrace,
+    measure_allocations,
+    deep_sizeof,
+    memory_report,
+)
+from app.core.profiler import ProfilerGate
+from app.core.recommender import RecommenderService
+from benchmarks.synthetic import make_posts, make_users
+
+REQUEST_TIME = datetime(2024, 2, 1, 12, 0, 0)
+
+
+class RatingModel:
+    """Stand-in ranker: scores by rating, allocates one float array"""
+    feature_names_ = ['gender', 'age', 'topic', 'country', 'city', 'os', 'rating']
+
+    def predict(self, X):
+        return X['rating'].to_numpy(dtype=float)
+
+
+class Holder:
+    pass
+
+
+Holder.__module__ = "app.tests"
+
+
+class TestDeepSizeof:
+    """Test cases for deep memory accounting"""
+
+    def test_frame_counts_object_columns_deeply(self):
+        """Strings in object columns are included"""
+        # Arrange
+        frame = pd.DataFrame({'id': np.arange(1000), 'text': ['x' * 100] * 1000})
+
+        # Act
+        size = deep_sizeof(frame)
+
+        # Assert
+        assert size == frame.memory_usage(index=True, deep=True).sum()
+        assert size > 100 * 1000
+
+    def test_shared_objects_counted_once(self):
+        """An array and its views are one buffer; a shared frame counts once"""
+        # Arrange
+        array = np.zeros(10_000)
+        frame = pd.DataFrame({'a': np.arange(100)})
+        holder = Holder()
+        holder.view = array[::2]
+        holder.array = array
+        holder.frames = [frame, frame]
+        seen = set()
+
+        # Act
+        first = deep_sizeof(holder, seen)
+        again = deep_sizeof(frame, seen)
+
+        # Assert
+        assert array.nbytes <= first < array.nbytes + deep_sizeof(frame) + 2000
+        assert again == 0
+
+    def test_memory_report_splits_rss(self):
+        """Components are reported next to RSS and the unaccounted rest"""
+        # Arrange
+        components = {'big': np.ones(1_000_000), 'small': [1, 2, 3]}
+
+        # Act
+        report = memory_report(components)
+
+        # Assert
+        assert report['components']['big'] == 8_000_000
+        assert report['accounted_bytes'] == sum(report['components'].values())
+        assert report['rss_bytes'] >= report['accounted_bytes']
+        assert report['unaccounted_bytes'] == report['rss_bytes'] - report['accounted_bytes']
+
+
+class TestAllocationTrace:
+    """Test cases for tracemalloc-based allocation sites"""
+
+    def test_sites_point_at_app_code(self):
+        """Allocations made by pandas on behalf of app code are attributed to app code"""
+        # Arrange
+        users, posts = make_users(10), make_posts(200)
+        trace = AllocationTrace().start()
+
+        # Act
+        kept = [build_features(u, posts, users[users['user_id'] == u], REQUEST_TIME)
+                for u in range(1, 6)]
+        result = trace.stop(top=5)
+
+        # Assert
+        assert not tracemalloc.is_tracing()
+        assert result['peak_bytes'] >= result['retained_bytes'] > 0
+        assert result['top'][0]['site'].startswith('app/core/features.py:')
+        assert len(kept) == 5
+
+
+class TestRecommendAllocationBudget:
+    """Per-request allocation budgets for ``recommend``; a copy regression exceeds them"""
+
+    @staticmethod
+    def allocations(n_users, n_posts):
+        """Allocations of one warm ``recommend`` call and the size of its feature block"""
+        users, posts = make_users(n_users), make_posts(n_posts)
+        service = RecommenderService(RatingModel(), RatingModel(), users, posts)
+        for user_id in range(1, 5):
+            service.recommend(user_id, REQUEST_TIME, [1, 2, 3], 5)
+        block = build_features(7, posts, users[users['user_id'] == 7], REQUEST_TIME)
+        result, allocations = measure_allocations(
+            service.recommend, 7, REQUEST_TIME, [1, 2, 3], 5)
+        assert len(result.post_ids) == 5
+        return allocations, block.memory_usage(deep=False).sum()
+
+    def test_peak_within_budget_of_feature_block(self):
+        """The block and its filtered version are alive together, nothing more (~2.35x)"""
+        # Act
+        allocations, block_bytes = self.allocations(2_000, 7_000)
+
+        # Assert
+        assert allocations.peak_bytes < 2.6 * block_bytes
+
+    def test_peak_does_not_grow_with_user_table(self):
+        """The user lookup must not copy the user table"""
+        # Act
+        small, _ = self.allocations(10_000, 1_000)
+        large, _ = self.allocations(100_000, 1_000)
+
+        # Assert: less than one byte per extra user
+        assert large.peak_bytes - small.peak_bytes < 90_000
+
+    def test_request_retains_only_its_cached_ranking(self):
+        """Only the segment cache entry outlives the call (~8 KB)"""
+        # Act
+        allocations, _ = self.allocations(2_000, 7_000)
+
+        # Assert
+        assert allocations.retained_bytes < 32_000
+
+
+class TestMemoryEndpoint:
+    """Test cases for the admin memory endpoint"""
+
+    def test_memory_requires_admin_token(self, client):
+        """Test that the endpoint is forbidden without the token"""
+        with patch('app.api.admin.ADMIN_TOKEN', "secret"):
+            response = client.get("/api/v1/admin/memory")
+
+        assert response.status_code == 403
+
+    def test_memory_reports_components_and_allocations(self, client):
+        """Test a report with a short allocation trace"""
+        users = make_users(100)
+        with patch('app.api.admin.ADMIN_TOKEN', "secret"), \
+                patch('app.api.admin.profiler_gate', ProfilerGate(cooldown=60)), \
+                patch('app.api.recommendations.user_features', users):
+            response = client.get(
+                "/api/v1/admin/memory?trace_seconds=0.05&top=5",
+                headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body['components']['user_features'] == deep_sizeof(users)
+        assert 'recent_likes' in body['components']
+        assert body['allocations']['seconds'] == pytest.approx(0.05)
+        assert len(body['allocations']['top']) <= 5
+
+    def test_trace_is_collected_off_the_event_loop(self, client):
+        """Test that the snapshot runs in a worker thread while the gate is held"""
+        gate = ProfilerGate(cooldown=0)
+        real_stop = AllocationTrace.stop
+        seen = {}
+
+        def stop(tracer, top=20):
+            try:
+                asyncio.get_running_loop()
+                seen['on_loop'] = True
+            except RuntimeError:
+                seen['on_loop'] = False
+            seen['gate_running'] = gate._running
+            return real_stop(tracer, top)
+
+        with patch('app.api.admin.ADMIN_TOKEN', "secret"), \
+                patch('app.api.admin.profiler_gate', gate), \
+                patch.object(AllocationTrace, 'stop', stop):
+            response = client.get(
+                "/api/v1/admin/memory?trace_seconds=0.01",
+                headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert seen == {'on_loop': False, 'gate_running': True}
+        assert not gate._running
+        assert not tracemalloc.is_tracing()
@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import Mock, patch
+from time import perf_counter
+
+from app.core import metrics
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+class TestMetricPrimitives:
+    """Test cases for counters, gauges and histograms"""
+
+    def test_histogram_render_is_cumulative(self):
+        """Test that histogram buckets are rendered cumulatively"""
+        # Arrange
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram(
+            "test_seconds", "Test histogram", ("stage",), buckets=(0.1, 1.0)))
+
+        # Act
+        histogram.observe(0.05, "predict")
+        histogram.observe(0.5, "predict")
+        histogram.observe(2.0, "predict")
+        text = registry.render()
+
+        # Assert
+        assert "# TYPE test_seconds histogram" in text
+        assert 'test_seconds_bucket{stage="predict",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="predict",le="1"} 2' in text
+        assert 'test_seconds_bucket{stage="predict",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="predict"} 3' in text
+        assert histogram.count("predict") == 3
+
+    def test_counter_and_gauge(self):
+        """Test counter increments and callback gauges"""
+        # Arrange
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("test_total", "Test", ("arm",)))
+        gauge = registry.register(
+            Gauge("test_inflight", "Test", function=lambda: 7))
+
+        # Act
+        counter.inc("control")
+        counter.inc("control", amount=2)
+        text = registry.render()
+
+        # Assert
+        assert counter.value("control") == 3
+        assert 'test_total{arm="control"} 3' in text
+        assert "test_inflight 7" in text
+        assert gauge.value() == 7
+
+    def test_duplicate_registration_rejected(self):
+        """Test that a metric name can only be registered once"""
+        registry = MetricsRegistry()
+        registry.register(Counter("dup_total", "Test"))
+
+        with pytest.raises(ValueError):
+            registry.register(Counter("dup_total", "Test"))
+
+
+class TestStageTimers:
+    """Test cases for request-scoped stage timers"""
+
+    def test_stage_outside_request_is_noop(self):
+        """Test that stages outside a request are not recorded"""
+        with metrics.stage("predict"):
+            pass
+
+        assert metrics.current_timings() is None
+
+    def test_stages_folded_into_histograms(self):
+        """Test that request stages are observed with the experiment group"""
+        # Arrange
+        before = metrics.STAGE_DURATION.count("predict", "arm_x")
+
+        # Act
+        timings, token = metrics.begin_request()
+        with metrics.stage("features"):
+            pass
+        with metrics.stage("predict"):
+            pass
+        metrics.set_exp_group("arm_x")
+        total = metrics.end_request(timings, token)
+
+        # Assert
+        assert [name for name, _ in timings.stages] == ["features", "predict"]
+        assert metrics.STAGE_DURATION.count("predict", "arm_x") == before + 1
+        header = timings.server_timing(total)
+        assert header.startswith("features;dur=")
+        assert "predict;dur=" in header
+        assert "total;dur=" in header
+        assert metrics.current_timings() is None
+
+    def test_stage_overhead(self):
+        """Test that a stage timer costs only a few microseconds"""
+        timings, token = metrics.begin_request()
+        n = 10000
+        start = perf_counter()
+        for _ in range(n):
+            with metrics.stage("noop"):
+                pass
+        elapsed = perf_counter() - start
+        metrics._current_timings.reset(token)
+
+        assert elapsed / n < 20e-6
+
+
+class TestMetricsEndpoint:
+    """Test cases for /metrics and the Server-Timing header"""
+
+    def test_metrics_endpoint(self, client):
+        """Test that /metrics serves the Prometheus text format"""
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "recsys_stage_duration_seconds" in response.text
+
+    def test_server_timing_header(self, client, override_get_db):
+        """Test that recommendation requests report their stages"""
+        # Arrange
+        mock_db = override_get_db
+        mock_query = Mock()
+        mock_query.filter.return_value.distinct.return_value.all.return_value = []
+        mock_query.filter.return_value.all.return_value = [
+            {"id": 4, "text": "Post 4", "topic": "Technology"}
+        ]
+        mock_db.query.return_value = mock_query
+
+        with patch('app.api.recommendations.recommender_service') as mock_service:
+            mock_service.recommend.return_value = ([4], "control", "model")
+
+            # Act
+            response = client.get(
+                "/api/v1/post/recommendations/",
+                params={"user_id": 1, "time": "2024-01-01T12:00:00"})
+
+        # Assert
+        assert response.status_code == 200
+        server_timing = response.headers["Server-Timing"]
+        assert "likes;dur=" in server_timing
+        assert "posts;dur=" in server_timing
+        assert metrics.STAGE_DURATION.count("likes", "control") >= 1
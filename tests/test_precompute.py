@@ -0,0 +1,161 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.precompute import HourOfWeekRankings, is_precomputable, slot_of
+from app.core.recommender import CatalogReloader, RecommenderService
+
+
+def time_model(features):
+    """Mock model scoring by rating, gender and hour"""
+    model = Mock()
+    model.feature_names_ = features
+
+    def predict(X):
+        score = X['rating'].to_numpy() * 10
+        if 'hour' in X:
+            # The post whose topic_id == hour % 5 gets a boost
+            score = score + (X['topic_id'].to_numpy() == X['hour'].to_numpy() % 5) * 100
+        if 'gender' in X:
+            score = score - X['gender'].to_numpy() * X['topic_id'].to_numpy()
+        if 'age' in X:
+            score = score + X['age'].to_numpy()
+        return score
+    model.predict.side_effect = predict
+    return model
+
+
+class TestHourOfWeekRankings:
+    """Test cases for precomputed hour-of-week ranking tables"""
+
+    @pytest.fixture
+    def user_features(self):
+        return pd.DataFrame({
+            'user_id': [1, 2, 3, 4],
+            'gender': [0, 1, 0, 1],
+            'country': ['RU', 'RU', 'RU', 'UA'],
+            'os': ['iOS', 'iOS', 'iOS', 'Android'],
+            'age': [20, 30, 40, 50]
+        })
+
+    @pytest.fixture
+    def post_features(self):
+        return pd.DataFrame({
+            'post_id': [10, 11, 12, 13, 14],
+            'topic_id': [0, 1, 2, 3, 4],
+            'rating': [0.1, 0.9, 0.5, 0.7, 0.3]
+        })
+
+    def make_service(self, model, user_features, post_features, precomputed):
+        return RecommenderService(
+            model_control=model,
+            model_test=model,
+            user_features=user_features,
+            post_features=post_features,
+            precomputed=precomputed
+        )
+
+    def test_slot_of(self):
+        assert slot_of(datetime(2024, 1, 1, 0)) == 0      # Monday
+        assert slot_of(datetime(2024, 1, 7, 23)) == 167   # Sunday
+
+    def test_eligibility_requires_segment_level_features(self, post_features):
+        columns = ['gender', 'country', 'os']
+        assert is_precomputable(time_model(['rating', 'gender', 'hour']), post_features, columns)
+        assert not is_precomputable(time_model(['rating', 'age']), post_features, columns)
+
+    def test_lookup_matches_model_ranking(self, user_features, post_features):
+        # Arrange
+        model = time_model(['rating', 'topic_id', 'gender', 'hour'])
+        tables = HourOfWeekRankings(['gender', 'country', 'os'], depth=5)
+        tables.refresh({'control': model, 'test': model}, {'control': 'v1', 'test': 'v1'},
+                       post_features, user_features, background=False)
+        plain = self.make_service(model, user_features, post_features, None)
+        fast = self.make_service(model, user_features, post_features, tables)
+
+        # Act & Assert
+        for user_id in [1, 2, 3, 4]:
+            for hour in [0, 3, 7, 22]:
+                time = datetime(2024, 1, 3, hour)
+                expected = plain.recommend(user_id, time, [11], limit=3)
+                actual = fast.recommend(user_id, time, [11], limit=3)
+                assert actual.tier == 'precomputed'
+                assert actual.post_ids == expected.post_ids
+        assert len(tables) == 6  # 2 arms x 3 segments
+
+    def test_tables_are_compact_int32(self, user_features, post_features):
+        # Arrange
+        tables = HourOfWeekRankings(['gender'], depth=3)
+
+        # Act
+        tables.refresh({'control': time_model(['rating', 'topic_id', 'hour'])}, {'control': 'v1'},
+                       post_features, user_features, background=False)
+
+        # Assert
+        table = tables._tables[('control', 0)]
+        assert table.dtype == np.int32
+        assert table.shape == (168, 3)
+
+    def test_ineligible_model_uses_model_tier(self, user_features, post_features):
+        # Arrange
+        model = time_model(['rating', 'age'])
+        tables = HourOfWeekRankings(['gender', 'country', 'os'])
+        tables.refresh({'control': model}, {'control': 'v1'},
+                       post_features, user_features, background=False)
+        service = self.make_service(model, user_features, post_features, tables)
+
+        # Act
+        result = service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2)
+
+        # Assert
+        assert len(tables) == 0
+        assert result.tier == 'model'
+
+    def test_refresh_only_when_model_or_catalog_changes(self, user_features, post_features):
+        # Arrange
+        model = time_model(['rating', 'topic_id', 'hour'])
+        tables = HourOfWeekRankings(['gender'], depth=3)
+        tables.refresh({'control': model}, {'control': 'v1'},
+                       post_features, user_features, background=False)
+        calls = model.predict.call_count
+
+        # Act
+        tables.refresh({'control': model}, {'control': 'v1'},
+                       post_features, user_features, background=False)
+        unchanged_calls = model.predict.call_count
+        changed = post_features.assign(rating=[0.9, 0.1, 0.2, 0.3, 0.4])
+        tables.refresh({'control': model}, {'control': 'v1'},
+                       changed, user_features, background=False)
+
+        # Assert
+        assert unchanged_calls == calls
+        assert model.predict.call_count > calls
+        assert tables.lookup(('control', 0), datetime(2024, 1, 1, 1), [], 3) == [11, 10, 14]
+
+    def test_catalog_reload_rebuilds_tables(self, user_features, post_features):
+        """A reloaded catalog that changed goes through update_catalog and is ranked again"""
+        # Arrange
+        model = time_model(['rating', 'topic_id', 'hour'])
+        tables = HourOfWeekRankings(['gender'], depth=3)
+        service = self.make_service(model, user_features, post_features, tables)
+        service.update_catalog(post_features)
+        tables.join(5)
+        catalogs = [post_features, post_features.assign(rating=[0.9, 0.1, 0.2, 0.3, 0.4])]
+        reloader = CatalogReloader(lambda: catalogs.pop(0), service.update_catalog,
+                                   current=post_features)
+        time = datetime(2024, 1, 1, 1)
+
+        # Act
+        unchanged = reloader.check()
+        before = tables.lookup(('control', 0), time, [], 3)
+        changed = reloader.check()
+        tables.join(5)
+
+        # Assert
+        assert (unchanged, changed) == (False, True)
+        assert before == [11, 13, 12]
+        assert tables.lookup(('control', 0), time, [], 3) == [11, 10, 14]
+        assert service.post_features is not post_features
@@ -0,0 +1,161 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics.cascade_tradeoff import ndcg_at_k, tradeoff
+from app.core.prerank import BilinearPreRanker, Cascade, FeatureEncoder, parse_top_n
+from app.core.recommender import RecommenderService
+
+
+@pytest.fixture
+def user_features():
+    return pd.DataFrame({
+        'user_id': np.arange(1, 41),
+        'gender': np.arange(40) % 2,
+        'age': 20 + np.arange(40),
+        'country': 'Russia',
+        'city': np.where(np.arange(40) % 3 == 0, 'Moscow', 'Omsk'),
+        'os': 'iOS',
+    })
+
+
+@pytest.fixture
+def post_features():
+    return pd.DataFrame({
+        'post_id': np.arange(100, 130),
+        'topic': np.where(np.arange(30) % 2 == 0, 'sport', 'movie'),
+        'rating': np.linspace(0, 1, 30),
+    })
+
+
+@pytest.fixture
+def interactions(user_features, post_features):
+    """Gender 1 likes sport, gender 0 likes movies"""
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({
+        'user_id': rng.choice(user_features['user_id'], 4000),
+        'post_id': rng.choice(post_features['post_id'], 4000),
+    })
+    rows = rows.merge(user_features, on='user_id').merge(post_features, on='post_id')
+    rows['target'] = ((rows['gender'] == 1) == (rows['topic'] == 'sport')).astype(int)
+    return rows
+
+
+def ranking_model():
+    model = Mock()
+    model.feature_names_ = ['rating']
+    model.predict.side_effect = lambda X: X['rating'].to_numpy()
+    return model
+
+
+class TestPreRanker:
+    """Test cases for the bilinear pre-ranker and cascade"""
+
+    def test_encoder_one_hot_and_bias(self, post_features):
+        # Act
+        encoder = FeatureEncoder(['rating'], ['topic']).fit(post_features)
+        encoded = encoder.transform(post_features.head(2))
+
+        # Assert
+        assert encoded.shape == (2, 4)
+        np.testing.assert_array_equal(encoded[:, 0], [1, 1])
+        np.testing.assert_array_equal(encoded[:, 2:].sum(axis=1), [1, 1])
+
+    def test_learns_user_post_interaction(self, interactions, user_features, post_features):
+        # Arrange
+        preranker = BilinearPreRanker.fit(interactions, epochs=5).bind(post_features)
+
+        # Act
+        top_for_men = post_features.iloc[preranker.top_n(user_features.iloc[[1]], 10)]
+        top_for_women = post_features.iloc[preranker.top_n(user_features.iloc[[0]], 10)]
+
+        # Assert
+        assert (top_for_men['topic'] == 'sport').all()
+        assert (top_for_women['topic'] == 'movie').all()
+
+    def test_save_and_load(self, interactions, user_features, post_features, tmp_path):
+        # Arrange
+        preranker = BilinearPreRanker.fit(interactions, epochs=1).bind(post_features)
+        path = str(tmp_path / 'prerank.npz')
+
+        # Act
+        preranker.save(path)
+        loaded = BilinearPreRanker.load(path).bind(post_features)
+
+        # Assert
+        user_row = user_features.iloc[[3]]
+        np.testing.assert_allclose(loaded.score(user_row), preranker.score(user_row))
+
+    def test_parse_top_n(self):
+        assert parse_top_n('') == {None: 0}
+        assert parse_top_n('300') == {None: 300}
+        assert parse_top_n('control:0, test:500') == {None: 0, 'control': 0, 'test': 500}
+
+    def test_service_scores_only_cascade_candidates(self, interactions, user_features, post_features):
+        # Arrange
+        model = ranking_model()
+        preranker = BilinearPreRanker.fit(interactions, epochs=5)
+        service = RecommenderService(
+            model_control=model,
+            model_test=model,
+            user_features=user_features,
+            post_features=post_features,
+            cascade=Cascade(preranker, {None: 8})
+        )
+
+        # Act
+        result = service.recommend(2, datetime(2024, 1, 1, 12), [], limit=3)
+
+        # Assert
+        scored = model.predict.call_args[0][0]
+        candidates = post_features[post_features['rating'].isin(scored['rating'])]
+        assert len(scored) == 8
+        assert (candidates['topic'] == 'sport').all()
+        assert result.post_ids == candidates.nlargest(3, 'rating')['post_id'].tolist()
+
+    def test_catalog_swap_builds_a_new_cascade(self, interactions, user_features, post_features):
+        """A request holding the old cascade keeps a consistent catalog and encoding"""
+        # Arrange
+        model = ranking_model()
+        service = RecommenderService(
+            model_control=model,
+            model_test=model,
+            user_features=user_features,
+            post_features=post_features,
+            cascade=Cascade(BilinearPreRanker.fit(interactions, epochs=5), {None: 8})
+        )
+        old = service.cascade
+        old_matrix = old.preranker.post_matrix.copy()
+        reversed_catalog = post_features.iloc[::-1].reset_index(drop=True)
+
+        # Act: a catalog of the same size in another order
+        service.update_catalog(reversed_catalog)
+        old_candidates = old.candidates('control', user_features.iloc[[1]])
+
+        # Assert
+        assert service.cascade is not old
+        assert service.cascade.post_features is reversed_catalog
+        assert old.post_features is post_features
+        np.testing.assert_array_equal(old.preranker.post_matrix, old_matrix)
+        assert (old_candidates['topic'] == 'sport').all()
+
+    def test_ndcg_at_k(self):
+        assert ndcg_at_k([1, 2, 3], {1: 1.0, 2: 1.0, 3: 1.0}, 3) == pytest.approx(1.0)
+        assert ndcg_at_k([4, 5], {1: 1.0}, 2) == 0.0
+        assert np.isnan(ndcg_at_k([1], {}, 1))
+
+    def test_tradeoff_report(self, interactions, user_features, post_features):
+        # Arrange
+        preranker = BilinearPreRanker.fit(interactions, epochs=2)
+
+        # Act
+        report = tradeoff(ranking_model(), preranker, user_features, post_features,
+                          [5, 15], labels=interactions, sample=10, k=5)
+
+        # Assert
+        assert report['top_n'].tolist() == [30, 5, 15]
+        assert report['ndcg@5_vs_full'].iloc[0] == pytest.approx(1.0)
+        assert report['ndcg@5_labels'].notna().all()
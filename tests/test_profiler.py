@@ -0,0 +1,102 @@
+import pytest
+import threading
+import time
+from unittest.mock import patch
+
+from app.core.profiler import StackSampler, ProfilerGate, ProfilerBusyError
+
+
+def _busy_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+class TestStackSampler:
+    """Test cases for the stack sampler"""
+
+    def test_sampler_captures_busy_thread(self):
+        """Test that a busy thread shows up in the collapsed stacks"""
+        # Arrange
+        stop_event = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop_event,))
+        worker.start()
+        sampler = StackSampler(interval=0.001, focus="")
+
+        # Act
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        stop_event.set()
+        worker.join()
+
+        # Assert
+        assert sampler.samples > 0
+        collapsed = sampler.collapsed()
+        assert "_busy_loop" in collapsed
+        stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert ";" in stack
+
+    def test_focus_filters_unrelated_stacks(self):
+        """Test that stacks outside the focus prefix are dropped"""
+        sampler = StackSampler(interval=0.001, focus="app.does_not_exist")
+
+        sampler.start()
+        time.sleep(0.02)
+        sampler.stop()
+
+        assert sampler.samples > 0
+        assert sampler.collapsed() == ""
+
+
+class TestProfilerGate:
+    """Test cases for profiler rate limiting"""
+
+    def test_gate_rejects_concurrent_and_cooldown(self):
+        """Test that the gate allows one run and enforces a cooldown"""
+        gate = ProfilerGate(cooldown=60)
+
+        gate.acquire()
+        with pytest.raises(ProfilerBusyError):
+            gate.acquire()
+        gate.release()
+
+        with pytest.raises(ProfilerBusyError) as exc_info:
+            gate.acquire()
+        assert 0 < exc_info.value.retry_after <= 60
+
+
+class TestProfileEndpoint:
+    """Test cases for the admin profile endpoint"""
+
+    def test_profile_disabled_without_token(self, client):
+        """Test that the endpoint is forbidden when no admin token is configured"""
+        with patch('app.api.admin.ADMIN_TOKEN', None):
+            response = client.get("/api/v1/admin/profile?seconds=0.01")
+
+        assert response.status_code == 403
+
+    def test_profile_rejects_wrong_token(self, client):
+        """Test that a wrong admin token is rejected"""
+        with patch('app.api.admin.ADMIN_TOKEN', "secret"):
+            response = client.get(
+                "/api/v1/admin/profile?seconds=0.01",
+                headers={"X-Admin-Token": "wrong"})
+
+        assert response.status_code == 403
+
+    def test_profile_success_then_rate_limited(self, client):
+        """Test a successful profile followed by a rate-limited request"""
+        with patch('app.api.admin.ADMIN_TOKEN', "secret"), \
+                patch('app.api.admin.profiler_gate', ProfilerGate(cooldown=60)):
+            response = client.get(
+                "/api/v1/admin/profile?seconds=0.05&interval_ms=1&focus=",
+                headers={"X-Admin-Token": "secret"})
+            second = client.get(
+                "/api/v1/admin/profile?seconds=0.05",
+                headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
+        assert second.status_code == 429
+        assert "Retry-After" in second.headers
@@ -0,0 +1,127 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.degradation import top_unliked
+from app.core.recommender import RecommenderService
+from app.core.seen_filter import SeenFilter, SeenFilterLoader, false_positive_rate
+
+
+class TestSeenFilter:
+    """Test cases for the per-user blocked Bloom filter"""
+
+    def test_no_false_negatives(self):
+        # Arrange
+        rng = np.random.default_rng(0)
+        seen = SeenFilter(np.arange(100), bits=512, hashes=4)
+        user_ids = np.repeat(np.arange(100), 40)
+        post_ids = rng.integers(0, 10_000, len(user_ids))
+
+        # Act
+        seen.add_many(user_ids, post_ids)
+
+        # Assert
+        for user_id in range(100):
+            assert seen.contains(user_id, post_ids[user_ids == user_id]).all()
+
+    def test_false_positive_rate_matches_theory(self):
+        # Arrange: views use even post ids, probes use odd ones
+        rng = np.random.default_rng(1)
+        seen = SeenFilter(np.arange(2000), bits=512, hashes=4)
+        seen.add_many(np.repeat(np.arange(2000), 50), rng.integers(0, 5000, 100_000) * 2)
+        probes = np.arange(1, 2001, 2)
+
+        # Act
+        rate = np.mean([seen.contains(u, probes).mean() for u in range(2000)])
+
+        # Assert
+        assert rate == pytest.approx(false_positive_rate(512, 4, 50), rel=0.25)
+
+    def test_memory_is_fixed_per_user(self):
+        seen = SeenFilter(np.arange(1000), bits=512)
+        assert seen.bytes_per_user == 72
+
+    def test_unknown_users(self):
+        # Arrange
+        seen = SeenFilter([1, 2, 3])
+
+        # Act
+        seen.add(99, [5, 6])
+
+        # Assert
+        assert seen.contains(99, [5, 6]).all()
+        assert not seen.contains(42, [5, 6]).any()
+        assert not seen.contains(1, [5, 6]).any()
+
+    def test_rejects_bad_block_size(self):
+        with pytest.raises(ValueError):
+            SeenFilter([1], bits=100)
+
+    def test_top_unliked_serves_seen_posts_last(self):
+        # Arrange
+        ranking = np.array([10, 11, 12, 13, 14])
+
+        def exclude(ids):
+            return np.isin(ids, [10, 12])
+
+        # Act & Assert
+        assert top_unliked(ranking, [11], 2, exclude) == [13, 14]
+        assert top_unliked(ranking, [11], 4, exclude) == [13, 14, 10, 12]
+
+    def test_service_skips_seen_posts(self):
+        # Arrange
+        model = Mock()
+        model.feature_names_ = ['rating']
+        model.predict.side_effect = lambda X: X['rating'].to_numpy()
+        seen = SeenFilter([1])
+        seen.add(1, [14, 13])
+        service = RecommenderService(
+            model_control=model,
+            model_test=model,
+            user_features=pd.DataFrame({'user_id': [1]}),
+            post_features=pd.DataFrame({
+                'post_id': [10, 11, 12, 13, 14],
+                'rating': [0.1, 0.2, 0.3, 0.4, 0.5],
+            }),
+            seen=seen
+        )
+
+        # Act
+        fresh = service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2)
+        too_few = service.recommend(1, datetime(2024, 1, 1, 12), [], limit=4)
+
+        # Assert
+        assert fresh.post_ids == [12, 11]
+        assert too_few.post_ids == [12, 11, 10, 14]
+
+    def test_loader_reads_views_and_polls_new_ones(self):
+        # Arrange
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE feed_action (user_id INT, post_id INT, action TEXT, time TEXT)"))
+            conn.execute(text(
+                "INSERT INTO feed_action VALUES (1, 10, 'view', '2024-01-01 10:00:00'), "
+                "(1, 11, 'like', '2024-01-01 10:01:00'), (2, 12, 'view', '2024-01-01 10:02:00')"))
+        seen = SeenFilter([1, 2])
+        loader = SeenFilterLoader(
+            seen, engine, "SELECT user_id, post_id, time FROM feed_action WHERE action = 'view'",
+            lookback=60)
+
+        # Act: a view at the newest time and one committed late are still read
+        first = loader.load()
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO feed_action VALUES (1, 15, 'view', '2024-01-01 10:02:00'), "
+                "(1, 16, 'view', '2024-01-01 10:01:30'), (2, 17, 'view', '2024-01-01 09:00:00')"))
+        second = loader.load(since=loader.watermark())
+
+        # Assert: the overlap re-reads post 12 and still misses what is older
+        assert (first, second) == (2, 3)
+        assert seen.contains(1, [10, 15, 16]).all()
+        assert not seen.contains(2, [17]).any()
+        assert not seen.contains(1, [11]).any()
+        assert seen.contains(2, [12]).all()
@@ -0,0 +1,144 @@
+import threading
+from datetime import datetime
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.recommender import RecommenderService
+from app.core.shadow import (
+    SHADOW_DROPPED,
+    SHADOW_OVERLAP,
+    SHADOW_SCORED,
+    ShadowScorer,
+    parse_shadow_models,
+    topk_overlap
+)
+
+
+@pytest.fixture
+def features():
+    return pd.DataFrame({
+        'post_id': [10, 11, 12, 13],
+        'rating': [0.1, 0.9, 0.5, 0.7],
+    })
+
+
+def make_model(scores):
+    model = Mock()
+    model.feature_names_ = ['rating']
+    model.predict.side_effect = lambda X, **kwargs: np.asarray(scores, dtype=float)
+    return model
+
+
+class TestShadowScorer:
+    """Test cases for off-path challenger scoring"""
+
+    def test_parse_shadow_models(self):
+        assert parse_shadow_models("a:m/a.cbm, b:m/b.cbm") == {
+            'a': 'm/a.cbm', 'b': 'm/b.cbm'}
+        with pytest.raises(ValueError):
+            parse_shadow_models("nopath")
+
+    def test_topk_overlap(self):
+        assert topk_overlap([1, 2, 3, 4], [4, 3, 9, 8]) == 0.5
+        assert topk_overlap([], [1]) == 0.0
+
+    def test_challenger_scores_in_background(self, features):
+        # Arrange
+        scorer = ShadowScorer({'shadow-a': make_model([4, 3, 2, 1])}, sample_rate=1.0)
+        scored_before = SHADOW_SCORED.value('shadow-a')
+        overlaps_before = SHADOW_OVERLAP.count('shadow-a', 'control')
+
+        # Act
+        submitted = scorer.submit(1, 'control', features, [10, 11], 0.002)
+        scorer._executor.shutdown(wait=True)
+
+        # Assert
+        assert submitted
+        assert SHADOW_SCORED.value('shadow-a') == scored_before + 1
+        assert SHADOW_OVERLAP.count('shadow-a', 'control') == overlaps_before + 1
+        assert scorer.pending == 0
+
+    def test_drops_when_backlog_is_full(self, features):
+        # Arrange: the only worker is blocked on the first sample
+        release = threading.Event()
+        model = make_model([1, 2, 3, 4])
+        model.predict.side_effect = lambda X, **kwargs: (
+            release.wait(5) and np.arange(len(X), dtype=float))
+        scorer = ShadowScorer({'shadow-b': model}, sample_rate=1.0, max_pending=1)
+        dropped_before = SHADOW_DROPPED.value('queue_full')
+
+        # Act
+        first = scorer.submit(1, 'control', features, [10], 0.001)
+        second = scorer.submit(2, 'control', features, [10], 0.001)
+        release.set()
+        scorer._executor.shutdown(wait=True)
+
+        # Assert
+        assert first and not second
+        assert SHADOW_DROPPED.value('queue_full') == dropped_before + 1
+
+    def test_challenger_predicts_on_limited_threads(self, features):
+        # Arrange
+        model = make_model([4, 3, 2, 1])
+        scorer = ShadowScorer({'shadow-t': model}, sample_rate=1.0, threads=2)
+
+        # Act
+        scorer.submit(1, 'control', features, [10], 0.001)
+        scorer._executor.shutdown(wait=True)
+
+        # Assert
+        assert model.predict.call_args.kwargs == {'thread_count': 2}
+
+    def test_cancelled_work_is_not_left_pending(self, features):
+        # Arrange: the worker is blocked, so the second sample is still queued
+        release = threading.Event()
+        model = make_model([1, 2, 3, 4])
+        model.predict.side_effect = lambda X, **kwargs: (
+            release.wait(5) and np.arange(len(X), dtype=float))
+        scorer = ShadowScorer({'shadow-d': model}, sample_rate=1.0, max_pending=4)
+        scorer.submit(1, 'control', features, [10], 0.001)
+        scorer.submit(2, 'control', features, [10], 0.001)
+
+        # Act
+        scorer.shutdown()
+        release.set()
+        scorer._executor.shutdown(wait=True)
+
+        # Assert
+        assert model.predict.call_count == 1
+        assert scorer.pending == 0
+
+    def test_drops_under_load_and_when_not_sampled(self, features):
+        # Arrange
+        model = make_model([1, 2, 3, 4])
+        loaded = ShadowScorer({'shadow-c': model}, sample_rate=1.0, under_load=lambda: True)
+        unsampled = ShadowScorer({'shadow-c': model}, sample_rate=0.0)
+
+        # Act & Assert
+        assert not loaded.submit(1, 'control', features, [10], 0.001)
+        assert not unsampled.submit(1, 'control', features, [10], 0.001)
+        model.predict.assert_not_called()
+
+    def test_service_hands_scored_block_to_shadow(self, features):
+        # Arrange
+        shadow = Mock()
+        service = RecommenderService(
+            model_control=make_model([0.1, 0.4, 0.3, 0.2]),
+            model_test=make_model([0.1, 0.4, 0.3, 0.2]),
+            user_features=pd.DataFrame({'user_id': [1]}),
+            post_features=features,
+            shadow=shadow
+        )
+
+        # Act
+        result = service.recommend(1, datetime(2024, 1, 1, 12), [], limit=2)
+
+        # Assert
+        assert result.post_ids == [11, 12]
+        args = shadow.submit.call_args[0]
+        assert args[0] == 1
+        assert args[3] == [11, 12]
+        assert list(args[2]['post_id']) == [10, 11, 12, 13]
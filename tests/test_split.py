@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.split import make_split, split_masks
+from benchmarks.bench_split import make_split_loop
+
+
+@pytest.fixture
+def interactions():
+    """Synthetic interactions; coarse timestamps force plenty of ties"""
+    rng = np.random.default_rng(42)
+    n = 20_000
+    return pd.DataFrame({
+        'user_id': rng.integers(0, 150, n),
+        'post_id': rng.integers(0, 1000, n),
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 500, n), 'min'),
+        'target': (rng.random(n) < rng.uniform(0.05, 0.5, 150)[rng.integers(0, 150, n)]).astype(int),
+    })
+
+
+class TestMakeSplit:
+    """Test cases for the vectorized per-user split"""
+
+    def test_identical_to_loop(self, interactions):
+        # Act
+        train, test = make_split(interactions)
+        expected_train, expected_test = make_split_loop(interactions)
+
+        # Assert
+        pd.testing.assert_frame_equal(train, expected_train)
+        pd.testing.assert_frame_equal(test, expected_test)
+
+    def test_users_in_both_sets_with_balanced_classes(self, interactions):
+        # Act
+        train, test = make_split(interactions)
+
+        # Assert
+        assert set(train['user_id']) == set(test['user_id'])
+        for _, split in (('train', train), ('test', test)):
+            counts = split.groupby('user_id')['target'].agg(['sum', 'size'])
+            assert (counts['sum'] >= 14).all()
+            assert (counts['size'] - counts['sum'] >= 14).all()
+
+    def test_masks_take_first_half_of_each_class(self):
+        # Arrange: one user, 4 positives and 5 negatives interleaved
+        targets = np.array([1, 0, 1, 0, 1, 0, 1, 0, 0])
+        users = np.zeros(len(targets), dtype=int)
+
+        # Act
+        train, test = split_masks(users, targets, min_per_class=2)
+
+        # Assert
+        assert train.tolist() == [True, True, True, True, False, False, False, False, False]
+        assert (train ^ test).all()
+
+    def test_small_users_and_other_labels_are_dropped(self):
+        # Arrange
+        users = np.array([1] * 6 + [2] * 3)
+        targets = np.array([1, 1, 0, 0, 2, 0, 1, 0, 0])
+
+        # Act
+        train, test = split_masks(users, targets, min_per_class=2)
+
+        # Assert
+        assert not (train | test)[6:].any()
+        assert not (train | test)[4]
+        assert train[:4].tolist() == [True, False, True, False]
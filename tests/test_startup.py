@@ -0,0 +1,90 @@
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from app import config
+from app.db import database
+from benchmarks.bench_startup import clean_env, parse_importtime, summarize_imports
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:    100000 |     100000 |   _io
+import time:    300000 |     300000 |     pandas.core
+import time:    200000 |     500000 |   pandas
+import time:     50000 |     650000 | app.main
+import time:     20000 |      20000 | json
+"""
+
+IMPORT_STATE = """
+import json, logging, sys, threading
+import app.main
+from app.db import database
+print(json.dumps({"catboost": "catboost" in sys.modules, "engine": database._engine is not None,
+                  "threads": threading.active_count(),
+                  "log_handlers": len(logging.getLogger().handlers)}))
+"""
+
+
+class TestImportTime:
+    """Test cases for the ``-X importtime`` report"""
+
+    def test_parse_importtime_reads_depth_and_times(self):
+        """Each module line gives its self and cumulative time and nesting"""
+        # Act
+        modules = parse_importtime(IMPORTTIME)
+
+        # Assert
+        assert modules == [("_io", 100000, 100000, 1), ("pandas.core", 300000, 300000, 2),
+                           ("pandas", 200000, 500000, 1), ("app.main", 50000, 650000, 0),
+                           ("json", 20000, 20000, 0)]
+
+    def test_summary_groups_self_time_by_package(self):
+        """Packages sum self time; the total counts top-level imports once"""
+        # Act
+        summary = summarize_imports(parse_importtime(IMPORTTIME), top=2)
+
+        # Assert
+        assert summary["total_ms"] == 670
+        assert summary["modules"] == 5
+        assert summary["packages_ms"] == {"pandas": 500, "_io": 100}
+        assert list(summary["slowest_ms"]) == ["app.main", "pandas"]
+
+
+class TestLazyStartup:
+    """Importing the app does no I/O and needs no environment"""
+
+    def test_import_without_settings_defers_engine_and_catboost(self, tmp_path):
+        """Nothing heavy is created, and no file is opened, until the service starts"""
+        # Arrange
+        env = clean_env()
+
+        # Act
+        result = subprocess.run([sys.executable, "-c", IMPORT_STATE], capture_output=True,
+                                text=True, env=env, cwd=tmp_path)
+
+        # Assert
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout.strip().splitlines()[-1]) == {
+            "catboost": False, "engine": False, "threads": 1, "log_handlers": 0}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_missing_settings_fail_at_startup(self):
+        """The checks removed from import run in ``check_required_settings``"""
+        with patch.object(config, "DATABASE_URL", None):
+            with pytest.raises(ValueError, match="DATABASE_URL"):
+                config.check_required_settings()
+        with patch.object(config, "DATABASE_URL", "sqlite://"), \
+                patch.object(config, "MODEL_CONTROL_PATH", "control.cbm"), \
+                patch.object(config, "MODEL_TEST_PATH", None):
+            with pytest.raises(ValueError, match="MODEL_CONTROL_PATH"):
+                config.check_required_settings()
+
+    def test_engine_requires_database_url(self):
+        """The lazy engine refuses to start without a URL"""
+        with patch.object(database, "DATABASE_URL", None), \
+                patch.object(database, "_engine", None):
+            with pytest.raises(ValueError, match="DATABASE_URL"):
+                database.get_engine()
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.text_features import (
+    EmbeddingCache,
+    TextClusterModel,
+    embed_posts,
+    text_hashes,
+    update_post_features
+)
+
+
+class FakeEmbedder:
+    """Deterministic 8-dim embeddings; records what it was asked to embed"""
+
+    model_name = "fake-encoder"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        texts = list(texts)
+        self.calls.append(texts)
+        return np.array([np.random.default_rng(len(t) * 31 + ord(t[0])).normal(size=8)
+                         for t in texts], dtype=np.float32)
+
+
+def cluster_model():
+    rng = np.random.default_rng(0)
+    return TextClusterModel(offset=0.1, pca_mean=rng.normal(size=8),
+                            components=np.linalg.qr(rng.normal(size=(8, 3)))[0].T,
+                            centers=rng.normal(size=(4, 3)), model_name="fake-encoder")
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE post_text_df (post_id INT, text TEXT, topic TEXT)"))
+        conn.execute(text("CREATE UNIQUE INDEX idx_post_text_df_post_id ON post_text_df (post_id)"))
+        conn.execute(text("INSERT INTO post_text_df VALUES (1, 'alpha news', 'covid'), "
+                          "(2, 'beta match', 'sport'), (3, 'gamma film', 'movie')"))
+    return engine
+
+
+class TestTextFeatures:
+    """Test cases for the incremental text feature pipeline"""
+
+    def test_only_new_texts_are_embedded(self, tmp_path):
+        # Arrange
+        cache = EmbeddingCache(str(tmp_path / "emb.npz"))
+        embedder = FakeEmbedder()
+
+        # Act
+        first, n_first = embed_posts(["a", "bb", "a"], cache, embedder, "fake-encoder")
+        second, n_second = embed_posts(["bb", "ccc"], cache, embedder, "fake-encoder")
+
+        # Assert
+        assert (n_first, n_second) == (2, 1)
+        assert embedder.calls == [["a", "bb"], ["ccc"]]
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_array_equal(first[1], second[0])
+
+    def test_cache_round_trip_and_retain(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / "emb.npz")
+        cache = EmbeddingCache(path)
+        keys = text_hashes(["a", "b", "c"], "m")
+        cache.update(keys, np.eye(3))
+
+        # Act
+        cache.retain(keys[[0, 2]])
+        cache.save()
+        loaded = EmbeddingCache(path)
+
+        # Assert
+        assert len(loaded) == 2
+        np.testing.assert_array_equal(loaded.get(keys[[2]]), [[0, 0, 1]])
+        assert loaded.lookup(keys[[1]]).tolist() == [-1]
+
+    def test_hash_depends_on_model(self):
+        assert text_hashes(["a"], "m1")[0] != text_hashes(["a"], "m2")[0]
+
+    def test_transform_matches_definition(self, tmp_path):
+        # Arrange
+        model = cluster_model()
+        embeddings = np.random.default_rng(1).normal(size=(5, 8))
+        path = str(tmp_path / "clusters.npz")
+
+        # Act
+        model.save(path)
+        features = TextClusterModel.load(path).transform(embeddings)
+
+        # Assert
+        reduced = (embeddings - 0.1 - model.pca_mean) @ model.components.T
+        expected = np.linalg.norm(reduced[:, None, :] - model.centers[None], axis=2)
+        np.testing.assert_allclose(features.iloc[:, 1:].to_numpy(), expected, atol=1e-9)
+        assert features["TextCluster"].tolist() == expected.argmin(axis=1).tolist()
+        assert list(features.columns) == ["TextCluster"] + [f"DistanceToCluster_{i}" for i in range(4)]
+
+    def test_fit_reproduces_notebook_projection(self):
+        pytest.importorskip("sklearn")
+        # Arrange
+        embeddings = np.random.default_rng(2).normal(size=(200, 16))
+
+        # Act
+        model = TextClusterModel.fit(embeddings, n_components=5, n_clusters=3)
+
+        # Assert
+        assert model.components.shape == (5, 16)
+        assert model.transform(embeddings)["TextCluster"].nunique() == 3
+
+    def test_update_post_features_is_incremental(self, engine, tmp_path):
+        # Arrange
+        paths = dict(cache_path=str(tmp_path / "emb.npz"), cluster_path=str(tmp_path / "c.npz"))
+        cluster_model().save(paths["cluster_path"])
+        embedder = FakeEmbedder()
+
+        def run():
+            return update_post_features(engine, "post_text_df", "SELECT * FROM post_text_df",
+                                        embedder=embedder, **paths)
+
+        # Act
+        first = run()
+        second = run()
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE post_text_df SET text = 'delta film' WHERE post_id = 3"))
+        third = run()
+        table = pd.read_sql("SELECT * FROM post_text_df", engine)
+
+        # Assert
+        assert (first["embedded"], first["written"]) == (3, True)
+        assert (second["embedded"], second["written"]) == (0, False)
+        assert third["embedded"] == 1
+        assert (first["updated"], third["updated"]) == (3, 1)
+        assert embedder.calls[-1] == ["delta film"]
+        assert {"post_id", "text", "topic", "TextCluster", "DistanceToCluster_3"} <= set(table.columns)
+        assert len(table) == 3
+        assert [index["name"] for index in inspect(engine).get_indexes("post_text_df")] == [
+            "idx_post_text_df_post_id"]
+        assert "post_text_df_text_staging" not in inspect(engine).get_table_names()
+
+    def test_rejects_embedder_of_another_model(self, engine, tmp_path):
+        # Arrange
+        cluster_path = str(tmp_path / "c.npz")
+        cluster_model().save(cluster_path)
+        embedder = FakeEmbedder()
+        embedder.model_name = "other-encoder"
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            update_post_features(engine, "post_text_df", "SELECT * FROM post_text_df",
+                                 str(tmp_path / "emb.npz"), cluster_path, embedder=embedder)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import training_data
+from app.core.split import make_split
+from app.core.training_data import (
+    ShardWriter,
+    build_from_csv,
+    build_from_sql
+)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Interaction and feature CSVs in the layout of scripts/train_model.py"""
+    rng = np.random.default_rng(0)
+    users = pd.DataFrame({
+        'user_id': np.arange(1, 21),
+        'gender': rng.integers(0, 2, 20),
+        'age': rng.integers(18, 60, 20),
+        'country': rng.choice(['Russia', 'Belarus'], 20),
+        'city': rng.choice(['Moscow', 'Minsk', 'Kazan'], 20),
+        'os': rng.choice(['iOS', 'Android'], 20),
+    })
+    posts = pd.DataFrame({
+        'post_id': np.arange(1, 51),
+        'topic': rng.choice(['sport', 'covid', 'movie'], 50),
+        'rating': rng.random(50),
+    })
+    paths = {}
+    for part, n in (('train', 300), ('test', 100)):
+        actions = pd.DataFrame({
+            'user_id': rng.integers(1, 22, n),  # user 21 has no features
+            'post_id': rng.integers(1, 51, n),
+            'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 10**6, n), 's'),
+            'target': rng.integers(0, 2, n),
+        })
+        paths[part] = str(tmp_path / f'{part}_balanced.csv')
+        actions.to_csv(paths[part])  # with the index column, like the notebook
+    users.to_csv(tmp_path / 'user_data.csv', index=False)
+    posts.to_csv(tmp_path / 'post_data.csv', index=False)
+    return {
+        'actions': paths,
+        'user_path': str(tmp_path / 'user_data.csv'),
+        'post_path': str(tmp_path / 'post_data.csv'),
+        'cache_dir': str(tmp_path / 'cache'),
+    }
+
+
+class TestTrainingData:
+    """Test cases for the streaming training data builder"""
+
+    def test_build_from_csv(self, sources):
+        # Act
+        data = build_from_csv(**sources, chunksize=64)
+
+        # Assert: compact dtypes, rows grouped by user, unknown user dropped
+        assert data.parts == ['train', 'test']
+        assert data.column('age').dtype == np.int16
+        assert data.column('target').dtype == np.int8
+        assert isinstance(data.column('topic'), pd.Categorical)
+        user_ids = np.asarray(data.column('user_id'))
+        assert (np.diff(user_ids) >= 0).all()
+        assert 21 not in user_ids
+        assert 'Unnamed: 0' not in data.columns
+        assert len(data.column('user_id', 'train')) + len(data.column('user_id', 'test')) == len(data)
+
+    def test_values_survive_round_trip(self, sources):
+        # Arrange
+        expected = (pd.read_csv(sources['actions']['test'], index_col=0)
+                    .merge(pd.read_csv(sources['post_path']), on='post_id')
+                    .merge(pd.read_csv(sources['user_path']), on='user_id'))
+
+        # Act
+        data = build_from_csv(**sources, chunksize=64)
+        frame = data.frame(['user_id', 'post_id', 'city', 'rating'], part='test')
+
+        # Assert
+        key = ['user_id', 'post_id', 'city']
+        got = frame.astype({'city': str}).sort_values(key + ['rating']).reset_index(drop=True)
+        want = expected[key + ['rating']].sort_values(key + ['rating']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, want, check_dtype=False, atol=1e-6)
+
+    def test_cache_is_reused_until_source_changes(self, sources, monkeypatch):
+        # Arrange
+        first = build_from_csv(**sources)
+        monkeypatch.setattr(training_data, 'ShardWriter', None)  # any rebuild would fail
+
+        # Act
+        second = build_from_csv(**sources)
+        with open(sources['post_path'], 'a') as f:
+            f.write('51,sport,0.5\n')
+        monkeypatch.undo()
+        third = build_from_csv(**sources)
+
+        # Assert
+        assert second.directory == first.directory
+        assert third.directory != first.directory
+
+    def test_pool_matches_part(self, sources):
+        # Arrange
+        data = build_from_csv(**sources)
+        features = ['gender', 'age', 'topic', 'country', 'city', 'os', 'rating']
+        cat_features = ['topic', 'city', 'os', 'country']
+
+        # Act
+        train_pool = data.pool(features, cat_features=cat_features, part='train')
+        full_pool = data.pool(features, cat_features=cat_features)
+
+        # Assert
+        assert train_pool.num_row() == data.meta['part_rows']['train']
+        assert full_pool.num_row() == len(data)
+        assert full_pool.num_col() == len(features)
+
+    def test_sample_reads_a_bounded_subset(self, sources):
+        """Sampled rows are rows of the dataset, in order and reproducible"""
+        # Arrange
+        data = build_from_csv(**sources)
+        columns = ['user_id', 'post_id', 'rating', 'target']
+        full = data.frame(columns).copy()
+
+        # Act
+        sample = data.sample(50, columns, seed=1)
+        everything = data.sample(10 * len(data), columns)
+
+        # Assert
+        assert len(sample) == 50
+        assert (np.diff(sample['user_id']) >= 0).all()
+        pd.testing.assert_frame_equal(sample, data.sample(50, columns, seed=1))
+        rows = full.merge(sample.drop_duplicates(), on=columns)
+        assert len(rows.drop_duplicates()) == len(sample.drop_duplicates())
+        pd.testing.assert_frame_equal(everything, full)
+
+    def test_build_from_csv_with_split(self, sources):
+        # Arrange: a single interactions file split per user
+        sources['actions'] = {'all': sources['actions']['train']}
+
+        # Act
+        data = build_from_csv(**sources, split=lambda frame: make_split(frame, min_per_class=2))
+
+        # Assert
+        assert data.parts == ['train', 'test']
+        assert set(data.column('user_id', 'train')) == set(data.column('user_id', 'test'))
+
+    def test_build_from_sql_splits_by_time(self, tmp_path):
+        # Arrange
+        engine = create_engine('sqlite://')
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE feed_action (user_id INT, post_id INT, action TEXT, time TEXT)'))
+            conn.execute(text(
+                "INSERT INTO feed_action VALUES (1, 10, 'view', '2024-01-01 10:00:00'), "
+                "(1, 11, 'like', '2024-01-02 10:00:00'), (2, 10, 'view', '2024-01-03 10:00:00')"))
+        query = ("SELECT user_id, post_id, time, "
+                 "CASE WHEN action = 'like' THEN 1 ELSE 0 END AS target FROM feed_action")
+        users = pd.DataFrame({'user_id': [1, 2], 'age': [20, 30]})
+        posts = pd.DataFrame({'post_id': [10, 11], 'topic': ['sport', 'movie']})
+
+        # Act
+        data = build_from_sql(engine, query, users, posts, str(tmp_path),
+                              test_since='2024-01-02', chunksize=2)
+
+        # Assert
+        assert data.meta['part_rows'] == {'train': 1, 'test': 2}
+        assert list(data.column('target', 'test')) == [1, 0]
+        assert list(data.column('hour')) == [10, 10, 10]
+
+    def test_empty_writer_raises(self, tmp_path):
+        with pytest.raises(ValueError):
+            ShardWriter(str(tmp_path)).close()
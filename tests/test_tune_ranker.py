@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics.tune_ranker import (
+    SEARCH_SPACE,
+    TrialMonitor,
+    prune_reference,
+    sample_params,
+    search
+)
+from app.core.training_data import ShardWriter, TrainingData, compact
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    """Small train/test dataset in the training_data layout"""
+    rng = np.random.default_rng(0)
+    writer = ShardWriter(str(tmp_path_factory.mktemp('data')), parts=['train', 'test'])
+    for part, n in (('train', 3000), ('test', 1000)):
+        frame = pd.DataFrame({
+            'user_id': np.sort(rng.integers(0, 100, n)),
+            'gender': rng.integers(0, 2, n),
+            'age': rng.integers(18, 60, n),
+            'topic': rng.choice(['sport', 'covid', 'movie'], n),
+            'country': rng.choice(['Russia', 'Belarus'], n),
+            'city': rng.choice(['Moscow', 'Minsk'], n),
+            'os': rng.choice(['iOS', 'Android'], n),
+            'rating': rng.random(n),
+        })
+        frame['target'] = (frame['rating'] + rng.normal(0, 0.2, n) > 0.7).astype(int)
+        writer.write(compact(frame), part)
+    writer.close()
+    return TrainingData(writer.directory)
+
+
+def validation_info(iteration, value):
+    return SimpleNamespace(iteration=iteration,
+                           metrics={'validation': {'NDCG:top=10;type=Base': [value]}})
+
+
+class TestTuneRanker:
+    """Test cases for the parallel hyperparameter search"""
+
+    def test_sample_params_within_space(self):
+        # Act
+        params = [sample_params(np.random.default_rng(seed)) for seed in range(50)]
+
+        # Assert
+        for name, (kind, low, high) in SEARCH_SPACE.items():
+            values = [p[name] for p in params]
+            assert low <= min(values) and max(values) <= high
+        assert all(isinstance(p['depth'], int) for p in params)
+
+    def test_prune_reference_needs_enough_trials(self):
+        # Arrange
+        results = [{'stopped': 'completed', 'checkpoints': {0: 0.5, 50: v}} for v in (0.6, 0.7)]
+
+        # Act & Assert
+        assert prune_reference(results, 0.5, min_trials=3) == {}
+        assert prune_reference(results, 0.5, min_trials=2) == {0: 0.5, 50: pytest.approx(0.65)}
+
+    def test_monitor_prunes_trial_behind_reference(self):
+        # Arrange
+        monitor = TrialMonitor({50: 0.7}, deadline=float('inf'), every=50)
+
+        # Act
+        keep_going = [monitor.after_iteration(validation_info(i, 0.6)) for i in (0, 49, 50)]
+
+        # Assert
+        assert keep_going == [True, True, False]
+        assert monitor.reason == 'pruned'
+        assert monitor.checkpoints == {0: 0.6, 50: 0.6}
+
+    def test_monitor_stops_at_deadline(self):
+        monitor = TrialMonitor({}, deadline=0.0, every=50)
+        assert monitor.after_iteration(validation_info(1, 0.6)) is False
+        assert monitor.reason == 'deadline'
+
+    def test_search_writes_leaderboard(self, dataset):
+        # Act
+        leaderboard = search(dataset, trials=3, workers=2, iterations=30, early_stopping=10,
+                             checkpoint_every=10, catalog_size=500, repeats=2)
+
+        # Assert
+        assert len(leaderboard) == 3
+        assert leaderboard['ndcg@10'].is_monotonic_decreasing
+        assert leaderboard['ndcg@10'].between(0, 1).all()
+        assert (leaderboard['predict_ms'] > 0).all()
+        assert set(leaderboard['stopped']) <= {'completed', 'early', 'pruned', 'deadline'}
+
+    def test_search_requires_eval_part(self, tmp_path):
+        # Arrange
+        writer = ShardWriter(str(tmp_path))
+        writer.write(pd.DataFrame({'user_id': [1], 'target': [1]}))
+        writer.close()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            search(TrainingData(writer.directory))